@@ -5,7 +5,11 @@ from .base import BaseAIAgent
 from .workflow import TaskSequencer, TaskParallelizer, TaskLooper
 
 class PipelineWorkflow:
-    """Implements a pipeline pattern where each stage processes and transforms data."""
+    """Implements a pipeline pattern where each stage processes and transforms data.
+    
+    Stages with ``consumes_partial_input`` set start while the previous
+    stage is still streaming its output (see ``TaskSequencer``).
+    """
     
     def __init__(self, stages: List[BaseAIAgent]):
         self.pipeline = TaskSequencer(
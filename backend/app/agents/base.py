@@ -1,22 +1,131 @@
-from typing import AsyncGenerator, Optional, Dict, Any
+from typing import AsyncGenerator, Optional, Dict, Any, List
 from google.adk.agents import BaseAgent, LlmAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event, EventActions
-import google.generativeai as genai
 from google.generativeai.types import content_types
+from ..services.ai.response_cache import response_cache
+from ..tools.base import BaseTool
+from .registry import compile_tool_declarations, get_model_client
+from .streaming import PartialInput, current_partial_input
+
+class CachedResponse:
+    """Model response rebuilt from the response cache."""
+    
+    def __init__(self, text: str, tool_calls: Any = None):
+        self.text = text
+        self.tool_calls = tool_calls
 
 class BaseAIAgent(BaseAgent):
     """Base class for all AI agents in our system."""
     
-    def __init__(self, name: str, description: str = "", model: str = "gemini-pro"):
+    model: str = "gemini-pro"
+    generation_config: Dict[str, Any] = {}
+    model_instance: Any = None
+    tools: List[BaseTool] = []
+    tool_declarations: List[dict] = []
+    # Yield partial events as model chunks arrive instead of one event at the end
+    stream: bool = False
+    # Set on stages that can start while the previous pipeline stage is still streaming (see _stage_input)
+    consumes_partial_input: bool = False
+    
+    def __init__(
+        self,
+        name: str,
+        description: str = "",
+        model: str = "gemini-pro",
+        generation_config: Optional[Dict[str, Any]] = None,
+        tools: Optional[List[BaseTool]] = None,
+        stream: bool = False
+    ):
         super().__init__(name=name, description=description)
         self.model = model
+        self.generation_config = generation_config or {}
+        self.tools = tools or []
+        self.stream = stream
+        # Compiled once here instead of on every request
+        self.tool_declarations = compile_tool_declarations(self.tools)
         self._setup_gemini()
     
     def _setup_gemini(self):
-        """Configure Gemini model."""
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        self.model_instance = genai.GenerativeModel(self.model)
+        """Attach the Gemini client shared by all agents with this model and config."""
+        self.model_instance = get_model_client(self.model, self.generation_config)
+    
+    def _cache_key(self, prompt: str, tools: Optional[list]) -> str:
+        return response_cache.make_key(
+            kind="agent",
+            model=self.model,
+            prompt=prompt,
+            tools=tools,
+            generation_config=self.generation_config
+        )
+    
+    async def _generate_content(self, prompt: str, tools: Optional[list] = None, use_cache: bool = True):
+        """Call the model, answering repeated deterministic requests from the response cache."""
+        if not response_cache.is_cacheable(self.generation_config, use_cache):
+            return await self.model_instance.generate_content_async(prompt, tools=tools)
+        
+        async def generate() -> Dict[str, Any]:
+            response = await self.model_instance.generate_content_async(prompt, tools=tools)
+            return {"text": response.text, "tool_calls": getattr(response, "tool_calls", None)}
+        
+        return CachedResponse(**await response_cache.get_or_compute(self._cache_key(prompt, tools), generate))
+    
+    async def _respond(self, prompt: str, tools: Optional[list] = None, use_cache: bool = True) -> AsyncGenerator[Event, None]:
+        """Answer ``prompt`` as events: one final event, or partial ones first in streaming mode.
+        
+        The final event always carries the whole text and the tool calls, so
+        consumers that skip partial events see the same result either way.
+        """
+        if not self.stream:
+            response = await self._generate_content(prompt, tools=tools, use_cache=use_cache)
+            yield Event(author=self.name, content=response.text, actions=getattr(response, "tool_calls", None), partial=False, turn_complete=True)
+            return
+        
+        cacheable = response_cache.is_cacheable(self.generation_config, use_cache)
+        if cacheable:
+            cached = await response_cache.get(self._cache_key(prompt, tools))
+            if cached is not None:
+                yield Event(author=self.name, content=cached["text"], actions=cached["tool_calls"], partial=False, turn_complete=True)
+                return
+        
+        response = await self.model_instance.generate_content_async(prompt, tools=tools, stream=True)
+        chunks = []
+        async for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks holding only function calls have no text
+                continue
+            if text:
+                chunks.append(text)
+                yield Event(author=self.name, content=text, partial=True, turn_complete=False)
+        
+        text = "".join(chunks)
+        tool_calls = getattr(response, "tool_calls", None)
+        if cacheable:
+            await response_cache.set(self._cache_key(prompt, tools), {"text": text, "tool_calls": tool_calls})
+        yield Event(author=self.name, content=text, actions=tool_calls, partial=False, turn_complete=True)
+    
+    def partial_input(self) -> Optional[PartialInput]:
+        """The previous pipeline stage's output, still streaming if this stage was started early."""
+        return current_partial_input.get()
+    
+    async def _stage_input(self, ctx: InvocationContext) -> str:
+        """The text to work on: the previous pipeline stage's output, or the user's message.
+        
+        Chunks of a previous stage that is still streaming are passed to
+        ``_on_partial_input`` as they arrive; the stage's full output is
+        returned once it has finished.
+        """
+        upstream = self.partial_input()
+        if upstream is None:
+            return ctx.message.content
+        async for chunk in upstream:
+            await self._on_partial_input(chunk)
+        return upstream.text
+    
+    async def _on_partial_input(self, chunk: str):
+        """Called with each chunk of the previous stage's output; override to start work before it finishes."""
 
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         """Default implementation for running the agent."""
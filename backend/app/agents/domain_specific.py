@@ -12,33 +12,27 @@ class DataAnalysisAgent(BaseAIAgent):
         name: str,
         tools: Optional[List[BaseTool]] = None,
         description: str = "I specialize in data analysis, visualization, and insights.",
-        model: str = "gemini-pro"
+        model: str = "gemini-pro",
+        generation_config: Optional[Dict[str, Any]] = None,
+        stream: bool = False
     ):
-        super().__init__(name=name, description=description, model=model)
-        self.tools = tools or []
+        super().__init__(name=name, description=description, model=model, generation_config=generation_config, tools=tools, stream=stream)
         
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         """Execute data analysis tasks."""
         # Add data context to prompt
         data_context = ctx.session.state.get('data_context', {})
+        request = await self._stage_input(ctx)
         prompt = f"""
         Data Analysis Task:
-        {ctx.message.content}
+        {request}
         
         Available Data Context:
         {data_context}
         """
         
-        response = await self.model_instance.generate_content_async(
-            prompt,
-            tools=[tool.to_dict() for tool in self.tools]
-        )
-        
-        yield Event(
-            author=self.name,
-            content=response.text,
-            actions=response.tool_calls
-        )
+        async for event in self._respond(prompt, tools=self.tool_declarations):
+            yield event
 
 class SecurityAgent(BaseAIAgent):
     """Agent specialized for security analysis and monitoring."""
@@ -48,32 +42,26 @@ class SecurityAgent(BaseAIAgent):
         name: str,
         tools: Optional[List[BaseTool]] = None,
         description: str = "I handle security analysis and monitoring.",
-        model: str = "gemini-pro"
+        model: str = "gemini-pro",
+        generation_config: Optional[Dict[str, Any]] = None,
+        stream: bool = False
     ):
-        super().__init__(name=name, description=description, model=model)
-        self.tools = tools or []
+        super().__init__(name=name, description=description, model=model, generation_config=generation_config, tools=tools, stream=stream)
         
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         """Execute security-related tasks."""
         security_context = ctx.session.state.get('security_context', {})
+        request = await self._stage_input(ctx)
         prompt = f"""
         Security Task:
-        {ctx.message.content}
+        {request}
         
         Security Context:
         {security_context}
         """
         
-        response = await self.model_instance.generate_content_async(
-            prompt,
-            tools=[tool.to_dict() for tool in self.tools]
-        )
-        
-        yield Event(
-            author=self.name,
-            content=response.text,
-            actions=response.tool_calls
-        )
+        async for event in self._respond(prompt, tools=self.tool_declarations):
+            yield event
 
 class DevOpsAgent(BaseAIAgent):
     """Agent specialized for DevOps tasks."""
@@ -83,32 +71,26 @@ class DevOpsAgent(BaseAIAgent):
         name: str,
         tools: Optional[List[BaseTool]] = None,
         description: str = "I handle DevOps tasks including deployment and infrastructure.",
-        model: str = "gemini-pro"
+        model: str = "gemini-pro",
+        generation_config: Optional[Dict[str, Any]] = None,
+        stream: bool = False
     ):
-        super().__init__(name=name, description=description, model=model)
-        self.tools = tools or []
+        super().__init__(name=name, description=description, model=model, generation_config=generation_config, tools=tools, stream=stream)
         
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         """Execute DevOps tasks."""
         infra_context = ctx.session.state.get('infrastructure_context', {})
+        request = await self._stage_input(ctx)
         prompt = f"""
         DevOps Task:
-        {ctx.message.content}
+        {request}
         
         Infrastructure Context:
         {infra_context}
         """
         
-        response = await self.model_instance.generate_content_async(
-            prompt,
-            tools=[tool.to_dict() for tool in self.tools]
-        )
-        
-        yield Event(
-            author=self.name,
-            content=response.text,
-            actions=response.tool_calls
-        )
+        async for event in self._respond(prompt, tools=self.tool_declarations):
+            yield event
 
 class QAAgent(BaseAIAgent):
     """Agent specialized for quality assurance and testing."""
@@ -118,29 +100,23 @@ class QAAgent(BaseAIAgent):
         name: str,
         tools: Optional[List[BaseTool]] = None,
         description: str = "I handle testing and quality assurance tasks.",
-        model: str = "gemini-pro"
+        model: str = "gemini-pro",
+        generation_config: Optional[Dict[str, Any]] = None,
+        stream: bool = False
     ):
-        super().__init__(name=name, description=description, model=model)
-        self.tools = tools or []
+        super().__init__(name=name, description=description, model=model, generation_config=generation_config, tools=tools, stream=stream)
         
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         """Execute QA tasks."""
         test_context = ctx.session.state.get('test_context', {})
+        request = await self._stage_input(ctx)
         prompt = f"""
         QA Task:
-        {ctx.message.content}
+        {request}
         
         Test Context:
         {test_context}
         """
         
-        response = await self.model_instance.generate_content_async(
-            prompt,
-            tools=[tool.to_dict() for tool in self.tools]
-        )
-        
-        yield Event(
-            author=self.name,
-            content=response.text,
-            actions=response.tool_calls
-        )
\ No newline at end of file
+        async for event in self._respond(prompt, tools=self.tool_declarations):
+            yield event
\ No newline at end of file
@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from google.adk.agents import BaseAgent
+import google.generativeai as genai
+from ..tools.base import BaseTool
+
+_clients: Dict[Tuple[str, str], genai.GenerativeModel] = {}
+_clients_lock = threading.Lock()
+_configured_key: Optional[str] = None
+
+def get_model_client(model: str, generation_config: Optional[Dict[str, Any]] = None) -> genai.GenerativeModel:
+    """Return the shared model client for ``(model, generation_config)``.
+
+    Clients hold no per-request state, so every agent using the same model
+    and settings can share one; ``genai.configure`` runs only when the API
+    key changes instead of once per agent.
+    """
+    key = (model, json.dumps(generation_config or {}, sort_keys=True, default=str))
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    global _configured_key
+    with _clients_lock:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if api_key != _configured_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+            _clients.clear()
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = genai.GenerativeModel(model, generation_config=generation_config or None)
+        return client
+
+def clear_model_clients():
+    """Forget shared clients, e.g. after rotating credentials."""
+    global _configured_key
+    with _clients_lock:
+        _clients.clear()
+        _configured_key = None
+
+def compile_tool_declarations(tools: List[BaseTool]) -> List[dict]:
+    """Build the function declarations sent with every request to the model."""
+    return [tool.to_dict() for tool in tools]
+
+class AgentRegistry:
+    """Builds each agent graph once per agent type and hands out the cached instance.
+
+    Agents keep per-run state in the invocation context, not on themselves,
+    so one graph can serve every request of its type. ADK gives each agent
+    a single parent, so factories build their own sub-agents rather than
+    sharing them between graphs; what they do share are the model clients.
+    """
+
+    def __init__(self, setup: Optional[Callable[["AgentRegistry"], None]] = None):
+        self._factories: Dict[str, Callable[[], BaseAgent]] = {}
+        self._agents: Dict[str, BaseAgent] = {}
+        self._lock = threading.RLock()
+        # Deferred registrations, run on first lookup so agent modules can import this one
+        self._setup = setup
+        self.builds = 0
+
+    def _ensure_setup(self):
+        if self._setup is not None:
+            with self._lock:
+                setup, self._setup = self._setup, None
+                if setup is not None:
+                    setup(self)
+
+    def register(self, agent_type: str, factory: Callable[[], BaseAgent]):
+        """Register how to build an agent type, dropping any graph built by a previous factory."""
+        with self._lock:
+            self._factories[agent_type] = factory
+            self._agents.pop(agent_type, None)
+
+    def get(self, agent_type: str) -> BaseAgent:
+        agent = self._agents.get(agent_type)
+        if agent is not None:
+            return agent
+        self._ensure_setup()
+        with self._lock:
+            agent = self._agents.get(agent_type)
+            if agent is None:
+                factory = self._factories.get(agent_type)
+                if factory is None:
+                    raise ValueError(f"Unknown agent type: {agent_type}")
+                agent = self._agents[agent_type] = factory()
+                self.builds += 1
+            return agent
+
+    def invalidate(self, agent_type: Optional[str] = None):
+        """Drop one cached graph, or all of them, so the next lookup rebuilds it."""
+        with self._lock:
+            if agent_type is None:
+                self._agents.clear()
+            else:
+                self._agents.pop(agent_type, None)
+
+    def types(self) -> List[str]:
+        self._ensure_setup()
+        return sorted(self._factories)
+
+def register_default_agents(registry: AgentRegistry):
+    """Register the specialised agents with their tools."""
+    # The tools pull in pandas and matplotlib, so they are only imported when an agent is built
+    from .specialized import CodingAgent, AutomationAgent
+    from .domain_specific import DataAnalysisAgent, SecurityAgent, DevOpsAgent, QAAgent
+
+    model = os.getenv("AGENT_MODEL", "gemini-pro")
+    stream = os.getenv("AGENT_STREAMING", "false").lower() == "true"
+
+    def tools(*names: str) -> List[BaseTool]:
+        from ..tools import specialized
+        return [getattr(specialized, name)() for name in names]
+
+    registry.register("coding", lambda: CodingAgent(name="coding_agent", model=model, stream=stream))
+    registry.register("automation", lambda: AutomationAgent(name="automation_agent", model=model, stream=stream))
+    registry.register("data_analysis", lambda: DataAnalysisAgent(
+        name="data_analysis_agent",
+        tools=tools("DataVisualizationTool", "MetricsCollectionTool"),
+        model=model,
+        stream=stream
+    ))
+    registry.register("security", lambda: SecurityAgent(
+        name="security_agent",
+        tools=tools("SecurityScanTool"),
+        model=model,
+        stream=stream
+    ))
+    registry.register("devops", lambda: DevOpsAgent(
+        name="devops_agent",
+        tools=tools("InfrastructureProvisioningTool", "MetricsCollectionTool"),
+        model=model,
+        stream=stream
+    ))
+    registry.register("qa", lambda: QAAgent(
+        name="qa_agent",
+        tools=tools("TestExecutionTool"),
+        model=model,
+        stream=stream
+    ))
+
+# Shared registry; the default agent types are registered on first use
+agent_registry = AgentRegistry(setup=register_default_agents)
\ No newline at end of file
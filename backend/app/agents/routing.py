@@ -0,0 +1,255 @@
+import asyncio
+import logging
+import os
+import re
+import time
+import zlib
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from app.infrastructure.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"[a-z0-9_]+")
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+def match_workflow(answer: str, workflows: Sequence[str]) -> Optional[str]:
+    """Map a free-text model answer onto one of ``workflows``, or None if it names none of them."""
+    cleaned = answer.strip().strip("`'\".").strip()
+    if cleaned in workflows:
+        return cleaned
+    canonical = {re.sub(r"[^a-z0-9]+", "_", key.lower()).strip("_"): key for key in workflows}
+    key = canonical.get(re.sub(r"[^a-z0-9]+", "_", cleaned.lower()).strip("_"))
+    if key is not None:
+        return key
+    # Otherwise the key mentioned first, e.g. "I would use the data_analysis workflow"
+    lowered = answer.lower()
+    positions = []
+    for key in workflows:
+        found = re.search(rf"(?<![a-z0-9_]){re.escape(key.lower())}(?![a-z0-9_])", lowered)
+        if found:
+            positions.append((found.start(), key))
+    return min(positions)[1] if positions else None
+
+class HashedNgramEncoder:
+    """Turns text into hashed word and character n-gram count vectors.
+
+    Words, word bigrams and the character 3- and 4-grams of each word are
+    hashed with CRC32 into ``dim`` buckets, so no vocabulary is stored and
+    unseen words still match on their fragments (``deploy`` / ``deployment``).
+    """
+
+    def __init__(self, dim: int = 2 ** 13, char_ngrams: Tuple[int, ...] = (3, 4)):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+
+    def features(self, text: str) -> List[str]:
+        tokens = TOKEN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for token in tokens:
+            padded = f"<{token}>"
+            for n in self.char_ngrams:
+                features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+        return features
+
+    def counts(self, text: str) -> np.ndarray:
+        """Sublinear term frequencies, before IDF weighting and normalisation."""
+        features = self.features(text)
+        buckets = np.fromiter((zlib.crc32(feature.encode()) % self.dim for feature in features), dtype=np.int64, count=len(features))
+        return np.log1p(np.bincount(buckets, minlength=self.dim).astype(np.float32))
+
+class WorkflowRouter:
+    """Chooses a workflow for a request locally, consulting the model only when unsure.
+
+    A request is answered, cheapest first, from the decision cache, from
+    the rule table (regexes that name exactly one workflow), or from a
+    classifier comparing the TF-IDF weighted hashed n-gram vector of the
+    request with each workflow's exemplar centroid by cosine similarity. The classifier
+    decides when its best workflow scores at least ``threshold`` and leads
+    the runner-up by ``margin``. Otherwise ``fallback`` (the LLM router) is
+    asked, and its answer is only accepted if it names a known workflow.
+    """
+
+    def __init__(
+        self,
+        workflows: Iterable[str],
+        exemplars: Optional[Dict[str, List[str]]] = None,
+        rules: Optional[List[Tuple[str, str]]] = None,
+        fallback: Optional[Callable[[str], Awaitable[str]]] = None,
+        threshold: Optional[float] = None,
+        margin: Optional[float] = None,
+        cache_size: Optional[int] = None,
+        cache_ttl: Optional[float] = None,
+        max_learned: int = 50,
+        encoder: Optional[HashedNgramEncoder] = None
+    ):
+        self.workflows = list(workflows)
+        self.fallback = fallback
+        self.threshold = threshold if threshold is not None else float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", 0.16))
+        self.margin = margin if margin is not None else float(os.getenv("ROUTER_MARGIN", 0.01))
+        self.cache = TTLCache(
+            max_size=cache_size if cache_size is not None else int(os.getenv("ROUTER_CACHE_SIZE", 10000)),
+            ttl=cache_ttl if cache_ttl is not None else float(os.getenv("ROUTER_CACHE_TTL_SECONDS", 3600))
+        )
+        self.max_learned = max_learned
+        self.encoder = encoder or HashedNgramEncoder()
+        self.counts = {"cache": 0, "rule": 0, "classifier": 0, "llm": 0, "unresolved": 0}
+        self._rules: Optional[re.Pattern] = None
+        self._rule_workflows: Dict[str, str] = {}
+        self._rows: Dict[str, List[np.ndarray]] = {workflow: [] for workflow in self.workflows}
+        self._learned: Dict[str, int] = {workflow: 0 for workflow in self.workflows}
+        self._centroids = np.zeros((0, self.encoder.dim), dtype=np.float32)
+        self._idf = np.ones(self.encoder.dim, dtype=np.float32)
+        self._labels: List[str] = []
+        self.exemplar_count = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        if rules:
+            self.set_rules(rules)
+        for workflow, texts in (exemplars or {}).items():
+            self.add_exemplars(workflow, texts, rebuild=False)
+        self._rebuild()
+
+    def set_rules(self, rules: List[Tuple[str, str]]):
+        """Compile ``(workflow, regex)`` rules into one case-insensitive pattern matched in a single pass."""
+        groups = []
+        self._rule_workflows = {}
+        for i, (workflow, pattern) in enumerate(rules):
+            if workflow not in self._rows:
+                raise ValueError(f"Rule for unknown workflow: {workflow}")
+            self._rule_workflows[f"r{i}"] = workflow
+            groups.append(f"(?P<r{i}>{pattern})")
+        self._rules = re.compile("|".join(groups), re.IGNORECASE) if groups else None
+        self.cache.clear()
+
+    def add_exemplars(self, workflow: str, texts: Iterable[str], rebuild: bool = True):
+        if workflow not in self._rows:
+            raise ValueError(f"Unknown workflow: {workflow}")
+        self._rows[workflow].extend(self.encoder.counts(text) for text in texts if text.strip())
+        if rebuild:
+            self._rebuild()
+
+    def _rebuild(self):
+        labels, rows, starts = [], [], []
+        for workflow in self.workflows:
+            if self._rows[workflow]:
+                starts.append(len(rows))
+                labels.append(workflow)
+                rows.extend(self._rows[workflow])
+        if not rows:
+            return
+        matrix = np.vstack(rows)
+        # Buckets that occur in every exemplar say little about which workflow is meant
+        document_frequency = np.count_nonzero(matrix, axis=0)
+        self._idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+        matrix *= self._idf
+        matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+        # One unit-length centroid per workflow: scoring is a single (workflows x dim) product
+        centroids = np.add.reduceat(matrix, np.array(starts, dtype=np.int64), axis=0)
+        centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+        self._centroids, self._labels, self.exemplar_count = centroids, labels, len(rows)
+
+    def match_rules(self, text: str) -> List[str]:
+        if self._rules is None:
+            return []
+        matched = []
+        for found in self._rules.finditer(text):
+            workflow = self._rule_workflows[found.lastgroup]
+            if workflow not in matched:
+                matched.append(workflow)
+        return matched
+
+    def scores(self, text: str, candidates: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """Cosine similarity to each workflow's exemplar centroid, highest first."""
+        if not self._labels:
+            return []
+        vector = self.encoder.counts(text) * self._idf
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return []
+        similarities = self._centroids @ (vector / norm)
+        ranked = sorted(zip(self._labels, similarities.tolist()), key=lambda item: item[1], reverse=True)
+        if candidates:
+            ranked = [item for item in ranked if item[0] in candidates]
+        return ranked
+
+    def classify(self, text: str, candidates: Optional[List[str]] = None) -> dict:
+        ranked = self.scores(text, candidates)
+        if not ranked or ranked[0][1] <= 0:
+            return {"workflow": None, "confidence": 0.0, "margin": 0.0}
+        top_workflow, top = ranked[0]
+        second = ranked[1][1] if len(ranked) > 1 else 0.0
+        return {"workflow": top_workflow, "confidence": top, "margin": top - second}
+
+    def route_local(self, text: str) -> dict:
+        """Decide from the rules and classifier only; ``confident`` says whether to trust it."""
+        matched = self.match_rules(text)
+        if len(matched) == 1:
+            return {"workflow": matched[0], "confidence": 1.0, "source": "rule", "confident": True}
+        # Several rules fired: let the classifier break the tie between them
+        decision = self.classify(text, matched or None)
+        confident = decision["workflow"] is not None and decision["confidence"] >= self.threshold and decision["margin"] >= self.margin
+        return {"workflow": decision["workflow"], "confidence": decision["confidence"], "source": "classifier", "confident": confident}
+
+    async def route(self, text: str) -> dict:
+        """Return ``{"workflow", "confidence", "source"}`` for a request."""
+        key = normalize(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.counts["cache"] += 1
+            return dict(cached, source="cache", latency_ms=0.0)
+
+        started = time.perf_counter()
+        decision = self.route_local(text)
+        if not decision.pop("confident") and self.fallback is not None:
+            decision = await self._ask_fallback(key, text, decision)
+        self.counts[decision["source"]] += 1
+        if decision["workflow"] is not None and decision["source"] != "unresolved":
+            # Unresolved guesses are not cached so the model gets another chance next time
+            self.cache.set(key, decision)
+        return dict(decision, latency_ms=(time.perf_counter() - started) * 1000)
+
+    async def _ask_fallback(self, key: str, text: str, local: dict) -> dict:
+        # Identical requests arriving together share one model call
+        while key in self._inflight:
+            pending = self._inflight[key]
+            try:
+                return dict(await asyncio.shield(pending))
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The caller asking the model went away, not this one: ask it instead
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            try:
+                workflow = match_workflow(await self.fallback(text), self.workflows)
+            except Exception:
+                logger.warning("Routing fallback failed", exc_info=True)
+                workflow = None
+            if workflow is None:
+                # The model named no known workflow or could not be reached; keep the local best guess
+                decision = dict(local, source="unresolved")
+            else:
+                decision = {"workflow": workflow, "confidence": local["confidence"], "source": "llm"}
+                if self._learned[workflow] < self.max_learned:
+                    # Remember the request so the classifier answers similar ones next time
+                    self._learned[workflow] += 1
+                    self.add_exemplars(workflow, [text])
+            future.set_result(decision)
+            return decision
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict:
+        decisions = sum(self.counts.values())
+        return {
+            **self.counts,
+            "decisions": decisions,
+            "local_rate": (self.counts["cache"] + self.counts["rule"] + self.counts["classifier"]) / decisions if decisions else 0.0,
+            "exemplars": self.exemplar_count
+        }
\ No newline at end of file
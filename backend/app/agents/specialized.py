@@ -1,4 +1,4 @@
-from typing import AsyncGenerator, List, Optional
+from typing import AsyncGenerator, List, Optional, Dict, Any
 from google.adk.agents import LlmAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event
@@ -13,23 +13,16 @@ class CodingAgent(BaseAIAgent):
         name: str,
         tools: Optional[List[BaseTool]] = None,
         description: str = "I am a coding assistant that helps with programming tasks.",
-        model: str = "gemini-pro"
+        model: str = "gemini-pro",
+        generation_config: Optional[Dict[str, Any]] = None,
+        stream: bool = False
     ):
-        super().__init__(name=name, description=description, model=model)
-        self.tools = tools or []
+        super().__init__(name=name, description=description, model=model, generation_config=generation_config, tools=tools, stream=stream)
         
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         """Execute coding-related tasks."""
-        response = await self.model_instance.generate_content_async(
-            ctx.message.content,
-            tools=[tool.to_dict() for tool in self.tools]
-        )
-        
-        yield Event(
-            author=self.name,
-            content=response.text,
-            actions=response.tool_calls
-        )
+        async for event in self._respond(await self._stage_input(ctx), tools=self.tool_declarations):
+            yield event
 
 class AutomationAgent(BaseAIAgent):
     """Agent specialized for automation tasks."""
@@ -39,20 +32,13 @@ class AutomationAgent(BaseAIAgent):
         name: str,
         tools: Optional[List[BaseTool]] = None,
         description: str = "I help automate computer interactions and workflows.",
-        model: str = "gemini-pro"
+        model: str = "gemini-pro",
+        generation_config: Optional[Dict[str, Any]] = None,
+        stream: bool = False
     ):
-        super().__init__(name=name, description=description, model=model)
-        self.tools = tools or []
+        super().__init__(name=name, description=description, model=model, generation_config=generation_config, tools=tools, stream=stream)
         
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         """Execute automation tasks."""
-        response = await self.model_instance.generate_content_async(
-            ctx.message.content,
-            tools=[tool.to_dict() for tool in self.tools]
-        )
-        
-        yield Event(
-            author=self.name,
-            content=response.text,
-            actions=response.tool_calls
-        )
\ No newline at end of file
+        async for event in self._respond(await self._stage_input(ctx), tools=self.tool_declarations):
+            yield event
\ No newline at end of file
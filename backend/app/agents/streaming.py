@@ -0,0 +1,72 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, List, Optional
+
+class PartialInput:
+    """Text produced so far by the previous pipeline stage, readable while it is still arriving.
+
+    The producing stage feeds chunks as its partial events arrive and
+    finishes with its final text. A consuming stage can iterate the chunks
+    as they come, read ``text`` at any point, or wait for ``complete()``.
+    """
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._final: Optional[str] = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def text(self) -> str:
+        return self._final if self._final is not None else "".join(self.chunks)
+
+    async def feed(self, chunk: str):
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self, text: Optional[str] = None, error: Optional[BaseException] = None):
+        async with self._changed:
+            if self.done:
+                return
+            self.done = True
+            self.error = error
+            self._final = text
+            self._changed.notify_all()
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self.chunks) or self.done)
+                chunks = self.chunks[position:]
+                done = self.done
+            position += len(chunks)
+            for chunk in chunks:
+                yield chunk
+            if done and position >= len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
+
+    async def complete(self) -> str:
+        """Wait for the producing stage to finish and return its full text."""
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.done)
+        if self.error is not None:
+            raise self.error
+        return self.text
+
+# Set by TaskSequencer for a stage it started before the previous stage finished
+current_partial_input: ContextVar[Optional[PartialInput]] = ContextVar("current_partial_input", default=None)
+
+def event_text(event: Any) -> str:
+    """Text carried by an event, whether its content is a string or a list of parts."""
+    content = getattr(event, "content", None)
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        return content
+    parts = getattr(content, "parts", None) or []
+    return "".join(getattr(part, "text", None) or "" for part in parts)
\ No newline at end of file
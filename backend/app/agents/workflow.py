@@ -1,14 +1,99 @@
-from typing import AsyncGenerator
+import asyncio
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
 from google.adk.agents import SequentialAgent, ParallelAgent, LoopAgent
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event
 from .base import BaseAIAgent
+from .routing import WorkflowRouter
+from .streaming import PartialInput, current_partial_input, event_text
+
+class StageDone:
+    """Queue marker: a pipeline stage has finished, possibly with an error."""
+    
+    def __init__(self, index: int, error: Optional[BaseException] = None):
+        self.index = index
+        self.error = error
 
 class TaskSequencer(SequentialAgent):
-    """Executes a sequence of tasks in order."""
+    """Executes a sequence of tasks in order, each stage working on the previous one's output.
+    
+    Every stage after the first reads the previous stage's output through
+    ``partial_input()``. A stage with ``consumes_partial_input`` set starts
+    as soon as the stage before it yields its first partial event and gets
+    that output chunk by chunk while it is still streaming; other stages
+    start once the previous one has finished. Events of overlapping stages
+    are yielded as they arrive.
+    """
     
     def __init__(self, name: str, sub_agents: list):
         super().__init__(name=name, sub_agents=sub_agents)
+    
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        events: asyncio.Queue = asyncio.Queue()
+        tasks: List[asyncio.Task] = []
+        
+        def launch(index: int, upstream: Optional[PartialInput]):
+            tasks.append(asyncio.create_task(self._run_stage(ctx, index, upstream, events, launch)))
+        
+        # A nested sequencer's first stage works on what its own stage was given
+        launch(0, current_partial_input.get())
+        finished = 0
+        try:
+            while finished < len(self.sub_agents):
+                item = await events.get()
+                if isinstance(item, StageDone):
+                    if item.error is not None:
+                        raise item.error
+                    finished += 1
+                    continue
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _run_stage(
+        self,
+        ctx: InvocationContext,
+        index: int,
+        upstream: Optional[PartialInput],
+        events: asyncio.Queue,
+        launch: Callable[[int, Optional[PartialInput]], None]
+    ):
+        # Each task runs in its own copy of the context, so this is only visible to this stage
+        current_partial_input.set(upstream)
+        following = self.sub_agents[index + 1] if index + 1 < len(self.sub_agents) else None
+        feed = PartialInput() if following is not None else None
+        early = getattr(following, "consumes_partial_input", False)
+        started_next = False
+        # Final texts of every agent in the stage, so a reducer after a parallel stage sees all of them
+        finals: List[str] = []
+        try:
+            async for event in self.sub_agents[index].run_async(ctx):
+                await events.put(event)
+                if feed is None:
+                    continue
+                if getattr(event, "partial", False):
+                    await feed.feed(event_text(event))
+                    if early and not started_next:
+                        started_next = True
+                        launch(index + 1, feed)
+                elif event_text(event):
+                    finals.append(event_text(event))
+        except asyncio.CancelledError as e:
+            if feed is not None:
+                await feed.finish(error=e)
+            raise
+        except Exception as e:
+            if feed is not None:
+                await feed.finish(error=e)
+            await events.put(StageDone(index, e))
+            return
+        
+        if feed is not None:
+            await feed.finish("\n\n".join(finals) if finals else None)
+        if following is not None and not started_next:
+            launch(index + 1, feed)
+        await events.put(StageDone(index))
 
 class TaskParallelizer(ParallelAgent):
     """Executes tasks in parallel."""
@@ -23,11 +108,32 @@ class TaskLooper(LoopAgent):
         super().__init__(name=name, sub_agents=sub_agents, max_iterations=max_iterations)
 
 class WorkflowOrchestrator(BaseAIAgent):
-    """Orchestrates complex workflows using multiple agents."""
+    """Orchestrates complex workflows using multiple agents.
     
-    def __init__(self, name: str, workflows: dict):
+    Requests are routed locally by a ``WorkflowRouter``; the model is only
+    asked when the router is not confident, and its answer must name one
+    of the workflows. By default the router learns from each workflow's
+    key and description.
+    """
+    
+    workflows: dict = {}
+    router: Any = None
+    
+    def __init__(
+        self,
+        name: str,
+        workflows: dict,
+        exemplars: Optional[Dict[str, List[str]]] = None,
+        rules: Optional[List[Tuple[str, str]]] = None
+    ):
         super().__init__(name=name)
         self.workflows = workflows
+        if exemplars is None:
+            exemplars = {
+                key: [key.replace("_", " "), getattr(workflow, "description", "") or ""]
+                for key, workflow in workflows.items()
+            }
+        self.router = WorkflowRouter(workflows.keys(), exemplars=exemplars, rules=rules, fallback=self._ask_model)
         
     async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
         """Execute the appropriate workflow based on context."""
@@ -43,9 +149,15 @@ class WorkflowOrchestrator(BaseAIAgent):
                 content=f"No workflow found for: {workflow_name}"
             )
             
-    async def _determine_workflow(self, ctx: InvocationContext) -> str:
+    async def _determine_workflow(self, ctx: InvocationContext) -> Optional[str]:
         """Determine which workflow to execute based on context."""
+        decision = await self.router.route(ctx.message.content)
+        return decision["workflow"]
+    
+    async def _ask_model(self, request: str) -> str:
+        """Ask the model to pick a workflow; only used when local routing is unsure."""
         response = await self.model_instance.generate_content_async(
-            f"Based on this request, which workflow should I use? Options: {list(self.workflows.keys())}\n\nRequest: {ctx.message.content}"
+            f"Based on this request, which workflow should I use? Options: {list(self.workflows.keys())}\n"
+            f"Answer with exactly one option.\n\nRequest: {request}"
         )
         return response.text.strip()
\ No newline at end of file
@@ -1,50 +1,116 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Request
+from sse_starlette.sse import EventSourceResponse
+from typing import AsyncGenerator, List, Dict, Any
+import json
 from ..services.ai import CodestralService, HuggingFaceService
 from ..schemas.ai import CompletionRequest, ChatRequest, CompletionResponse, ChatResponse
+from ..services.ai.model_registry import InferenceBusyError, inference_executor
+from ..services.ai.prefix_cache import prefix_cache
+from ..services.ai.response_cache import CachedAIService, response_cache
+from app.infrastructure.http_pool import ai_http_pool
 
 router = APIRouter()
 
+# Services hold no per-request state (HTTP pool and model weights are shared), so one instance per process is enough
+_codestral_service = CachedAIService(CodestralService(), response_cache)
+_huggingface_service = CachedAIService(HuggingFaceService(), response_cache)
+
 async def get_ai_service(service_type: str = "codestral"):
     """Dependency to get the appropriate AI service."""
     if service_type.lower() == "codestral":
-        return CodestralService()
+        return _codestral_service
     elif service_type.lower() == "huggingface":
-        return HuggingFaceService()
+        return _huggingface_service
     else:
         raise HTTPException(status_code=400, detail="Invalid service type")
 
+async def stream_events(http_request: Request, chunks: AsyncGenerator) -> AsyncGenerator[dict, None]:
+    """Relay model chunks as SSE events, stopping generation when the client leaves."""
+    try:
+        async for chunk in chunks:
+            if await http_request.is_disconnected():
+                break
+            yield {"event": "message", "data": json.dumps(chunk)}
+        yield {"event": "done", "data": "[DONE]"}
+    except Exception as e:
+        yield {"event": "error", "data": json.dumps({"detail": str(e)})}
+    finally:
+        # Closing the service generator cancels the upstream request or model thread
+        await chunks.aclose()
+
 @router.post("/completion", response_model=CompletionResponse)
 async def generate_completion(
     request: CompletionRequest,
+    http_request: Request,
     service_type: str = "codestral",
     service: Any = Depends(get_ai_service)
 ):
     """Generate code completion."""
+    if request.stream:
+        return EventSourceResponse(stream_events(http_request, service.stream_completion(
+            prompt=request.prompt,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            stop=request.stop
+        )))
     try:
         response = await service.generate_completion(
             prompt=request.prompt,
             max_tokens=request.max_tokens,
             temperature=request.temperature,
-            stop=request.stop
+            stop=request.stop,
+            use_cache=request.cache
         )
         return CompletionResponse(**response)
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/chat", response_model=ChatResponse)
 async def generate_chat_response(
     request: ChatRequest,
+    http_request: Request,
     service_type: str = "codestral",
     service: Any = Depends(get_ai_service)
 ):
     """Generate chat response."""
+    messages = [message.dict() for message in request.messages]
+    if request.stream:
+        return EventSourceResponse(stream_events(http_request, service.stream_chat_response(
+            messages=messages,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature
+        )))
     try:
         response = await service.generate_chat_response(
-            messages=request.messages,
+            messages=messages,
             max_tokens=request.max_tokens,
-            temperature=request.temperature
+            temperature=request.temperature,
+            use_cache=request.cache
         )
         return ChatResponse(**response)
+    except InferenceBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/pool/stats")
+async def get_pool_stats() -> Dict[str, int]:
+    """Report connection pool usage for the AI provider HTTP client."""
+    return ai_http_pool.stats()
+
+@router.get("/inference/stats")
+async def get_inference_stats() -> Dict[str, int]:
+    """Report occupancy of the local model inference executor."""
+    return inference_executor.stats()
+
+@router.get("/prefix-cache/stats")
+async def get_prefix_cache_stats() -> Dict[str, Any]:
+    """Report hit/miss counters and memory use of the chat prefix KV cache."""
+    return prefix_cache.stats()
+
+@router.get("/cache/stats")
+async def get_response_cache_stats() -> Dict[str, Any]:
+    """Report hit rates of the model response cache."""
+    return response_cache.stats()
\ No newline at end of file
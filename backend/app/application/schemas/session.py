@@ -8,6 +8,11 @@ class MessageCreate(BaseModel):
 
 class MessageResponse(MessageCreate):
     timestamp: datetime
+    id: Optional[str] = None
+
+class MessagePage(BaseModel):
+    messages: List[MessageResponse]
+    next_cursor: Optional[str] = None
 
 class SessionCreate(BaseModel):
     name: str
@@ -15,6 +20,7 @@ class SessionCreate(BaseModel):
 class SessionResponse(SessionCreate):
     id: str
     created_at: datetime
-    messages: List[MessageResponse]
     active: bool
-    user_id: str
\ No newline at end of file
+    user_id: str
+    message_count: int = 0
+    last_message: Optional[MessageResponse] = None
\ No newline at end of file
@@ -3,15 +3,39 @@ from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
+from pymongo.errors import DuplicateKeyError
 from app.domain.models.entities import User
+from app.domain.models.ids import new_id
 from app.application.schemas.auth import UserCreate, UserLogin, Token
+from app.infrastructure.cache import TTLCache
 from app.main import db
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
 import os
 
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+
+# bcrypt costs tens of milliseconds of CPU; keep it on a small pool instead of the event loop
+_password_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("AUTH_HASH_WORKERS", 2)),
+    thread_name_prefix="bcrypt"
+)
+
+# Shared by every AuthService instance so all routers see the same entries and invalidations
+_token_cache = TTLCache(
+    max_size=int(os.getenv("AUTH_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", 30))
+)
+_user_cache = TTLCache(
+    max_size=int(os.getenv("AUTH_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", 30))
+)
+
 class AuthService:
     def __init__(self):
         self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-        self.oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+        self.oauth2_scheme = oauth2_scheme
         self.SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
         self.ALGORITHM = "HS256"
         self.ACCESS_TOKEN_EXPIRE_MINUTES = 30
@@ -22,6 +46,22 @@ class AuthService:
     def get_password_hash(self, password: str) -> str:
         return self.pwd_context.hash(password)
 
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, self.verify_password, plain_password, hashed_password)
+
+    async def get_password_hash_async(self, password: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_password_executor, self.get_password_hash, password)
+
+    def invalidate_user(self, username: str):
+        """Drop the cached user record, e.g. after a password change or deactivation."""
+        _user_cache.pop(username)
+
+    def invalidate_token(self, token: str):
+        """Drop a cached decoded token, e.g. on logout."""
+        _token_cache.pop(token)
+
     async def create_access_token(self, data: dict) -> Token:
         to_encode = data.copy()
         expires_at = datetime.utcnow() + timedelta(minutes=self.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -35,14 +75,18 @@ class AuthService:
             raise HTTPException(status_code=400, detail="Username already registered")
         
         # Create new user
-        hashed_password = self.get_password_hash(user.password)
+        hashed_password = await self.get_password_hash_async(user.password)
         user_data = User(
             username=user.username,
             hashed_password=hashed_password,
-            id=str(await db.users.count_documents({}))
+            id=new_id()
         )
         
-        await db.users.insert_one(user_data.dict())
+        try:
+            await db.users.insert_one(user_data.dict())
+        except DuplicateKeyError:
+            # Lost a race with a concurrent registration of the same username
+            raise HTTPException(status_code=400, detail="Username already registered")
         
         # Create access token
         return await self.create_access_token({"sub": user.username})
@@ -54,31 +98,45 @@ class AuthService:
             raise HTTPException(status_code=400, detail="Incorrect username or password")
         
         # Verify password
-        if not self.verify_password(user.password, db_user["hashed_password"]):
+        if not await self.verify_password_async(user.password, db_user["hashed_password"]):
             raise HTTPException(status_code=400, detail="Incorrect username or password")
         
         # Create access token
         return await self.create_access_token({"sub": user.username})
 
+    async def get_current_token(self, token: str = Depends(oauth2_scheme)) -> str:
+        return token
+
     async def get_current_user(self, token: str = Depends(oauth2_scheme)) -> User:
         credentials_exception = HTTPException(
             status_code=401,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        try:
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            username: str = payload.get("sub")
-            if username is None:
+        username = _token_cache.get(token)
+        if username is None:
+            try:
+                payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+                username: str = payload.get("sub")
+                if username is None:
+                    raise credentials_exception
+            except JWTError:
                 raise credentials_exception
-        except JWTError:
-            raise credentials_exception
-            
-        user = await db.users.find_one({"username": username})
+            # Never serve a token from the cache past its own expiry; tokens without one are not cached
+            expires = payload.get("exp")
+            if expires is not None:
+                _token_cache.set(token, username, ttl=min(_token_cache.ttl, expires - time.time()))
+
+        user = _user_cache.get(username)
         if user is None:
-            raise credentials_exception
-            
-        return User(**user)
+            db_user = await db.users.find_one({"username": username})
+            if db_user is None:
+                raise credentials_exception
+            user = User(**db_user)
+            _user_cache.set(username, user)
+
+        # Callers may modify the user they get; keep the cached one intact
+        return user.copy()
 
     async def refresh_token(self, current_token: str) -> Token:
         try:
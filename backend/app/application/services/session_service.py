@@ -1,16 +1,26 @@
 from fastapi import HTTPException
+from bson import ObjectId
+from bson.errors import InvalidId
 from app.domain.models.entities import Session, Message
+from app.domain.models.ids import new_id
 from app.application.schemas.session import SessionCreate, MessageCreate
+from app.infrastructure.pubsub import PubSubHub
 from app.main import db, redis_client
-import json
-import asyncio
+import os
 from datetime import datetime
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
+
+# One Redis subscriber per worker process, shared by every open session stream
+session_hub = PubSubHub(
+    redis_client,
+    queue_size=int(os.getenv("SESSION_STREAM_QUEUE_SIZE", 256)),
+    overflow=os.getenv("SESSION_STREAM_OVERFLOW", "drop_oldest")
+)
 
 class SessionService:
     async def create_session(self, session: SessionCreate, user_id: str) -> Session:
         session_data = Session(
-            id=str(await db.sessions.count_documents({})),
+            id=new_id(),
             name=session.name,
             user_id=user_id
         )
@@ -18,46 +28,87 @@ class SessionService:
         return session_data
 
     async def list_sessions(self, user_id: str):
-        cursor = db.sessions.find({"user_id": user_id})
+        # Summaries only: leave out transcripts still embedded in older session documents
+        cursor = db.sessions.find({"user_id": user_id}, {"_id": 0, "messages": 0})
         sessions = []
         async for session in cursor:
             sessions.append(Session(**session))
         return sessions
 
     async def add_message(self, session_id: str, message: MessageCreate, user_id: str):
-        session = await db.sessions.find_one({"id": session_id, "user_id": user_id})
+        session = await db.sessions.find_one({"id": session_id, "user_id": user_id}, {"_id": 1})
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
 
         message_data = Message(
             role=message.role,
-            content=message.content
+            content=message.content,
+            session_id=session_id
         )
 
+        result = await db.messages.insert_one(message_data.dict(exclude={"id"}))
+        message_data.id = str(result.inserted_id)
+
         await db.sessions.update_one(
             {"id": session_id},
-            {"$push": {"messages": message_data.dict()}}
+            {
+                "$inc": {"message_count": 1},
+                "$set": {"last_message": message_data.dict()}
+            }
         )
 
         # Publish message to Redis for SSE
         await redis_client.publish(
             f"session:{session_id}",
-            json.dumps(message_data.dict())
+            message_data.json()
         )
         return message_data
 
-    async def stream_session(self, session_id: str, user_id: str) -> AsyncGenerator:
-        pubsub = redis_client.pubsub()
-        await pubsub.subscribe(f"session:{session_id}")
+    async def list_messages(
+        self,
+        session_id: str,
+        user_id: str,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+        limit: int = 50
+    ) -> dict:
+        """Return one page of a session's history in chronological order.
+
+        Without a cursor the newest ``limit`` messages are returned and
+        ``next_cursor`` points at older ones (pass it as ``before``). With
+        ``after`` the page continues forward from that message, which lets
+        a reconnecting stream catch up on what it missed.
+        """
+        session = await db.sessions.find_one({"id": session_id, "user_id": user_id}, {"_id": 1})
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
 
+        query = {"session_id": session_id}
         try:
-            while True:
-                message = await pubsub.get_message()
-                if message and message["type"] == "message":
-                    yield {
-                        "event": "message",
-                        "data": message["data"].decode()
-                    }
-                await asyncio.sleep(0.1)
-        finally:
-            await pubsub.unsubscribe(f"session:{session_id}")
\ No newline at end of file
+            if after:
+                query["_id"] = {"$gt": ObjectId(after)}
+            elif before:
+                query["_id"] = {"$lt": ObjectId(before)}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        direction = 1 if after else -1
+        cursor = db.messages.find(query).sort("_id", direction).limit(limit + 1)
+        docs = await cursor.to_list(length=limit + 1)
+        has_more = len(docs) > limit
+        messages = [Message(id=str(doc.pop("_id")), **doc) for doc in docs[:limit]]
+        if direction == -1:
+            messages.reverse()
+
+        next_cursor = None
+        if has_more and messages:
+            next_cursor = messages[-1].id if after else messages[0].id
+        return {"messages": messages, "next_cursor": next_cursor}
+
+    async def stream_session(self, session_id: str, user_id: str) -> AsyncGenerator:
+        async with session_hub.subscribe(f"session:{session_id}") as subscription:
+            async for data in subscription:
+                yield {
+                    "event": "message",
+                    "data": data.decode()
+                }
\ No newline at end of file
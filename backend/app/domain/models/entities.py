@@ -1,19 +1,22 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional
 from datetime import datetime
 
 class Message(BaseModel):
     role: str
     content: str
     timestamp: datetime = datetime.now()
+    id: Optional[str] = None
+    session_id: Optional[str] = None
 
 class Session(BaseModel):
     id: str
     name: str
     created_at: datetime = datetime.now()
-    messages: List[Message] = []
     active: bool = True
     user_id: Optional[str] = None
+    message_count: int = 0
+    last_message: Optional[Message] = None
 
 class User(BaseModel):
     id: str
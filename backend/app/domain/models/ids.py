@@ -0,0 +1,17 @@
+import os
+import time
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+def new_id() -> str:
+    """Generate a ULID: 48-bit millisecond timestamp plus 80 random bits.
+
+    IDs are unique without coordinating with the database, cost the same
+    regardless of collection size, and sort lexicographically by creation time.
+    """
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), "big")
+    chars = []
+    for _ in range(26):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
\ No newline at end of file
@@ -0,0 +1,121 @@
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any, Dict, List
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import BulkWriteError, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Every index the application relies on, by collection
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "sessions": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_sessions"),
+    ],
+    "messages": [
+        IndexModel([("session_id", ASCENDING), ("_id", ASCENDING)], name="session_history"),
+    ],
+}
+
+DUPLICATE_KEY = 11000
+
+def legacy_message_id(session_id: str, timestamp: Any, position: int) -> ObjectId:
+    """Stable id for a message moved out of an embedded session transcript.
+
+    The leading timestamp keeps migrated history ahead of anything posted
+    since, and the session hash plus position keep the id identical when a
+    migration is repeated, so re-runs never insert duplicates.
+    """
+    if not isinstance(timestamp, datetime):
+        timestamp = datetime(1970, 1, 1)
+    prefix = ObjectId.from_datetime(timestamp).binary[:4]
+    salt = hashlib.sha1(session_id.encode()).digest()[:5]
+    return ObjectId(prefix + salt + position.to_bytes(3, "big"))
+
+class SchemaManager:
+    """Creates the declared indexes and applies one-off data migrations at startup.
+
+    createIndexes is a no-op for indexes that already exist with the same
+    definition, and completed migrations are recorded in
+    ``schema_migrations``, so this is safe to run on every boot of every
+    worker.
+    """
+
+    def __init__(self, db, indexes: Dict[str, List[IndexModel]] = INDEXES):
+        self.db = db
+        self.indexes = indexes
+
+    async def ensure_indexes(self) -> Dict[str, List[str]]:
+        """Create missing indexes and return the names ensured per collection."""
+        ensured = {}
+        for collection, models in self.indexes.items():
+            ensured[collection] = []
+            for model in models:
+                try:
+                    name = await self.db[collection].create_indexes([model])
+                    ensured[collection].extend(name)
+                except OperationFailure:
+                    # e.g. duplicate ids left by the old count-based allocator; keep serving
+                    logger.error(
+                        "Could not create index %s on %s",
+                        model.document["name"], collection, exc_info=True
+                    )
+        return ensured
+
+    async def migrate_embedded_messages(self) -> int:
+        """Move transcripts embedded in older session documents into ``messages``.
+
+        Returns the number of sessions migrated. Every step is idempotent,
+        so workers booting together or a run interrupted halfway are safe.
+        """
+        name = "embedded_messages"
+        if await self.db.schema_migrations.find_one({"_id": name}):
+            return 0
+        migrated = 0
+        cursor = self.db.sessions.find({"messages": {"$exists": True}}, {"_id": 0, "id": 1, "messages": 1})
+        async for session in cursor:
+            await self._migrate_session_messages(session["id"], session.get("messages") or [])
+            migrated += 1
+        await self.db.schema_migrations.update_one(
+            {"_id": name},
+            {"$set": {"applied_at": datetime.utcnow(), "sessions": migrated}},
+            upsert=True
+        )
+        if migrated:
+            logger.info("Moved embedded messages of %d sessions into the messages collection", migrated)
+        return migrated
+
+    async def _migrate_session_messages(self, session_id: str, messages: List[dict]):
+        docs = []
+        for position, message in enumerate(messages):
+            doc = {key: value for key, value in message.items() if key != "id"}
+            doc["session_id"] = session_id
+            doc["_id"] = legacy_message_id(session_id, doc.get("timestamp"), position)
+            docs.append(doc)
+        if docs:
+            try:
+                await self.db.messages.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                # Already moved by an earlier or concurrent run
+                if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                    raise
+
+        count = await self.db.messages.count_documents({"session_id": session_id})
+        await self.db.sessions.update_one(
+            {"id": session_id},
+            {"$set": {"message_count": count}, "$unset": {"messages": ""}}
+        )
+        if docs:
+            last = dict(docs[-1])
+            last["id"] = str(last.pop("_id"))
+            # Only fill in a summary nothing newer has written yet
+            await self.db.sessions.update_one(
+                {"id": session_id, "last_message": None},
+                {"$set": {"last_message": last}}
+            )
\ No newline at end of file
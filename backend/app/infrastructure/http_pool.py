@@ -0,0 +1,123 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+import aiohttp
+
+class HTTPPool:
+    """Process-wide pooled aiohttp client with keep-alive connections.
+
+    One instance is shared by every caller in the worker process, so requests
+    reuse warm TCP/TLS connections instead of paying DNS, connect and
+    handshake costs on every call. Settings are read from environment
+    variables named ``<env_prefix>_*``.
+    """
+
+    def __init__(self, env_prefix: str = "AI_HTTP", auto_decompress: bool = True):
+        self.env_prefix = env_prefix
+        self.auto_decompress = auto_decompress
+        self.limit = int(self._env("POOL_SIZE", 100))
+        self.limit_per_host = int(self._env("POOL_PER_HOST", 20))
+        self.keepalive_timeout = float(self._env("KEEPALIVE", 30))
+        self.connect_timeout = float(self._env("CONNECT_TIMEOUT", 5))
+        self.read_timeout = float(self._env("READ_TIMEOUT", 60))
+        self.total_timeout = float(self._env("TOTAL_TIMEOUT", os.getenv("AI_SERVICE_TIMEOUT", 300)))
+        self.gzip_min_bytes = int(self._env("GZIP_MIN_BYTES", 8192))
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _env(self, name: str, default: Any) -> Any:
+        return os.getenv(f"{self.env_prefix}_{name}", default)
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout(),
+                auto_decompress=self.auto_decompress
+            )
+        return self._session
+
+    def timeout(
+        self,
+        connect: Optional[float] = None,
+        read: Optional[float] = None,
+        total: Optional[float] = None
+    ) -> aiohttp.ClientTimeout:
+        """Build a timeout, falling back to the pool defaults."""
+        return aiohttp.ClientTimeout(
+            total=total if total is not None else self.total_timeout,
+            sock_connect=connect if connect is not None else self.connect_timeout,
+            sock_read=read if read is not None else self.read_timeout
+        )
+
+    def stream_timeout(self) -> aiohttp.ClientTimeout:
+        """Timeout for streamed responses: no total limit, only per-read gaps."""
+        return aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=self.connect_timeout,
+            sock_read=self.read_timeout
+        )
+
+    def encode_json(self, payload: Dict[str, Any]) -> Tuple[bytes, Dict[str, str]]:
+        """Serialize a JSON body, gzip-compressing it when it is large."""
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        headers = {"Content-Type": "application/json"}
+        if self.gzip_min_bytes > 0 and len(body) >= self.gzip_min_bytes:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        return body, headers
+
+    def post_json(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[aiohttp.ClientTimeout] = None
+    ):
+        """POST a JSON payload through the pool; use as an async context manager."""
+        body, body_headers = self.encode_json(payload)
+        options = {"timeout": timeout} if timeout is not None else {}
+        return self.session.post(
+            url,
+            data=body,
+            headers={**(headers or {}), **body_headers},
+            **options
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Report open, idle and waiting connection counts for pool sizing."""
+        idle = in_use = waiting = 0
+        if self._session is not None and not self._session.closed:
+            connector = self._session.connector
+            idle = sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+            in_use = len(getattr(connector, "_acquired", ()))
+            waiting = sum(len(waiters) for waiters in getattr(connector, "_waiters", {}).values())
+        return {
+            "open": idle + in_use,
+            "in_use": in_use,
+            "idle": idle,
+            "waiting": waiting,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host
+        }
+
+    async def close(self):
+        """Close the session and all pooled connections."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+# Shared pool for outbound AI provider calls, closed on application shutdown
+ai_http_pool = HTTPPool("AI_HTTP")
+
+# Shared pool for proxied sandbox calls; bodies are relayed still encoded, so no decompression
+sandbox_http_pool = HTTPPool("SANDBOX_HTTP", auto_decompress=False)
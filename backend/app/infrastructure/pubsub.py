@@ -0,0 +1,151 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_CLOSED = object()
+
+class Subscription:
+    """One listener's bounded queue of messages from a channel."""
+
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, data: bytes, overflow: str):
+        """Deliver a message, applying the overflow policy when the queue is full.
+
+        ``drop_oldest`` discards the oldest queued message to make room;
+        ``disconnect`` ends the subscription so the client reconnects and
+        catches up from history instead of reading a gapped stream.
+        """
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if overflow == "disconnect":
+                self.close()
+            else:
+                self.queue.get_nowait()
+                self.queue.put_nowait(data)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        data = await self.queue.get()
+        if data is _CLOSED:
+            raise StopAsyncIteration
+        return data
+
+class PubSubHub:
+    """Multiplexes every channel subscription of a worker over one Redis connection.
+
+    A single reader task blocks on the pubsub connection and routes each
+    message to the bounded queues of that channel's listeners. A channel is
+    subscribed when its first listener arrives and unsubscribed when its
+    last listener leaves.
+    """
+
+    def __init__(self, redis, queue_size: int = 256, overflow: str = "drop_oldest"):
+        self.redis = redis
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self._pubsub = None
+        self._listeners: Dict[str, Set[Subscription]] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str) -> AsyncIterator[Subscription]:
+        """Listen to a channel for the duration of the context."""
+        subscription = await self._add(channel)
+        try:
+            yield subscription
+        finally:
+            await self._remove(subscription)
+
+    async def _add(self, channel: str) -> Subscription:
+        subscription = Subscription(channel, self.queue_size)
+        async with self._lock:
+            listeners = self._listeners.get(channel)
+            if listeners is None:
+                if self._pubsub is None:
+                    self._pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                await self._pubsub.subscribe(channel)
+                listeners = self._listeners[channel] = set()
+            listeners.add(subscription)
+            if self._reader is None:
+                self._reader = asyncio.create_task(self._read_loop())
+        return subscription
+
+    async def _remove(self, subscription: Subscription):
+        subscription.close()
+        async with self._lock:
+            listeners = self._listeners.get(subscription.channel)
+            if listeners is None:
+                return
+            listeners.discard(subscription)
+            if not listeners:
+                del self._listeners[subscription.channel]
+                await self._pubsub.unsubscribe(subscription.channel)
+
+    async def _read_loop(self):
+        """Block on the shared connection and fan messages out to listeners."""
+        while True:
+            try:
+                # listen() returns once the connection has no subscribed channels left
+                async for message in self._pubsub.listen():
+                    if message["type"] == "message":
+                        self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Redis pubsub reader failed, retrying", exc_info=True)
+                await asyncio.sleep(1)
+            async with self._lock:
+                if not self._listeners:
+                    self._reader = None
+                    return
+
+    def _dispatch(self, channel, data: bytes):
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        for subscription in list(self._listeners.get(channel, ())):
+            subscription.put(data, self.overflow)
+
+    def stats(self) -> Dict[str, int]:
+        listeners = [s for subs in self._listeners.values() for s in subs]
+        return {
+            "channels": len(self._listeners),
+            "listeners": len(listeners),
+            "queued": sum(s.queue.qsize() for s in listeners),
+            "dropped": sum(s.dropped for s in listeners)
+        }
+
+    async def close(self):
+        """Stop the reader, end all subscriptions and release the connection."""
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        for listeners in self._listeners.values():
+            for subscription in listeners:
+                subscription.close()
+        self._listeners.clear()
+        if self._pubsub is not None:
+            await self._pubsub.close()
+            self._pubsub = None
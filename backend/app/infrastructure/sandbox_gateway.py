@@ -0,0 +1,235 @@
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+import aiohttp
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from app.infrastructure.http_pool import HTTPPool, sandbox_http_pool
+
+# Upper bounds in milliseconds; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, float("inf"))
+
+# Headers that describe one hop of the connection and must not be forwarded
+HOP_BY_HOP = frozenset((
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host"
+))
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with cheap percentile estimates."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of observations."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.sum_ms / self.count if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ms,
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(self.buckets, self.counts)
+            }
+        }
+
+class RouteMetrics:
+    """Latency to response headers and to the end of the body, plus status counts, for one route."""
+
+    def __init__(self):
+        self.headers = LatencyHistogram()
+        self.complete = LatencyHistogram()
+        self.statuses: Dict[str, int] = {}
+        self.in_flight = 0
+
+    def count_status(self, status: int):
+        key = f"{status // 100}xx"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "statuses": dict(self.statuses),
+            "headers": self.headers.snapshot(),
+            "complete": self.complete.snapshot()
+        }
+
+class _Relay:
+    """Streams one upstream response body and releases its connection exactly once."""
+
+    def __init__(self, upstream: aiohttp.ClientResponse, on_close: Callable[[int], None]):
+        self.upstream = upstream
+        self.on_close = on_close
+        self.closed = False
+
+    async def body(self) -> AsyncIterator[bytes]:
+        status = self.upstream.status
+        try:
+            async for chunk in self.upstream.content.iter_any():
+                yield chunk
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            # Headers are already sent; all that is left is to cut the body short
+            status = 502
+        except asyncio.CancelledError:
+            # The client went away mid-stream
+            status = 499
+            raise
+        finally:
+            self.close(status)
+
+    def close(self, status: int):
+        if self.closed:
+            return
+        self.closed = True
+        self.upstream.release()
+        self.on_close(status)
+
+class SandboxGateway:
+    """Forwards backend routes to the sandbox service over a pooled keep-alive client.
+
+    Request and response bodies are streamed chunk by chunk in both
+    directions, so file downloads, NDJSON results and SSE output pass
+    through with constant memory and reach the client as soon as the
+    sandbox produces them. Each route has its own connect, read and total
+    timeouts and its own latency histograms.
+    """
+
+    def __init__(self, base_url: str, pool: HTTPPool):
+        self.base_url = base_url.rstrip("/")
+        self.pool = pool
+        self.metrics: Dict[str, RouteMetrics] = {}
+        self.timeouts: Dict[str, aiohttp.ClientTimeout] = {}
+        # e.g. {"POST /api/v1/shell/execute": {"read": 7200}}; 0 means no limit
+        self._overrides: Dict[str, dict] = json.loads(os.getenv("SANDBOX_ROUTE_TIMEOUTS", "{}"))
+
+    def register(
+        self,
+        route: str,
+        connect: Optional[float] = None,
+        read: Optional[float] = None,
+        total: Optional[float] = None
+    ):
+        """Set a route's timeouts; None falls back to the pool default, 0 disables the limit."""
+        settings = {"connect": connect, "read": read, "total": total, **self._overrides.get(route, {})}
+        defaults = {"connect": self.pool.connect_timeout, "read": self.pool.read_timeout, "total": self.pool.total_timeout}
+        values = {
+            name: (defaults[name] if value is None else value or None)
+            for name, value in settings.items()
+        }
+        self.timeouts[route] = aiohttp.ClientTimeout(
+            total=values["total"],
+            sock_connect=values["connect"],
+            sock_read=values["read"]
+        )
+        self.metrics.setdefault(route, RouteMetrics())
+
+    async def forward(self, request: Request, route: str) -> StreamingResponse:
+        """Relay ``request`` to the same path on the sandbox and stream the answer back."""
+        metrics = self.metrics.setdefault(route, RouteMetrics())
+        url = self.base_url + request.url.path
+        if request.url.query:
+            url += "?" + request.url.query
+        headers = {
+            name: value for name, value in request.headers.items()
+            if name.lower() not in HOP_BY_HOP and name.lower() != "authorization"
+        }
+        if request.client is not None:
+            headers["X-Forwarded-For"] = request.client.host
+        has_body = request.method in ("POST", "PUT", "PATCH") or "content-length" in request.headers
+
+        started = time.perf_counter()
+        metrics.in_flight += 1
+        try:
+            upstream = await self.pool.session.request(
+                request.method,
+                url,
+                headers=headers,
+                # An async iterator is sent with the client's Content-Length, or chunked without one
+                data=self._request_body(request) if has_body else None,
+                timeout=self.timeouts.get(route) or self.pool.timeout(),
+                allow_redirects=False
+            )
+        except asyncio.TimeoutError:
+            self._finish(metrics, started, 504)
+            raise HTTPException(status_code=504, detail="Sandbox did not respond in time")
+        except aiohttp.ClientError as e:
+            self._finish(metrics, started, 502)
+            raise HTTPException(status_code=502, detail=f"Sandbox unavailable: {e}")
+        metrics.headers.observe((time.perf_counter() - started) * 1000)
+
+        response_headers = {
+            name: value for name, value in upstream.headers.items()
+            if name.lower() not in HOP_BY_HOP
+        }
+        relay = _Relay(upstream, lambda status: self._finish(metrics, started, status))
+        return StreamingResponse(
+            relay.body(),
+            status_code=upstream.status,
+            headers=response_headers,
+            # Runs even if the client disconnects before the body starts, so the connection is never leaked
+            background=BackgroundTask(relay.close, 499)
+        )
+
+    async def _request_body(self, request: Request) -> AsyncIterator[bytes]:
+        async for chunk in request.stream():
+            if chunk:
+                yield chunk
+
+    def _finish(self, metrics: RouteMetrics, started: float, status: int):
+        metrics.in_flight -= 1
+        metrics.count_status(status)
+        metrics.complete.observe((time.perf_counter() - started) * 1000)
+
+    def add_routes(self, router: APIRouter, prefix: str, routes: List[tuple]):
+        """Register ``(method, path, connect, read, total)`` proxy routes on ``router``.
+
+        ``prefix`` is where the router is mounted, which is also the
+        sandbox's prefix for the same routes. Routes are matched in order,
+        so fixed paths must come before parameterised ones.
+        """
+        for method, path, connect, read, total in routes:
+            route = f"{method} {prefix}{path}"
+            self.register(route, connect, read, total)
+            router.add_api_route(path, self._endpoint(route), methods=[method], include_in_schema=True, name=route)
+
+    def _endpoint(self, route: str):
+        async def endpoint(request: Request):
+            return await self.forward(request, route)
+        return endpoint
+
+    def stats(self) -> dict:
+        return {
+            "pool": self.pool.stats(),
+            "routes": {route: metrics.snapshot() for route, metrics in self.metrics.items()}
+        }
+
+# Shared gateway used by the shell, file and supervisor proxy routers
+sandbox_gateway = SandboxGateway(os.getenv("SANDBOX_URL", "http://localhost:8001"), sandbox_http_pool)
\ No newline at end of file
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from app.application.services.auth_service import AuthService
+from app.infrastructure.sandbox_gateway import sandbox_gateway
+
+auth_service = AuthService()
+router = APIRouter(dependencies=[Depends(auth_service.get_current_user)])
+
+# (method, path, connect, read, total): None uses the SANDBOX_HTTP_* default, 0 means no limit.
+# Downloads and grep results are streamed, so only the gap between chunks is bounded.
+sandbox_gateway.add_routes(router, "/api/v1/file", [
+    ("POST", "/read", None, None, None),
+    ("GET", "/download", None, None, 0),
+    ("POST", "/write", None, None, None),
+    ("POST", "/search", None, None, None),
+    ("POST", "/grep", None, None, 0),
+    ("GET", "/index/stats", None, 5, 10),
+    ("POST", "/replace", None, None, None),
+    ("POST", "/edit", None, None, None)
+])
\ No newline at end of file
@@ -0,0 +1,11 @@
+from fastapi import APIRouter, Depends
+from app.application.services.auth_service import AuthService
+from app.infrastructure.sandbox_gateway import sandbox_gateway
+
+router = APIRouter()
+auth_service = AuthService()
+
+@router.get("/metrics")
+async def get_metrics(user = Depends(auth_service.get_current_user)):
+    """Per-route latency histograms and connection pool usage for proxied sandbox calls."""
+    return sandbox_gateway.stats()
\ No newline at end of file
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import List, Optional
 from app.application.services.session_service import SessionService
-from app.application.schemas.session import SessionCreate, SessionResponse, MessageCreate
+from app.application.schemas.session import SessionCreate, SessionResponse, MessageCreate, MessagePage
 from app.application.services.auth_service import AuthService
 from sse_starlette.sse import EventSourceResponse
 
@@ -35,4 +35,14 @@ async def add_message(
     message: MessageCreate,
     user = Depends(auth_service.get_current_user)
 ):
-    return await session_service.add_message(session_id, message, user.id)
\ No newline at end of file
+    return await session_service.add_message(session_id, message, user.id)
+
+@router.get("/{session_id}/messages", response_model=MessagePage)
+async def list_messages(
+    session_id: str,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    user = Depends(auth_service.get_current_user)
+):
+    return await session_service.list_messages(session_id, user.id, before=before, after=after, limit=limit)
\ No newline at end of file
@@ -0,0 +1,29 @@
+import os
+from fastapi import APIRouter, Depends
+from app.application.services.auth_service import AuthService
+from app.infrastructure.sandbox_gateway import sandbox_gateway
+
+auth_service = AuthService()
+router = APIRouter(dependencies=[Depends(auth_service.get_current_user)])
+
+# Commands may run for the sandbox's full TIMEOUT_MINUTES before answering; both sides read the same setting
+COMMAND_SECONDS = float(os.getenv("TIMEOUT_MINUTES", 60)) * 60 + 100
+
+# (method, path, connect, read, total): None uses the SANDBOX_HTTP_* default, 0 means no limit.
+# Fixed paths come before /{process_id} ones, as in the sandbox router.
+sandbox_gateway.add_routes(router, "/api/v1/shell", [
+    ("POST", "/execute", None, COMMAND_SECONDS, COMMAND_SECONDS),
+    ("POST", "/start", None, None, None),
+    ("POST", "/batch", None, COMMAND_SECONDS, 0),
+    ("GET", "/stats", None, 5, 10),
+    ("POST", "/sessions", None, None, None),
+    ("GET", "/sessions", None, 5, 10),
+    ("POST", "/sessions/{session_id}/execute", None, COMMAND_SECONDS, COMMAND_SECONDS),
+    ("POST", "/sessions/{session_id}/input", None, None, None),
+    ("DELETE", "/sessions/{session_id}", None, None, None),
+    ("GET", "/{process_id}/stream", None, 0, 0),
+    ("GET", "/{process_id}/output", None, None, None),
+    ("GET", "/{process_id}/status", None, 5, 10),
+    ("POST", "/{process_id}/input", None, None, None),
+    ("DELETE", "/{process_id}", None, None, None)
+])
\ No newline at end of file
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from app.application.services.auth_service import AuthService
+from app.infrastructure.sandbox_gateway import sandbox_gateway
+
+auth_service = AuthService()
+router = APIRouter(dependencies=[Depends(auth_service.get_current_user)])
+
+# (method, path, connect, read, total): None uses the SANDBOX_HTTP_* default, 0 means no limit.
+# /events is a long-lived SSE stream with keepalives every 15s.
+sandbox_gateway.add_routes(router, "/api/v1/supervisor", [
+    ("GET", "/status", None, 5, 10),
+    ("GET", "/events", None, 60, 0),
+    ("GET", "/operations/{operation_id}", None, 5, 10),
+    ("GET", "/{service_name}/history", None, 5, 10),
+    ("POST", "/{service_name}/start", None, 10, 15),
+    ("POST", "/{service_name}/stop", None, 10, 15),
+    ("POST", "/{service_name}/restart", None, 10, 15)
+])
\ No newline at end of file
@@ -25,10 +25,24 @@ db = mongodb_client.ai_agent
 # Redis connection
 redis_client = Redis.from_url(os.getenv("REDIS_URL"))
 
+@app.on_event("startup")
+async def startup_event():
+    from app.infrastructure.database import SchemaManager
+
+    schema = SchemaManager(db)
+    await schema.ensure_indexes()
+    await schema.migrate_embedded_messages()
+
 @app.on_event("shutdown")
 async def shutdown_event():
+    from app.infrastructure.http_pool import ai_http_pool, sandbox_http_pool
+    from app.application.services.session_service import session_hub
+
+    await session_hub.close()
     mongodb_client.close()
     await redis_client.close()
+    await ai_http_pool.close()
+    await sandbox_http_pool.close()
 
 # Import and include routers
 from app.interfaces.api.v1.session import router as session_router
@@ -36,10 +50,12 @@ from app.interfaces.api.v1.auth import router as auth_router
 from app.interfaces.api.v1.shell import router as shell_router
 from app.interfaces.api.v1.file import router as file_router
 from app.interfaces.api.v1.supervisor import router as supervisor_router
+from app.interfaces.api.v1.sandbox import router as sandbox_router
 
 # Include routers
 app.include_router(auth_router, prefix="/api/v1/auth", tags=["auth"])
 app.include_router(session_router, prefix="/api/v1/sessions", tags=["sessions"])
 app.include_router(shell_router, prefix="/api/v1/shell", tags=["shell"])
 app.include_router(file_router, prefix="/api/v1/file", tags=["file"])
-app.include_router(supervisor_router, prefix="/api/v1/supervisor", tags=["supervisor"])
\ No newline at end of file
+app.include_router(supervisor_router, prefix="/api/v1/supervisor", tags=["supervisor"])
+app.include_router(sandbox_router, prefix="/api/v1/sandbox", tags=["sandbox"])
\ No newline at end of file
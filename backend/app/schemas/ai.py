@@ -6,6 +6,8 @@ class CompletionRequest(BaseModel):
     max_tokens: Optional[int] = 2048
     temperature: Optional[float] = 0.7
     stop: Optional[List[str]] = None
+    stream: Optional[bool] = False
+    cache: Optional[bool] = True
 
 class ChatMessage(BaseModel):
     role: str
@@ -15,6 +17,8 @@ class ChatRequest(BaseModel):
     messages: List[ChatMessage]
     max_tokens: Optional[int] = 2048
     temperature: Optional[float] = 0.7
+    stream: Optional[bool] = False
+    cache: Optional[bool] = True
 
 class CompletionResponse(BaseModel):
     choices: List[dict]
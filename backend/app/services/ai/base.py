@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, Any
+from typing import AsyncGenerator, Dict, Optional, Any
 
 class AIService(ABC):
     """Base class for AI service implementations."""
@@ -12,4 +12,14 @@ class AIService(ABC):
     @abstractmethod
     async def generate_chat_response(self, messages: list, **kwargs) -> Dict[str, Any]:
         """Generate chat response."""
+        pass
+    
+    @abstractmethod
+    def stream_completion(self, prompt: str, **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream code completion chunks as they are generated."""
+        pass
+    
+    @abstractmethod
+    def stream_chat_response(self, messages: list, **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream chat response chunks as they are generated."""
         pass
\ No newline at end of file
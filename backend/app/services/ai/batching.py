@@ -0,0 +1,306 @@
+import torch
+import torch.nn.functional as F
+import asyncio
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from .model_registry import InferenceBusyError, LoadedModel, inference_executor
+
+class _BatchRequest:
+    """A single prompt travelling through the batching engine."""
+
+    def __init__(
+        self,
+        input_ids: List[int],
+        max_new_tokens: int,
+        temperature: float,
+        stop: Optional[List[str]],
+        future: asyncio.Future
+    ):
+        self.input_ids = input_ids
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.stop = stop or []
+        self.future = future
+        self.generated: List[int] = []
+        self.cancelled = False
+
+class BatchingEngine:
+    """Continuous batching scheduler for one loaded model.
+
+    Concurrent requests arriving within a short window are left-padded into
+    a single batch and decoded together one token step at a time. Between
+    steps, finished or cancelled sequences are evicted from the batch and
+    waiting requests are admitted. Admission prefills only the new rows and
+    splices their KV cache into the batch's, left-padding whichever is
+    shorter, so rows already decoding are never recomputed; decode steps
+    only feed the newest token of each row.
+    """
+
+    def __init__(self, loaded: LoadedModel, max_batch_size: int, batch_window: float, max_waiting: int):
+        self.loaded = loaded
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window
+        self.max_waiting = max_waiting
+        self.pad_token_id = loaded.tokenizer.pad_token_id
+        if self.pad_token_id is None:
+            self.pad_token_id = loaded.tokenizer.eos_token_id
+        self._waiting: Deque[_BatchRequest] = deque()
+        self._active: List[_BatchRequest] = []
+        # Admitted but not yet prefilled
+        self._admitted: List[_BatchRequest] = []
+        self._past = None
+        self._attention_mask: Optional[torch.Tensor] = None
+        self._driver: Optional[asyncio.Task] = None
+        self.steps = 0
+        self.tokens_generated = 0
+
+    async def submit(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Queue a prompt for batched generation and wait for its completion."""
+        if len(self._waiting) >= self.max_waiting:
+            raise InferenceBusyError("Batch queue is full, try again later")
+
+        input_ids = self.loaded.tokenizer(prompt)["input_ids"]
+        # Same budget as the unbatched path, which passes max_tokens to generate() as max_length
+        max_new_tokens = max(kwargs.get("max_tokens", 2048) - len(input_ids), 1)
+        # generate() only applies temperature when the model's generation config samples;
+        # otherwise the unbatched path decodes greedily, so batching must too
+        sampling = getattr(getattr(self.loaded.model, "generation_config", None), "do_sample", False)
+        request = _BatchRequest(
+            input_ids=input_ids,
+            max_new_tokens=max_new_tokens,
+            temperature=(kwargs.get("temperature", 0.7) or 0.0) if sampling else 0.0,
+            stop=kwargs.get("stop"),
+            future=asyncio.get_running_loop().create_future()
+        )
+        self._waiting.append(request)
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.ensure_future(self._drive())
+        return await request.future
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": len(self._active) + len(self._admitted),
+            "waiting": len(self._waiting),
+            "max_batch_size": self.max_batch_size,
+            "steps": self.steps,
+            "tokens_generated": self.tokens_generated
+        }
+
+    async def _drive(self):
+        """Run token steps until no request is active or waiting."""
+        # Give concurrent callers a moment to arrive so the first batch is not a batch of one
+        await asyncio.sleep(self.batch_window)
+        while self._waiting or self._active or self._admitted:
+            for request in self._active + self._admitted:
+                if request.future.cancelled():
+                    request.cancelled = True
+            self._admit()
+            try:
+                finished = await inference_executor.execute(self._step)
+            except Exception as e:
+                for request in self._active + self._admitted:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                self._reset()
+                continue
+            for request in finished:
+                if not request.future.done():
+                    text = self.loaded.tokenizer.decode(
+                        request.input_ids + request.generated,
+                        skip_special_tokens=True
+                    )
+                    request.future.set_result({"choices": [{"text": self._truncate_at_stop(request, text)}]})
+
+    def _admit(self):
+        """Move waiting requests into free batch slots."""
+        while self._waiting and len(self._active) + len(self._admitted) < self.max_batch_size:
+            request = self._waiting.popleft()
+            if request.future.cancelled():
+                continue
+            self._admitted.append(request)
+
+    def _reset(self):
+        self._active = []
+        self._admitted = []
+        self._past = None
+        self._attention_mask = None
+
+    def _step(self) -> List[_BatchRequest]:
+        """Prefill newly admitted rows, then decode one token for every row; runs on the inference executor."""
+        self._evict([request.cancelled for request in self._active])
+        self._admitted = [request for request in self._admitted if not request.cancelled]
+        finished = []
+        with torch.no_grad():
+            if self._admitted:
+                finished.extend(self._prefill(self._admitted))
+                self._admitted = []
+            if self._active:
+                finished.extend(self._decode())
+        self.steps += 1
+        return finished
+
+    def _prefill(self, requests: List[_BatchRequest]) -> List[_BatchRequest]:
+        """Run the prompts of ``requests`` alone and merge their KV cache into the batch."""
+        device = self.loaded.device
+        width = max(len(request.input_ids) for request in requests)
+        input_ids = torch.tensor(
+            [[self.pad_token_id] * (width - len(request.input_ids)) + request.input_ids for request in requests],
+            device=device
+        )
+        attention_mask = torch.tensor(
+            [[0] * (width - len(request.input_ids)) + [1] * len(request.input_ids) for request in requests],
+            device=device
+        )
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+        outputs = self.loaded.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            use_cache=True
+        )
+
+        if not self._active:
+            self._past, self._attention_mask = outputs.past_key_values, attention_mask
+        else:
+            # Both caches hold only positions before each row's pending token, so they line up once left-padded
+            current = self._attention_mask.shape[1]
+            self._past = _concat_cache_rows(
+                self._past,
+                outputs.past_key_values,
+                max(width - current, 0),
+                max(current - width, 0)
+            )
+            self._attention_mask = torch.cat([
+                F.pad(self._attention_mask, (max(width - current, 0), 0)),
+                F.pad(attention_mask, (max(current - width, 0), 0))
+            ])
+        self._active.extend(requests)
+        return self._advance(requests, outputs.logits[:, -1, :])
+
+    def _decode(self) -> List[_BatchRequest]:
+        """Feed the newest token of every row through the shared KV cache."""
+        input_ids = torch.tensor([[request.generated[-1]] for request in self._active], device=self.loaded.device)
+        attention_mask = torch.cat(
+            [self._attention_mask, self._attention_mask.new_ones((len(self._active), 1))],
+            dim=1
+        )
+        position_ids = attention_mask.sum(-1, keepdim=True) - 1
+        outputs = self.loaded.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=self._past,
+            use_cache=True
+        )
+        self._past = outputs.past_key_values
+        self._attention_mask = attention_mask
+        return self._advance(self._active, outputs.logits[:, -1, :])
+
+    def _advance(self, requests: List[_BatchRequest], logits: torch.Tensor) -> List[_BatchRequest]:
+        """Append one sampled token to each of ``requests``, the last rows of the batch, and evict finished ones."""
+        finished = []
+        done = [False] * (len(self._active) - len(requests))
+        for request, token in zip(requests, self._sample(logits, requests)):
+            request.generated.append(token)
+            self.tokens_generated += 1
+            is_done = (
+                token == self.loaded.tokenizer.eos_token_id
+                or len(request.generated) >= request.max_new_tokens
+                or self._hit_stop(request)
+            )
+            done.append(is_done)
+            if is_done:
+                finished.append(request)
+        self._evict(done)
+        return finished
+
+    def _sample(self, logits: torch.Tensor, requests: List[_BatchRequest]) -> List[int]:
+        """Pick the next token per row, honouring each request's temperature."""
+        tokens = []
+        for row, request in zip(logits, requests):
+            if request.temperature <= 0:
+                tokens.append(int(torch.argmax(row)))
+            else:
+                probs = torch.softmax(row.float() / request.temperature, dim=-1)
+                tokens.append(int(torch.multinomial(probs, 1)))
+        return tokens
+
+    def _hit_stop(self, request: _BatchRequest) -> bool:
+        if not request.stop:
+            return False
+        text = self.loaded.tokenizer.decode(request.generated, skip_special_tokens=True)
+        return any(stop in text for stop in request.stop)
+
+    def _truncate_at_stop(self, request: _BatchRequest, text: str) -> str:
+        """Cut the response before the first stop sequence in the generated part."""
+        start = len(self.loaded.tokenizer.decode(request.input_ids, skip_special_tokens=True))
+        cuts = [text.find(stop, start) for stop in request.stop]
+        cuts = [cut for cut in cuts if cut != -1]
+        return text[:min(cuts)] if cuts else text
+
+    def _evict(self, mask: List[bool]):
+        """Drop rows flagged in ``mask`` from the batch and its KV cache."""
+        if not any(mask):
+            return
+        keep = [i for i, drop in enumerate(mask) if not drop]
+        self._active = [self._active[i] for i in keep]
+        if not keep:
+            self._past = None
+            self._attention_mask = None
+            return
+        index = torch.tensor(keep, device=self.loaded.device)
+        attention_mask = self._attention_mask[index]
+        # Columns that were padding for every remaining row are dead weight; without
+        # trimming them the batch would widen for as long as arrivals keep it busy
+        start = int(attention_mask.any(0).nonzero()[0])
+        self._past = _select_cache_rows(self._past, index, start)
+        self._attention_mask = attention_mask[:, start:]
+
+def _cache_layers(past) -> List[List[torch.Tensor]]:
+    if hasattr(past, "layers"):
+        return [[layer.keys, layer.values] for layer in past.layers]
+    if hasattr(past, "key_cache"):
+        return [[keys, values] for keys, values in zip(past.key_cache, past.value_cache)]
+    return [list(layer) for layer in past]
+
+def _replace_cache_layers(past, layers: List[List[torch.Tensor]]):
+    """Put new key/value tensors back into ``past``, keeping its cache format."""
+    if hasattr(past, "layers"):
+        for layer, (keys, values) in zip(past.layers, layers):
+            layer.keys, layer.values = keys, values
+        return past
+    if hasattr(past, "key_cache"):
+        past.key_cache[:] = [keys for keys, _ in layers]
+        past.value_cache[:] = [values for _, values in layers]
+        return past
+    return tuple(tuple(layer) for layer in layers)
+
+def _select_cache_rows(past, index: torch.Tensor, start: int = 0):
+    """Keep only the given batch rows of a KV cache, from position ``start`` on."""
+    return _replace_cache_layers(past, [
+        [tensor[index][..., start:, :] for tensor in layer]
+        for layer in _cache_layers(past)
+    ])
+
+def _concat_cache_rows(past, other, pad: int, other_pad: int):
+    """Stack the rows of ``other`` under those of ``past``, left-padding each along the sequence."""
+    return _replace_cache_layers(past, [
+        [torch.cat([F.pad(a, (0, 0, pad, 0)), F.pad(b, (0, 0, other_pad, 0))]) for a, b in zip(layer, other_layer)]
+        for layer, other_layer in zip(_cache_layers(past), _cache_layers(other))
+    ])
+
+_engines: Dict[str, BatchingEngine] = {}
+
+def get_batching_engine(loaded: LoadedModel) -> BatchingEngine:
+    """Return the process-wide batching engine for a loaded model."""
+    engine = _engines.get(loaded.name)
+    if engine is None:
+        engine = BatchingEngine(
+            loaded,
+            max_batch_size=int(os.getenv("HUGGINGFACE_MAX_BATCH_SIZE", 8)),
+            batch_window=float(os.getenv("HUGGINGFACE_BATCH_WINDOW_MS", 10)) / 1000,
+            max_waiting=int(os.getenv("HUGGINGFACE_BATCH_QUEUE", 64))
+        )
+        _engines[loaded.name] = engine
+    return engine
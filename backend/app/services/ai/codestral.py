@@ -1,6 +1,8 @@
-import aiohttp
+import asyncio
+import json
 import os
-from typing import Dict, Any
+from typing import AsyncGenerator, Dict, Any
+from app.infrastructure.http_pool import ai_http_pool
 from .base import AIService
 
 class CodestralService(AIService):
@@ -11,33 +13,73 @@ class CodestralService(AIService):
         self.completion_endpoint = os.getenv("CODESTRAL_COMPLETION_ENDPOINT")
         self.chat_endpoint = os.getenv("CODESTRAL_CHAT_ENDPOINT")
         self.headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
+            "Authorization": f"Bearer {self.api_key}"
         }
+        self.http = ai_http_pool
     
     async def generate_completion(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate code completion using Codestral API."""
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "prompt": prompt,
-                "max_tokens": kwargs.get("max_tokens", 2048),
-                "temperature": kwargs.get("temperature", 0.7),
-                "stop": kwargs.get("stop", ["\n\n"])
-            }
-            
-            async with session.post(self.completion_endpoint, json=payload, headers=self.headers) as response:
-                response.raise_for_status()
-                return await response.json()
+        payload = self._completion_payload(prompt, **kwargs)
+        
+        async with self.http.post_json(self.completion_endpoint, payload, headers=self.headers) as response:
+            response.raise_for_status()
+            return await response.json()
     
     async def generate_chat_response(self, messages: list, **kwargs) -> Dict[str, Any]:
         """Generate chat response using Codestral API."""
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "messages": messages,
-                "max_tokens": kwargs.get("max_tokens", 2048),
-                "temperature": kwargs.get("temperature", 0.7)
-            }
-            
-            async with session.post(self.chat_endpoint, json=payload, headers=self.headers) as response:
-                response.raise_for_status()
-                return await response.json()
\ No newline at end of file
+        payload = self._chat_payload(messages, **kwargs)
+        
+        async with self.http.post_json(self.chat_endpoint, payload, headers=self.headers) as response:
+            response.raise_for_status()
+            return await response.json()
+    
+    async def stream_completion(self, prompt: str, **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream code completion chunks from the Codestral API."""
+        payload = self._completion_payload(prompt, **kwargs)
+        async for chunk in self._stream(self.completion_endpoint, payload):
+            yield chunk
+    
+    async def stream_chat_response(self, messages: list, **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream chat response chunks from the Codestral API."""
+        payload = self._chat_payload(messages, **kwargs)
+        async for chunk in self._stream(self.chat_endpoint, payload):
+            yield chunk
+    
+    def _completion_payload(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        return {
+            "prompt": prompt,
+            "max_tokens": kwargs.get("max_tokens", 2048),
+            "temperature": kwargs.get("temperature", 0.7),
+            "stop": kwargs.get("stop", ["\n\n"])
+        }
+    
+    def _chat_payload(self, messages: list, **kwargs) -> Dict[str, Any]:
+        return {
+            "messages": messages,
+            "max_tokens": kwargs.get("max_tokens", 2048),
+            "temperature": kwargs.get("temperature", 0.7)
+        }
+    
+    async def _stream(self, endpoint: str, payload: Dict[str, Any]) -> AsyncGenerator[Dict[str, Any], None]:
+        """Pass through the upstream server-sent event stream chunk by chunk."""
+        headers = {**self.headers, "Accept": "text/event-stream"}
+        async with self.http.post_json(
+            endpoint,
+            {**payload, "stream": True},
+            headers=headers,
+            timeout=self.http.stream_timeout()
+        ) as response:
+            response.raise_for_status()
+            try:
+                async for line in response.content:
+                    line = line.strip()
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[len(b"data:"):].strip()
+                    if data == b"[DONE]":
+                        break
+                    yield json.loads(data)
+            except (asyncio.CancelledError, GeneratorExit):
+                # Drop the connection so the provider stops generating for a gone client
+                response.close()
+                raise
\ No newline at end of file
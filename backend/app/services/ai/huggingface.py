@@ -1,51 +1,175 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
 import torch
-from typing import Dict, Any
+import asyncio
+import os
+import threading
+from typing import AsyncGenerator, Dict, Any, List, Optional, Tuple
 from .base import AIService
+from .batching import get_batching_engine
+from .model_registry import LoadedModel, inference_executor, model_registry
+from .prefix_cache import crop_cache, prefix_cache
+
+class _CancelledCriteria(StoppingCriteria):
+    """Stops generation once the consumer of a stream has gone away."""
+    
+    def __init__(self, cancelled: threading.Event):
+        self.cancelled = cancelled
+    
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.cancelled.is_set()
 
 class HuggingFaceService(AIService):
-    """Implementation of Hugging Face model service."""
+    """Implementation of Hugging Face model service.
     
-    def __init__(self):
-        self.model_name = os.getenv("HUGGINGFACE_MODEL", "mistralai/Mixtral-8x7B-Instruct-v0.1")
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelForCausalLM.from_pretrained(self.model_name)
-        
-        # Move model to GPU if available
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
+    Weights come from the shared model registry and generation runs on the
+    bounded inference executor, so constructing the service is cheap and
+    the event loop stays responsive while the model works. Unless batching
+    is disabled, concurrent completions share decode steps through the
+    model's batching engine.
+    """
+    
+    def __init__(self, model_name: Optional[str] = None, batching: Optional[bool] = None):
+        self.model_name = model_name or os.getenv("HUGGINGFACE_MODEL", "mistralai/Mixtral-8x7B-Instruct-v0.1")
+        if batching is None:
+            batching = os.getenv("HUGGINGFACE_BATCHING", "true").lower() == "true"
+        self.batching = batching
     
     async def generate_completion(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """Generate code completion using Hugging Face model."""
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-        
-        with torch.no_grad():
-            outputs = self.model.generate(
-                inputs["input_ids"],
-                max_length=kwargs.get("max_tokens", 2048),
-                temperature=kwargs.get("temperature", 0.7),
-                pad_token_id=self.tokenizer.eos_token_id
-            )
-        
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        return {"choices": [{"text": response}]}
+        loaded = await model_registry.get(self.model_name)
+        if self.batching:
+            return await get_batching_engine(loaded).submit(prompt, **kwargs)
+        return await inference_executor.run(self._generate, loaded, prompt, **kwargs)
     
     async def generate_chat_response(self, messages: list, **kwargs) -> Dict[str, Any]:
         """Generate chat response using Hugging Face model."""
+        if prefix_cache.enabled:
+            loaded = await model_registry.get(self.model_name)
+            return await inference_executor.run(self._generate_chat, loaded, messages, **kwargs)
         # Convert chat messages to a prompt format
         prompt = self._format_chat_messages(messages)
         return await self.generate_completion(prompt, **kwargs)
     
+    async def stream_completion(self, prompt: str, **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream code completion text as the model produces it."""
+        loaded = await model_registry.get(self.model_name)
+        inputs = loaded.tokenizer(prompt, return_tensors="pt").to(loaded.device)
+        streamer = TextIteratorStreamer(loaded.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        cancelled = threading.Event()
+        
+        def generate():
+            with torch.no_grad():
+                loaded.model.generate(
+                    **self._generation_kwargs(loaded, inputs, **kwargs),
+                    streamer=streamer,
+                    stopping_criteria=StoppingCriteriaList([_CancelledCriteria(cancelled)])
+                )
+        
+        def on_done(future: asyncio.Future):
+            # Unblock the reader if generation failed or was rejected before finishing the stream
+            if future.cancelled() or future.exception() is not None:
+                streamer.end()
+        
+        generation = asyncio.ensure_future(inference_executor.run(generate))
+        generation.add_done_callback(on_done)
+        try:
+            while True:
+                # The streamer blocks on a queue, so wait for it off the event loop
+                text = await asyncio.to_thread(next, streamer, None)
+                if text is None:
+                    break
+                if text:
+                    yield {"choices": [{"text": text}]}
+            await generation
+        finally:
+            # Client disconnects close this generator; stop the model at the next token
+            cancelled.set()
+    
+    async def stream_chat_response(self, messages: list, **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream chat response text as the model produces it."""
+        prompt = self._format_chat_messages(messages)
+        async for chunk in self.stream_completion(prompt, **kwargs):
+            yield chunk
+    
+    def _generate(self, loaded: LoadedModel, prompt: str, **kwargs) -> Dict[str, Any]:
+        """Blocking generation; runs on the inference executor."""
+        inputs = loaded.tokenizer(prompt, return_tensors="pt").to(loaded.device)
+        
+        with torch.no_grad():
+            outputs = loaded.model.generate(**self._generation_kwargs(loaded, inputs, **kwargs))
+        
+        response = loaded.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        return {"choices": [{"text": response}]}
+    
+    def _generate_chat(self, loaded: LoadedModel, messages: list, **kwargs) -> Dict[str, Any]:
+        """Blocking chat generation that only prefills messages not already in the prefix cache."""
+        input_ids, boundaries = self._encode_chat_messages(loaded, messages)
+        _, past = prefix_cache.lookup(loaded.name, input_ids, boundaries)
+        inputs = {"input_ids": torch.tensor([input_ids], device=loaded.device)}
+        generation_kwargs = self._generation_kwargs(loaded, inputs, **kwargs)
+        if past is not None:
+            generation_kwargs["past_key_values"] = past
+        
+        with torch.no_grad():
+            outputs = loaded.model.generate(
+                **generation_kwargs,
+                attention_mask=torch.ones_like(inputs["input_ids"]),
+                use_cache=True,
+                return_dict_in_generate=True
+            )
+        
+        # Keep the KV state of the prompt so the next turn can start from it
+        if outputs.past_key_values is not None:
+            prefix_cache.store(loaded.name, input_ids, crop_cache(outputs.past_key_values, len(input_ids)))
+        
+        response = loaded.tokenizer.decode(outputs.sequences[0], skip_special_tokens=True)
+        return {"choices": [{"text": response}]}
+    
+    def _encode_chat_messages(self, loaded: LoadedModel, messages: list) -> Tuple[List[int], List[int]]:
+        """Tokenize a transcript message by message.
+        
+        Encoding each message separately keeps earlier turns tokenized the
+        same way as the conversation grows, so every message boundary is a
+        stable prefix for the KV cache. Returns the token ids and the
+        prefix length at the end of each message.
+        """
+        input_ids = loaded.tokenizer("", add_special_tokens=True)["input_ids"]
+        boundaries = []
+        for msg in messages:
+            line = self._format_chat_message(msg)
+            if line is None:
+                continue
+            segment = f"\n{line}" if boundaries else line
+            input_ids = input_ids + loaded.tokenizer(segment, add_special_tokens=False)["input_ids"]
+            boundaries.append(len(input_ids))
+        return input_ids, boundaries
+    
+    def _generation_kwargs(self, loaded: LoadedModel, inputs, **kwargs) -> Dict[str, Any]:
+        """Build the keyword arguments shared by blocking and streaming generation."""
+        return {
+            "input_ids": inputs["input_ids"],
+            "max_length": kwargs.get("max_tokens", 2048),
+            "temperature": kwargs.get("temperature", 0.7),
+            "pad_token_id": loaded.tokenizer.eos_token_id
+        }
+    
     def _format_chat_messages(self, messages: list) -> str:
         """Format chat messages into a prompt for the model."""
         formatted_messages = []
         for msg in messages:
-            role = msg.get("role", "user")
-            content = msg.get("content", "")
-            if role == "system":
-                formatted_messages.append(f"System: {content}")
-            elif role == "user":
-                formatted_messages.append(f"User: {content}")
-            elif role == "assistant":
-                formatted_messages.append(f"Assistant: {content}")
-        return "\n".join(formatted_messages)
\ No newline at end of file
+            line = self._format_chat_message(msg)
+            if line is not None:
+                formatted_messages.append(line)
+        return "\n".join(formatted_messages)
+    
+    def _format_chat_message(self, msg: dict) -> Optional[str]:
+        """Format one chat message, or return None for unknown roles."""
+        role = msg.get("role", "user")
+        content = msg.get("content", "")
+        if role == "system":
+            return f"System: {content}"
+        elif role == "user":
+            return f"User: {content}"
+        elif role == "assistant":
+            return f"Assistant: {content}"
+        return None
\ No newline at end of file
@@ -0,0 +1,95 @@
+from transformers import AutoTokenizer, AutoModelForCausalLM
+from concurrent.futures import ThreadPoolExecutor
+import torch
+import asyncio
+import functools
+import os
+from typing import Any, Callable, Dict
+
+class InferenceBusyError(RuntimeError):
+    """Raised when the inference queue is full."""
+
+class LoadedModel:
+    """Tokenizer and model weights loaded once and shared by all requests."""
+    
+    def __init__(self, name: str, tokenizer, model, device: torch.device):
+        self.name = name
+        self.tokenizer = tokenizer
+        self.model = model
+        self.device = device
+
+class InferenceExecutor:
+    """Bounded thread pool that keeps model inference off the event loop.
+    
+    At most ``max_workers`` generations run at once and at most
+    ``max_queue`` more wait for a worker; further calls are rejected
+    with InferenceBusyError instead of piling up behind the model.
+    """
+    
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hf-inference")
+        self._pending = 0
+    
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking inference call on the pool and await its result."""
+        if self._pending >= self.max_workers + self.max_queue:
+            raise InferenceBusyError("Inference queue is full, try again later")
+        return await self.execute(fn, *args, **kwargs)
+    
+    async def execute(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking call on the pool without the admission check.
+        
+        Used by callers that bound their own queue, such as the batching
+        engine, whose steps must never be rejected mid-batch.
+        """
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._pending -= 1
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending
+        }
+
+class ModelRegistry:
+    """Process-wide registry that lazily loads each model exactly once."""
+    
+    def __init__(self):
+        self._models: Dict[str, LoadedModel] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+    
+    async def get(self, model_name: str) -> LoadedModel:
+        """Return the loaded model, loading it on first use."""
+        loaded = self._models.get(model_name)
+        if loaded is not None:
+            return loaded
+        
+        lock = self._locks.setdefault(model_name, asyncio.Lock())
+        async with lock:
+            if model_name not in self._models:
+                # Loading weights takes seconds to minutes; keep the event loop free meanwhile
+                self._models[model_name] = await asyncio.to_thread(self._load, model_name)
+        return self._models[model_name]
+    
+    def _load(self, model_name: str) -> LoadedModel:
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForCausalLM.from_pretrained(model_name)
+        
+        # Move model to GPU if available
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        model.to(device)
+        model.eval()
+        return LoadedModel(model_name, tokenizer, model, device)
+
+model_registry = ModelRegistry()
+inference_executor = InferenceExecutor(
+    max_workers=int(os.getenv("HUGGINGFACE_INFERENCE_WORKERS", 1)),
+    max_queue=int(os.getenv("HUGGINGFACE_INFERENCE_QUEUE", 16))
+)
\ No newline at end of file
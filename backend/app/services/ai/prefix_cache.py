@@ -0,0 +1,113 @@
+import copy
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+class _PrefixEntry:
+    def __init__(self, tokens: Tuple[int, ...], past: Any, nbytes: int):
+        self.tokens = tokens
+        self.past = past
+        self.nbytes = nbytes
+
+class PrefixCache:
+    """LRU cache of ``past_key_values`` keyed by tokenized conversation prefixes.
+
+    After a chat turn the KV state of its prompt is stored under the prompt's
+    token ids. The next turn of the same conversation starts with those ids,
+    so it only has to prefill the messages added since. Entries are evicted
+    least-recently-used first once their tensors exceed ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, int], _PrefixEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def lookup(self, model_name: str, input_ids: List[int], boundaries: List[int]) -> Tuple[int, Optional[Any]]:
+        """Find the longest cached prefix ending on one of ``boundaries``.
+
+        Returns the prefix length and a private copy of its KV state, which
+        the caller may extend in place, or ``(0, None)`` on a miss.
+        """
+        with self._lock:
+            for length in sorted(boundaries, reverse=True):
+                tokens = tuple(input_ids[:length])
+                key = (model_name, hash(tokens))
+                entry = self._entries.get(key)
+                if entry is None or entry.tokens != tokens:
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                past = entry.past
+                break
+            else:
+                self.misses += 1
+                return 0, None
+
+        past = copy.deepcopy(past)
+        # generate() needs at least one uncached token to produce logits from
+        if length >= len(input_ids):
+            length = len(input_ids) - 1
+            past = crop_cache(past, length)
+        return length, past
+
+    def store(self, model_name: str, input_ids: List[int], past: Any):
+        """Cache the KV state covering exactly ``input_ids``."""
+        nbytes = cache_nbytes(past)
+        if nbytes > self.max_bytes:
+            return
+        tokens = tuple(input_ids)
+        key = (model_name, hash(tokens))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous.nbytes
+            self._entries[key] = _PrefixEntry(tokens, past, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+def _cache_layers(past: Any):
+    if hasattr(past, "to_legacy_cache"):
+        return past.to_legacy_cache()
+    return past
+
+def cache_nbytes(past: Any) -> int:
+    """Memory held by the key/value tensors of a KV cache."""
+    return sum(
+        tensor.numel() * tensor.element_size()
+        for layer in _cache_layers(past)
+        for tensor in layer
+    )
+
+def crop_cache(past: Any, length: int) -> Any:
+    """Trim a KV cache to its first ``length`` positions, in either cache format."""
+    if hasattr(past, "crop"):
+        past.crop(length)
+        return past
+    return tuple(tuple(tensor[..., :length, :] for tensor in layer) for layer in past)
+
+prefix_cache = PrefixCache(max_bytes=int(float(os.getenv("HUGGINGFACE_PREFIX_CACHE_MB", 256)) * 1024 * 1024))
@@ -0,0 +1,176 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional
+from app.infrastructure.cache import TTLCache
+from app.main import redis_client
+from .base import AIService
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """Exact-match cache for model responses.
+
+    Lookups try an in-process LRU first and the shared Redis tier second, so
+    a response computed by any worker is reused by all of them. Only
+    deterministic requests (temperature 0) are cached, and concurrent
+    identical requests share a single upstream call.
+    """
+
+    def __init__(self, redis, local_size: int, ttl: float, enabled: bool = True, namespace: str = "llm-cache"):
+        self.redis = redis
+        self.ttl = ttl
+        self.enabled = enabled
+        self.namespace = namespace
+        self.local = TTLCache(max_size=local_size, ttl=ttl)
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def make_key(self, **request: Any) -> str:
+        """Hash a request into a canonical cache key."""
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+        return f"{self.namespace}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+    def is_cacheable(self, params: Dict[str, Any], use_cache: bool = True) -> bool:
+        """Only deterministic requests can be answered from the cache."""
+        return self.enabled and use_cache and params.get("temperature") == 0
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a private copy of the cached response, so callers may modify it."""
+        value = self.local.get(key)
+        if value is not None:
+            self.local_hits += 1
+            return copy.deepcopy(value)
+        try:
+            raw = await self.redis.get(key)
+        except Exception:
+            logger.warning("Response cache read failed", exc_info=True)
+            raw = None
+        if raw is not None:
+            value = json.loads(raw)
+            self.local.set(key, copy.deepcopy(value))
+            self.shared_hits += 1
+            return value
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            raw = json.dumps(value)
+        except TypeError:
+            # Responses that are not plain JSON are returned but never cached
+            return
+        # The caller keeps its own object; the cache holds a copy it cannot change
+        self.local.set(key, copy.deepcopy(value), ttl)
+        try:
+            await self.redis.set(key, raw, ex=max(int(ttl), 1))
+        except Exception:
+            logger.warning("Response cache write failed", exc_info=True)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        ttl: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Return the cached value or compute it once for all concurrent callers."""
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        while key in self._inflight:
+            pending = self._inflight[key]
+            try:
+                return copy.deepcopy(await asyncio.shield(pending))
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The caller computing it went away, not this one: take the computation over
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+            await self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved so an unwatched future does not warn
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.local_hits + self.shared_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "local_entries": len(self.local),
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
+
+class CachedAIService(AIService):
+    """AIService decorator that answers repeated deterministic requests from the response cache.
+
+    Callers can pass ``use_cache=False`` to force a fresh generation and
+    ``cache_ttl`` to override how long the response is kept.
+    """
+
+    def __init__(self, service: AIService, cache: "ResponseCache"):
+        self.service = service
+        self.cache = cache
+
+    async def generate_completion(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        use_cache = kwargs.pop("use_cache", True)
+        ttl = kwargs.pop("cache_ttl", None)
+        if not self.cache.is_cacheable(kwargs, use_cache):
+            return await self.service.generate_completion(prompt, **kwargs)
+        key = self._key("completion", prompt=prompt, params=kwargs)
+        return await self.cache.get_or_compute(key, lambda: self.service.generate_completion(prompt, **kwargs), ttl)
+
+    async def generate_chat_response(self, messages: list, **kwargs) -> Dict[str, Any]:
+        use_cache = kwargs.pop("use_cache", True)
+        ttl = kwargs.pop("cache_ttl", None)
+        if not self.cache.is_cacheable(kwargs, use_cache):
+            return await self.service.generate_chat_response(messages, **kwargs)
+        key = self._key("chat", messages=messages, params=kwargs)
+        return await self.cache.get_or_compute(key, lambda: self.service.generate_chat_response(messages, **kwargs), ttl)
+
+    def stream_completion(self, prompt: str, **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        kwargs.pop("use_cache", None)
+        kwargs.pop("cache_ttl", None)
+        return self.service.stream_completion(prompt, **kwargs)
+
+    def stream_chat_response(self, messages: list, **kwargs) -> AsyncGenerator[Dict[str, Any], None]:
+        kwargs.pop("use_cache", None)
+        kwargs.pop("cache_ttl", None)
+        return self.service.stream_chat_response(messages, **kwargs)
+
+    def _key(self, kind: str, **request: Any) -> str:
+        return self.cache.make_key(
+            kind=kind,
+            service=type(self.service).__name__,
+            model=getattr(self.service, "model_name", None),
+            **request
+        )
+
+response_cache = ResponseCache(
+    redis=redis_client,
+    local_size=int(os.getenv("AI_CACHE_LOCAL_SIZE", 1024)),
+    ttl=float(os.getenv("AI_CACHE_TTL_SECONDS", 3600)),
+    enabled=os.getenv("AI_CACHE_ENABLED", "true").lower() == "true"
+)
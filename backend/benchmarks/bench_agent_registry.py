@@ -0,0 +1,67 @@
+"""Measure the cost of getting a ready agent per request, before and after the registry.
+
+"Before" reproduces the old per-request path: build a new agent, which
+runs genai.configure and creates a GenerativeModel, then compile the tool
+declarations again for the model call. "After" looks the agent up in the
+registry and reuses its precompiled declarations. Building a new agent
+whose model client is already shared is reported separately. Nothing is
+sent to the model.
+
+Usage (from the backend directory):
+    REDIS_URL=redis://localhost:6379 python -m benchmarks.bench_agent_registry --tools 20
+"""
+import argparse
+import statistics
+import time
+from app.agents.registry import AgentRegistry, clear_model_clients
+from app.agents.specialized import CodingAgent
+from app.tools.base import BaseTool
+
+def timed(fn, iterations: int) -> float:
+    """Median wall time of ``fn`` in microseconds."""
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tools", type=int, default=20, help="Tools attached to the agent")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    tools = [BaseTool(f"tool_{i}", f"Synthetic tool number {i}") for i in range(args.tools)]
+    generation_config = {"temperature": 0.2, "max_output_tokens": 2048}
+
+    def build() -> CodingAgent:
+        return CodingAgent(name="coding_agent", tools=tools, generation_config=generation_config)
+
+    def before():
+        clear_model_clients()
+        agent = build()
+        [tool.to_dict() for tool in agent.tools]
+
+    def warm_construct():
+        agent = build()
+        agent.tool_declarations
+
+    registry = AgentRegistry()
+    registry.register("coding", build)
+    registry.get("coding")
+
+    def after():
+        registry.get("coding").tool_declarations
+
+    results = [
+        ("before: new agent + configure + compile tools", timed(before, args.iterations)),
+        ("new agent, shared model client", timed(warm_construct, args.iterations)),
+        ("after: registry lookup", timed(after, args.iterations))
+    ]
+    baseline = results[0][1]
+    for label, micros in results:
+        print(f"{label:<48} {micros:10.2f} us  ({baseline / micros:8.1f}x)")
+
+if __name__ == "__main__":
+    main()
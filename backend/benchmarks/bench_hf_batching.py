@@ -0,0 +1,72 @@
+"""Compare Hugging Face completion throughput with and without continuous batching.
+
+Fires the same set of concurrent prompts at HuggingFaceService once through
+the one-at-a-time generate() path and once through the batching engine, and
+reports generated tokens per second for each.
+
+Usage (from the backend directory):
+    HUGGINGFACE_MODEL=sshleifer/tiny-gpt2 python -m benchmarks.bench_hf_batching --requests 32 --max-tokens 64
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Let every benchmark request queue instead of being rejected by admission control
+os.environ.setdefault("HUGGINGFACE_INFERENCE_QUEUE", "100000")
+os.environ.setdefault("HUGGINGFACE_BATCH_QUEUE", "100000")
+
+from app.services.ai.huggingface import HuggingFaceService
+from app.services.ai.model_registry import model_registry
+
+PROMPTS = [
+    "def fibonacci(n):",
+    "Write a function that reverses a linked list.",
+    "SELECT name, count(*) FROM users",
+    "class HttpClient:",
+    "# Parse a CSV file and return the rows as dictionaries",
+    "async def fetch(url):",
+    "The quick brown fox",
+    "import numpy as np\n\ndef normalize(x):",
+]
+
+async def run(service: HuggingFaceService, prompts, max_tokens: int) -> dict:
+    loaded = await model_registry.get(service.model_name)
+    tokenizer = loaded.tokenizer
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(*[
+        service.generate_completion(prompt, max_tokens=max_tokens, temperature=0)
+        for prompt in prompts
+    ])
+    elapsed = time.perf_counter() - started
+
+    tokens = 0
+    for prompt, response in zip(prompts, responses):
+        text = response["choices"][0]["text"]
+        tokens += max(len(tokenizer(text)["input_ids"]) - len(tokenizer(prompt)["input_ids"]), 0)
+    return {"seconds": elapsed, "tokens": tokens, "tokens_per_second": tokens / elapsed}
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--max-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    prompts = [PROMPTS[i % len(PROMPTS)] for i in range(args.requests)]
+    unbatched = HuggingFaceService(batching=False)
+    batched = HuggingFaceService(batching=True)
+
+    # Load weights and warm up both paths before timing
+    await run(unbatched, prompts[:1], 4)
+    await run(batched, prompts[:1], 4)
+
+    for label, service in (("one-at-a-time", unbatched), ("batched", batched)):
+        result = await run(service, prompts, args.max_tokens)
+        print(
+            f"{label:>14}: {result['tokens']} tokens in {result['seconds']:.2f}s "
+            f"= {result['tokens_per_second']:.1f} tokens/s"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""Measure insert and lookup latency as the users collection grows.
+
+Compares the old count_documents-based ID allocation against new_id(),
+and username lookups without and with the managed indexes, at several
+collection sizes. Runs against a scratch database that is dropped at the
+end.
+
+Usage (from the backend directory):
+    MONGODB_URI=mongodb://localhost:27017 python -m benchmarks.bench_mongo_ids --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from motor.motor_asyncio import AsyncIOMotorClient
+from app.domain.models.ids import new_id
+from app.infrastructure.database import INDEXES, SchemaManager
+
+SAMPLES = 200
+
+async def timed(coro_factory, samples: int = SAMPLES) -> float:
+    """Median latency of ``samples`` sequential calls, in milliseconds."""
+    latencies = []
+    for i in range(samples):
+        started = time.perf_counter()
+        await coro_factory(i)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return statistics.median(latencies)
+
+async def grow(collection, target: int):
+    """Bulk-insert filler users until the collection holds ``target`` documents."""
+    current = await collection.estimated_document_count()
+    batch = []
+    for i in range(current, target):
+        batch.append({"id": new_id(), "username": f"user-{i}", "hashed_password": "x"})
+        if len(batch) == 5000:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+async def run(db, sizes, indexed: bool):
+    users = db.users
+    await users.drop()
+    if indexed:
+        await SchemaManager(db, {"users": INDEXES["users"]}).ensure_indexes()
+
+    label = "indexed" if indexed else "no index"
+    for size in sizes:
+        await grow(users, size)
+
+        async def insert_counted(i):
+            await users.insert_one({
+                "id": str(await users.count_documents({})),
+                "username": f"counted-{size}-{i}-{indexed}",
+                "hashed_password": "x"
+            })
+
+        async def insert_ulid(i):
+            await users.insert_one({
+                "id": new_id(),
+                "username": f"ulid-{size}-{i}-{indexed}",
+                "hashed_password": "x"
+            })
+
+        async def lookup(i):
+            await users.find_one({"username": f"user-{(i * 7919) % size}"})
+
+        # The counted variant may collide on id under the unique index; measure it unindexed only
+        counted = await timed(insert_counted, samples=50) if not indexed else float("nan")
+        ulid = await timed(insert_ulid)
+        found = await timed(lookup)
+        print(
+            f"{label:>8} | {size:>8} docs | insert count_documents id {counted:8.2f} ms"
+            f" | insert new_id {ulid:6.2f} ms | find_one username {found:7.2f} ms"
+        )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--database", default="ai_agent_bench")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.getenv("MONGODB_URI", "mongodb://localhost:27017"))
+    db = client[args.database]
+    try:
+        await run(db, sorted(args.sizes), indexed=False)
+        await run(db, sorted(args.sizes), indexed=True)
+    finally:
+        await client.drop_database(args.database)
+        client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
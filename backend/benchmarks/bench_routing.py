@@ -0,0 +1,170 @@
+"""Measure local workflow routing latency and how often it agrees with the LLM router.
+
+The labelled set (``routing_dataset.json``) is split per workflow into a
+tuning half and a held-out half. Accuracy, the share of requests decided
+locally and the share still escalated to the model are only reported on
+the held-out half, so they are not inflated by threshold choices made on
+the same requests. Latency is measured over every request.
+
+``--tune`` searches the confidence threshold and margin on the tuning
+half, picking the pair that decides the most requests locally while
+staying at ``--target`` precision there, and evaluates that pair on the
+held-out half. Without it the router's configured
+ROUTER_CONFIDENCE_THRESHOLD and ROUTER_MARGIN are evaluated; their
+defaults were picked this way.
+
+With ``--llm`` the original Gemini router prompt is also run on the
+held-out requests (needs GOOGLE_API_KEY). The report then adds its
+latency and accuracy, how often the local router agrees with it, and the
+accuracy of the combined router, which only asks the model when local
+confidence is low.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_routing
+    python -m benchmarks.bench_routing --tune
+    GOOGLE_API_KEY=... python -m benchmarks.bench_routing --llm
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from collections import Counter
+from app.agents.routing import WorkflowRouter, match_workflow
+
+DATASET = os.path.join(os.path.dirname(__file__), "routing_dataset.json")
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+def split(labelled):
+    """Stratified half split: alternate requests of each workflow go to tuning and to evaluation."""
+    seen = Counter()
+    tuning, held_out = [], []
+    for item in labelled:
+        (tuning if seen[item["workflow"]] % 2 == 0 else held_out).append(item)
+        seen[item["workflow"]] += 1
+    return tuning, held_out
+
+def local_precision(router: WorkflowRouter, items) -> tuple:
+    """Share of ``items`` decided locally, and the share of those decided correctly."""
+    decided = [(d, item) for d, item in ((router.route_local(item["text"]), item) for item in items) if d["confident"]]
+    correct = sum(d["workflow"] == item["workflow"] for d, item in decided)
+    return len(decided) / len(items), correct / max(len(decided), 1)
+
+def tune(router: WorkflowRouter, items, target: float) -> tuple:
+    """Pick the threshold and margin that decide the most ``items`` locally at ``target`` precision.
+
+    Ties go to the stricter pair.
+    """
+    best = None
+    for threshold in (step / 100 for step in range(0, 41)):
+        for margin in (step / 100 for step in range(0, 21)):
+            router.threshold, router.margin = threshold, margin
+            coverage, precision = local_precision(router, items)
+            if precision >= target and (best is None or (coverage, precision, threshold, margin) > best):
+                best = (coverage, precision, threshold, margin)
+    if best is None:
+        raise SystemExit(f"No threshold reaches {target:.0%} precision on the tuning split")
+    return best
+
+def build_router(dataset: dict, fallback=None) -> WorkflowRouter:
+    return WorkflowRouter(
+        dataset["workflows"],
+        exemplars=dataset["exemplars"],
+        rules=[tuple(rule) for rule in dataset["rules"]],
+        fallback=fallback,
+        max_learned=0
+    )
+
+async def llm_router(workflows):
+    """The orchestrator's original model-only router."""
+    from app.agents.registry import get_model_client
+    model = get_model_client(os.getenv("AGENT_MODEL", "gemini-pro"), {"temperature": 0})
+
+    async def ask(request: str) -> str:
+        response = await model.generate_content_async(
+            f"Based on this request, which workflow should I use? Options: {workflows}\n"
+            f"Answer with exactly one option.\n\nRequest: {request}"
+        )
+        return response.text.strip()
+    return ask
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", default=DATASET)
+    parser.add_argument("--llm", action="store_true", help="Also run the Gemini router for comparison")
+    parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions per request")
+    parser.add_argument("--tune", action="store_true", help="Pick threshold and margin on the tuning split first")
+    parser.add_argument("--target", type=float, default=0.95, help="Precision --tune must keep on the tuning split")
+    args = parser.parse_args()
+
+    with open(args.dataset) as file:
+        dataset = json.load(file)
+    labelled = dataset["labelled"]
+    tuning, held_out = split(labelled)
+    router = build_router(dataset)
+    if args.tune:
+        coverage, precision, router.threshold, router.margin = tune(router, tuning, args.target)
+        print(f"tuned on {len(tuning)} requests     threshold {router.threshold:.2f}, margin {router.margin:.2f}"
+              f"  (decided locally {coverage:.1%}, {precision:.1%} correct)")
+
+    latencies = []
+    for item in labelled:
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            router.route_local(item["text"])
+            latencies.append((time.perf_counter() - started) * 1000)
+    local_decisions = [router.route_local(item["text"]) for item in held_out]
+
+    for item in labelled:
+        await router.route(item["text"])
+    cached = []
+    for item in labelled:
+        started = time.perf_counter()
+        await router.route(item["text"])
+        cached.append((time.perf_counter() - started) * 1000)
+
+    correct = sum(d["workflow"] == item["workflow"] for d, item in zip(local_decisions, held_out))
+    confident = [d for d in local_decisions if d["confident"]]
+    confident_correct = sum(d["workflow"] == item["workflow"] for d, item in zip(local_decisions, held_out) if d["confident"])
+    by_source = {source: sum(d["source"] == source and d["confident"] for d in local_decisions) for source in ("rule", "classifier")}
+
+    print(f"requests                      {len(labelled)}  (held out for accuracy: {len(held_out)})")
+    print(f"threshold / margin            {router.threshold:.2f} / {router.margin:.2f}")
+    print(f"local latency p50 / p99       {statistics.median(latencies):.3f} / {percentile(latencies, 0.99):.3f} ms")
+    print(f"cached latency p50 / p99      {statistics.median(cached):.4f} / {percentile(cached, 0.99):.4f} ms")
+    print(f"local accuracy (best guess)   {correct / len(held_out):.1%}")
+    print(f"decided locally               {len(confident) / len(held_out):.1%}  (rules {by_source['rule']}, classifier {by_source['classifier']})")
+    print(f"accuracy when decided locally {confident_correct / max(len(confident), 1):.1%}")
+    print(f"escalated to the model        {1 - len(confident) / len(held_out):.1%}")
+
+    if not args.llm:
+        return
+
+    ask = await llm_router(dataset["workflows"])
+    llm_choices, llm_latencies = [], []
+    for item in held_out:
+        started = time.perf_counter()
+        answer = await ask(item["text"])
+        llm_latencies.append((time.perf_counter() - started) * 1000)
+        llm_choices.append(match_workflow(answer, dataset["workflows"]))
+
+    combined = [
+        local["workflow"] if local["confident"] else (choice or local["workflow"])
+        for local, choice in zip(local_decisions, llm_choices)
+    ]
+    def rate(values, expected) -> float:
+        return sum(a == b for a, b in zip(values, expected)) / len(held_out)
+    labels = [item["workflow"] for item in held_out]
+
+    print(f"LLM latency p50 / p99         {statistics.median(llm_latencies):.1f} / {percentile(llm_latencies, 0.99):.1f} ms")
+    print(f"LLM accuracy                  {rate(llm_choices, labels):.1%}  ({sum(c is None for c in llm_choices)} answers named no workflow)")
+    print(f"local agrees with LLM         {rate([d['workflow'] for d in local_decisions], llm_choices):.1%}")
+    print(f"combined accuracy             {rate(combined, labels):.1%}")
+    print(f"combined agrees with LLM      {rate(combined, llm_choices):.1%}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
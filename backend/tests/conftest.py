@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Make the ``app`` package importable when pytest is run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# app.main builds its clients at import time; nothing here connects to them
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017")
+os.environ.setdefault("REDIS_URL", "redis://localhost:6379")
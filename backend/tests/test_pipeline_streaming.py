@@ -0,0 +1,79 @@
+import asyncio
+from typing import List
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from app.agents.base import BaseAIAgent
+from app.agents.workflow import TaskSequencer
+
+CHUNKS = ["def add(a, b):\n", "    return a + b\n", "# done\n"]
+
+def text_event(author: str, text: str, partial: bool) -> Event:
+    return Event(author=author, content=types.Content(parts=[types.Part(text=text)]), partial=partial, turn_complete=not partial)
+
+class Producer(BaseAgent):
+    """Streams CHUNKS as partial events, then the whole text as the final event."""
+
+    finished: bool = False
+    delay: float = 0.05
+
+    async def _run_async_impl(self, ctx: InvocationContext):
+        for chunk in CHUNKS:
+            await asyncio.sleep(self.delay)
+            yield text_event(self.name, chunk, partial=True)
+        self.finished = True
+        yield text_event(self.name, "".join(CHUNKS), partial=False)
+
+class Consumer(BaseAIAgent):
+    """Records every upstream chunk with whether the producer had finished when it arrived."""
+
+    producer: Producer = None
+    received: List[tuple] = []
+    stage_input: str = ""
+
+    async def _on_partial_input(self, chunk: str):
+        self.received.append((chunk, self.producer.finished))
+
+    async def _run_async_impl(self, ctx: InvocationContext):
+        self.stage_input = await self._stage_input(ctx)
+        yield text_event(self.name, f"reviewed {len(self.stage_input)} chars", partial=False)
+
+def make_consumer(name: str, producer: Producer, early: bool) -> Consumer:
+    consumer = Consumer(name=name)
+    consumer.producer = producer
+    consumer.received = []
+    consumer.consumes_partial_input = early
+    return consumer
+
+async def run(sequencer: TaskSequencer) -> List[Event]:
+    sessions = InMemorySessionService()
+    session = await sessions.create_session(app_name="test", user_id="user")
+    ctx = InvocationContext(session_service=sessions, invocation_id="invocation", agent=sequencer, session=session)
+    return [event async for event in sequencer.run_async(ctx)]
+
+def test_consumer_reads_upstream_before_producer_finishes():
+    producer = Producer(name="writer")
+    consumer = make_consumer("reviewer", producer, early=True)
+
+    events = asyncio.run(run(TaskSequencer(name="pipeline", sub_agents=[producer, consumer])))
+
+    assert [chunk for chunk, _ in consumer.received] == CHUNKS
+    # The first chunks arrive while the producer is still streaming
+    assert consumer.received[0][1] is False
+    assert consumer.stage_input == "".join(CHUNKS)
+    assert [event.author for event in events][-1] == "reviewer"
+
+def test_late_stage_falls_back_to_full_upstream_output():
+    producer = Producer(name="writer")
+    consumer = make_consumer("reviewer", producer, early=False)
+
+    events = asyncio.run(run(TaskSequencer(name="pipeline", sub_agents=[producer, consumer])))
+
+    # It only starts once the producer is done, so nothing overlaps
+    assert consumer.received == [(chunk, True) for chunk in CHUNKS]
+    assert consumer.stage_input == "".join(CHUNKS)
+    assert [event.author for event in events] == ["writer"] * 4 + ["reviewer"]
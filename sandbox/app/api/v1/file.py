@@ -1,16 +1,78 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from app.services.file_service import FileService
-from app.schemas.file import FileOperation, FileContent
-from typing import List
+from app.services.file_edits import EditConflict, EditError
+from app.schemas.file import EditRequest, EditResult, FileOperation, FileContent, GrepRequest, ReadRequest
+from typing import List, Optional, Tuple
+import json
+import os
+import re
 
 router = APIRouter()
 file_service = FileService()
 
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into ``[start, end)``; None means the whole file."""
+    if not header:
+        return None
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if not match or match.groups() == ("", ""):
+        raise ValueError("Unsupported range")
+    first, last = match.groups()
+    if first:
+        start, end = int(first), int(last) + 1 if last else size
+    else:
+        start, end = max(size - int(last), 0), size
+    end = min(end, size)
+    if start >= end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
 @router.post("/read", response_model=FileContent)
-async def read_file(operation: FileOperation):
-    """Read content from a file in the sandbox."""
-    content = await file_service.read_file(operation.path)
-    return FileContent(content=content)
+async def read_file(request: ReadRequest):
+    """Read a file, or a byte range (offset/length) or line range (start_line/line_count) of it."""
+    try:
+        return await file_service.read_range(
+            request.path,
+            request.offset,
+            request.length,
+            request.start_line,
+            request.line_count,
+            request.encoding
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+@router.get("/download")
+async def download_file(path: str, request: Request):
+    """Stream a file's raw bytes from a memory map, honouring HTTP Range requests."""
+    try:
+        info = file_service.file_info(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+
+    headers = {"Accept-Ranges": "bytes", "ETag": info["etag"]}
+    try:
+        byte_range = parse_range(request.headers.get("range"), info["size"])
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{info['size']}"
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers=headers)
+    start, end = byte_range or (0, info["size"])
+    status_code = 206 if byte_range else 200
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{info['size']}"
+    headers["Content-Length"] = str(end - start)
+    headers["Content-Disposition"] = f'attachment; filename="{os.path.basename(info["path"])}"'
+    return StreamingResponse(
+        file_service.iter_file(info["path"], start, end),
+        status_code=status_code,
+        media_type="application/octet-stream",
+        headers=headers
+    )
 
 @router.post("/write")
 async def write_file(operation: FileOperation):
@@ -19,16 +81,80 @@ async def write_file(operation: FileOperation):
     return {"status": "success"}
 
 @router.post("/search")
-async def search_files(pattern: str) -> List[str]:
-    """Search for files matching a pattern."""
-    return await file_service.search_files(pattern)
+async def search_files(pattern: str, mode: str = "glob", offset: int = 0, limit: int = 100, kind: Optional[str] = None):
+    """Search paths in the sandbox by glob (``**`` aware), prefix or fuzzy match.
+
+    Results come from the in-memory path index, honour ``.gitignore`` and
+    are paginated; pass ``next_offset`` back as ``offset`` for the next page.
+    """
+    try:
+        return await file_service.search_files(pattern, mode, max(offset, 0), min(max(limit, 1), 1000), kind)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/grep")
+async def grep(request: GrepRequest):
+    """Search file contents in parallel and stream matches as NDJSON as they are found.
+
+    Each line is one match with its line, column and ``context`` lines around
+    it; the last line is a summary. The search stops at ``max_results``.
+    """
+    try:
+        matches = await file_service.grep(
+            request.pattern,
+            request.literal,
+            request.case_sensitive,
+            request.path,
+            request.include,
+            min(max(request.context, 0), 20),
+            min(max(request.max_results, 1), 10000)
+        )
+    except re.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pattern: {e}")
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    return StreamingResponse(
+        (json.dumps(match) + "\n" async for match in matches),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"}
+    )
+
+@router.get("/index/stats")
+async def path_index_stats():
+    """Report the size and freshness of the path index."""
+    return file_service.path_index.stats()
 
 @router.post("/replace")
 async def replace_in_file(operation: FileOperation):
-    """Replace content in a file."""
-    await file_service.replace_in_file(
-        operation.path,
-        operation.old_content,
-        operation.new_content
-    )
-    return {"status": "success"}
\ No newline at end of file
+    """Replace content in a file; the file is streamed through a temp file and swapped in atomically."""
+    try:
+        result = await file_service.replace_in_file(
+            operation.path,
+            operation.old_content,
+            operation.new_content
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except EditError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    return {"status": "success", **result}
+
+@router.post("/edit", response_model=List[EditResult])
+async def edit_files(request: EditRequest):
+    """Apply replacements or unified-diff hunks across many files in one all-or-nothing request.
+
+    Pass ``expected_sha256`` or ``expected_mtime`` per file to get a 409
+    instead of overwriting a change made since the file was read.
+    """
+    try:
+        return await file_service.edit_files([edit.dict() for edit in request.edits], request.dry_run)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"File not found: {e.filename}")
+    except EditConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except EditError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=403, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, HTTPException
+from app.services.warm_pool import PoolFullError, WarmPool
+from app.schemas.pool import AcquireRequest, Lease, PoolStats
+
+router = APIRouter()
+warm_pool = WarmPool.from_env()
+
+def get_pool() -> WarmPool:
+    """Return the warm pool, or 503 when WARM_POOL_IMAGE is not set."""
+    if warm_pool is None:
+        raise HTTPException(status_code=503, detail="Warm pool is not configured")
+    return warm_pool
+
+@router.post("/acquire", response_model=Lease)
+async def acquire(request: AcquireRequest):
+    """Lease a running sandbox container; served from the pool without a cold start when one is ready."""
+    try:
+        return await get_pool().acquire(request.session_id)
+    except PoolFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.get("/leases/{lease_id}", response_model=Lease)
+async def get_lease(lease_id: str):
+    """Get the container and host ports behind a lease."""
+    try:
+        return get_pool().get_lease(lease_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/leases/{lease_id}/release", response_model=Lease)
+async def release(lease_id: str):
+    """Hand a container back; it is removed and replaced by a fresh one in the background."""
+    try:
+        return get_pool().release(lease_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/stats", response_model=PoolStats)
+async def get_stats():
+    """Get pool occupancy, the adaptive target size and the hit rate."""
+    return get_pool().stats()
\ No newline at end of file
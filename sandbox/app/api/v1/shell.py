@@ -1,17 +1,137 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import Response, StreamingResponse
 from app.services.shell_service import ShellService
-from app.schemas.shell import CommandRequest, CommandResponse
-from typing import Optional
+from app.services.process_scheduler import SchedulerFullError
+from app.services.pty_session import SessionLimitError
+from app.schemas.shell import BatchRequest, CommandRequest, CommandResponse, SessionRequest, SessionResponse, SessionCommandResponse
+from typing import AsyncGenerator, List, Optional
+import json
 
 router = APIRouter()
 shell_service = ShellService()
 
+async def output_events(chunks: AsyncGenerator[dict, None]) -> AsyncGenerator[str, None]:
+    """Format process output chunks as server-sent events."""
+    async for chunk in chunks:
+        if "data" in chunk:
+            payload = {
+                "stream": chunk["stream"],
+                "offset": chunk["offset"],
+                "length": len(chunk["data"]),
+                "data": chunk["data"].decode(errors="replace")
+            }
+            yield f"event: output\ndata: {json.dumps(payload)}\n\n"
+        else:
+            yield f"event: exit\ndata: {json.dumps(chunk)}\n\n"
+
 @router.post("/execute", response_model=CommandResponse)
 async def execute_command(command: CommandRequest):
     """Execute a shell command in the sandbox environment."""
-    result = await shell_service.execute_command(command.command)
+    result = await shell_service.execute_command(command.command, command.timeout)
     return result
 
+@router.post("/start")
+async def start_command(command: CommandRequest):
+    """Start a shell command and return immediately; follow it via /{process_id}/stream."""
+    try:
+        return await shell_service.start_command(command.command, command.timeout)
+    except SchedulerFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.post("/batch")
+async def execute_batch(batch: BatchRequest):
+    """Run several commands concurrently and stream each result as NDJSON the moment it finishes.
+
+    Commands may name other commands of the batch in ``depends_on``; they
+    start only after those exit 0 and are skipped otherwise. The last line
+    is a summary of the whole batch.
+    """
+    try:
+        results = shell_service.execute_batch(
+            [command.dict() for command in batch.commands],
+            batch.max_concurrency,
+            batch.fail_fast
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        (json.dumps(result) + "\n" async for result in results),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stats")
+async def get_stats():
+    """Report running and queued command counts."""
+    return shell_service.get_stats()
+
+@router.post("/sessions", response_model=SessionResponse)
+async def create_session(request: SessionRequest):
+    """Open a persistent shell session; cwd, env and activated virtualenvs carry over between its commands."""
+    try:
+        return await shell_service.create_session(request.cwd, request.env)
+    except SessionLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.get("/sessions", response_model=List[SessionResponse])
+async def list_sessions():
+    """List open shell sessions."""
+    return shell_service.list_sessions()
+
+@router.post("/sessions/{session_id}/execute", response_model=SessionCommandResponse)
+async def execute_in_session(session_id: str, command: CommandRequest):
+    """Run a command inside a shell session."""
+    try:
+        return await shell_service.execute_in_session(session_id, command.command, command.timeout)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@router.post("/sessions/{session_id}/input")
+async def send_session_input(session_id: str, input_data: str):
+    """Send a line of input to the command running in a shell session."""
+    try:
+        return await shell_service.send_session_input(session_id, input_data)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.delete("/sessions/{session_id}")
+async def close_session(session_id: str):
+    """Close a shell session and kill everything it started."""
+    try:
+        return await shell_service.close_session(session_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/{process_id}/stream")
+async def stream_output(process_id: str, stdout_offset: int = 0, stderr_offset: int = 0):
+    """Stream a process's output as SSE, resuming from the given byte offsets."""
+    if not shell_service.has_process(process_id):
+        raise HTTPException(status_code=404, detail="Process not found")
+    chunks = shell_service.stream_output(process_id, {"stdout": stdout_offset, "stderr": stderr_offset})
+    return StreamingResponse(
+        output_events(chunks),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/{process_id}/output")
+async def read_output(process_id: str, stream: str = "stdout", start: int = 0, end: Optional[int] = None):
+    """Fetch a byte range of a process's full spooled output."""
+    try:
+        result = await shell_service.read_output(process_id, stream, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(
+        content=result["data"],
+        media_type="application/octet-stream",
+        headers={
+            "X-Output-Size": str(result["size"]),
+            "X-Output-Finished": str(result["finished"]).lower()
+        }
+    )
+
 @router.get("/{process_id}/status")
 async def get_process_status(process_id: str):
     """Get the status of a running process."""
@@ -1,30 +1,81 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.services.supervisor_service import SupervisorService
-from app.schemas.supervisor import ServiceStatus, ServiceOperation
-from typing import List
+from app.schemas.supervisor import ServiceHistory, ServiceStatus
+from typing import AsyncGenerator, List, Optional
+import asyncio
+import json
 
 router = APIRouter()
 supervisor = SupervisorService()
 
+async def state_events() -> AsyncGenerator[str, None]:
+    """Format state table changes as server-sent events, starting with a snapshot."""
+    async with supervisor.state.subscribe() as queue:
+        snapshot = {"version": supervisor.state.version, "services": supervisor.state.snapshot()}
+        yield f"event: snapshot\ndata: {json.dumps(snapshot)}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=15)
+            except asyncio.TimeoutError:
+                # Keep idle connections from being closed by proxies
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def submit(service_name: str, action: str) -> dict:
+    """Queue a service operation, mapping unknown services to 404."""
+    try:
+        return supervisor.submit_operation(service_name, action)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 @router.get("/status", response_model=List[ServiceStatus])
 async def get_status():
-    """Get status of all managed services."""
+    """Get status of all managed services: event-driven state plus the last resource sample."""
     return await supervisor.get_all_status()
 
-@router.post("/{service_name}/start")
+@router.get("/{service_name}/history", response_model=ServiceHistory)
+async def get_history(service_name: str, points: int = 120, seconds: Optional[float] = None):
+    """Get a service's CPU and memory history, averaged down to at most ``points`` samples."""
+    try:
+        return supervisor.get_history(service_name, min(max(points, 1), 1000), seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/events")
+async def stream_events():
+    """Stream service state changes and operation progress as server-sent events.
+
+    The first event is a ``snapshot`` of every service; afterwards each
+    ``state`` or ``operation`` event carries a monotonically increasing
+    version.
+    """
+    return StreamingResponse(
+        state_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/operations/{operation_id}")
+async def get_operation(operation_id: str):
+    """Get the progress of a start, stop or restart operation."""
+    operation = supervisor.operations.get(operation_id)
+    if operation is None:
+        raise HTTPException(status_code=404, detail="Operation not found")
+    return operation
+
+@router.post("/{service_name}/start", status_code=202)
 async def start_service(service_name: str):
-    """Start a service."""
-    await supervisor.start_service(service_name)
-    return {"status": "started"}
+    """Start a service; returns at once, completion is reported on /events."""
+    return submit(service_name, "start")
 
-@router.post("/{service_name}/stop")
+@router.post("/{service_name}/stop", status_code=202)
 async def stop_service(service_name: str):
-    """Stop a service."""
-    await supervisor.stop_service(service_name)
-    return {"status": "stopped"}
+    """Stop a service; returns at once, completion is reported on /events."""
+    return submit(service_name, "stop")
 
-@router.post("/{service_name}/restart")
+@router.post("/{service_name}/restart", status_code=202)
 async def restart_service(service_name: str):
-    """Restart a service."""
-    await supervisor.restart_service(service_name)
-    return {"status": "restarted"}
\ No newline at end of file
+    """Restart a service; returns at once, completion is reported on /events."""
+    return submit(service_name, "restart")
\ No newline at end of file
@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+import asyncio
 import os
 from dotenv import load_dotenv
 
@@ -19,14 +20,33 @@ app.add_middleware(
 )
 
 # Import and include routers
-from app.api.v1.shell import router as shell_router
-from app.api.v1.file import router as file_router
-from app.api.v1.supervisor import router as supervisor_router
+from app.api.v1.shell import router as shell_router, shell_service
+from app.api.v1.file import router as file_router, file_service
+from app.api.v1.supervisor import router as supervisor_router, supervisor
+from app.api.v1.pool import router as pool_router, warm_pool
+
+@app.on_event("startup")
+async def startup_event():
+    # Build the path index in the background so the first search does not pay for the walk
+    asyncio.create_task(file_service.path_index.ensure_fresh())
+    await supervisor.start()
+    if warm_pool is not None:
+        await warm_pool.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Do not leave command process groups running after the API goes away
+    await shell_service.shutdown()
+    file_service.content_searcher.shutdown()
+    await supervisor.shutdown()
+    if warm_pool is not None:
+        await warm_pool.shutdown()
 
 # Include routers
 app.include_router(shell_router, prefix="/api/v1/shell", tags=["shell"])
 app.include_router(file_router, prefix="/api/v1/file", tags=["file"])
 app.include_router(supervisor_router, prefix="/api/v1/supervisor", tags=["supervisor"])
+app.include_router(pool_router, prefix="/api/v1/pool", tags=["pool"])
 
 if __name__ == "__main__":
     uvicorn.run(
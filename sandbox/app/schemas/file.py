@@ -1,11 +1,62 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 class FileOperation(BaseModel):
     path: str
-    content: Optional[str]
-    old_content: Optional[str]
-    new_content: Optional[str]
+    content: Optional[str] = None
+    old_content: Optional[str] = None
+    new_content: Optional[str] = None
+
+class ReadRequest(BaseModel):
+    path: str
+    offset: Optional[int] = None
+    length: Optional[int] = None
+    start_line: Optional[int] = None
+    line_count: Optional[int] = None
+    encoding: Optional[str] = None
 
 class FileContent(BaseModel):
-    content: str
\ No newline at end of file
+    content: str
+    encoding: str = "utf-8"
+    size: Optional[int] = None
+    mtime: Optional[float] = None
+    offset: Optional[int] = None
+    length: Optional[int] = None
+    start_line: Optional[int] = None
+    end_line: Optional[int] = None
+    total_lines: Optional[int] = None
+    truncated: bool = False
+
+class GrepRequest(BaseModel):
+    pattern: str
+    literal: bool = False
+    case_sensitive: bool = True
+    path: Optional[str] = None
+    include: Optional[str] = None
+    context: int = 0
+    max_results: int = 1000
+
+class Replacement(BaseModel):
+    old: str
+    new: str
+    count: Optional[int] = None
+
+class FileEdit(BaseModel):
+    path: str
+    replacements: List[Replacement] = []
+    patch: Optional[str] = None
+    expected_sha256: Optional[str] = None
+    expected_mtime: Optional[float] = None
+
+class EditRequest(BaseModel):
+    edits: List[FileEdit]
+    dry_run: bool = False
+
+class EditResult(BaseModel):
+    path: str
+    status: str
+    replacements: int
+    hunks: int
+    sha256: str
+    mtime: float
+    diff: str
\ No newline at end of file
@@ -0,0 +1,25 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+class AcquireRequest(BaseModel):
+    session_id: Optional[str] = None
+
+class Lease(BaseModel):
+    lease_id: Optional[str] = None
+    session_id: Optional[str] = None
+    container_id: str
+    container_name: str
+    ports: Dict[str, Optional[int]]
+    leased_at: Optional[float] = None
+
+class PoolStats(BaseModel):
+    image: str
+    ready: int
+    leased: int
+    starting: int
+    removing: int
+    target: int
+    arrival_rate_per_minute: float
+    start_seconds: float
+    hits: int
+    misses: int
\ No newline at end of file
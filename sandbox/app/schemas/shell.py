@@ -1,12 +1,46 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
 
 class CommandRequest(BaseModel):
     command: str
     timeout: Optional[int] = 60
 
+class BatchCommand(BaseModel):
+    id: Optional[str] = None
+    command: str
+    timeout: Optional[int] = 60
+    depends_on: List[str] = []
+
+class BatchRequest(BaseModel):
+    commands: List[BatchCommand]
+    max_concurrency: Optional[int] = Field(None, ge=1)
+    fail_fast: bool = False
+
 class CommandResponse(BaseModel):
     process_id: str
     output: str
     exit_code: Optional[int]
-    error: Optional[str]
\ No newline at end of file
+    error: Optional[str]
+    output_truncated: bool = False
+    status: Optional[str] = None
+
+class SessionRequest(BaseModel):
+    cwd: Optional[str] = None
+    env: Optional[Dict[str, str]] = None
+
+class SessionResponse(BaseModel):
+    session_id: str
+    pid: Optional[int] = None
+    cwd: str
+    busy: bool
+    created_at: float
+    idle_seconds: float
+
+class SessionCommandResponse(BaseModel):
+    session_id: str
+    output: str
+    exit_code: Optional[int] = None
+    cwd: str
+    status: str
+    output_truncated: bool = False
+    duration: float
\ No newline at end of file
@@ -1,13 +1,20 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 class ServiceStatus(BaseModel):
     name: str
     status: str
-    uptime: Optional[datetime]
-    memory_usage: Optional[float]
-    cpu_usage: Optional[float]
+    uptime: Optional[datetime] = None
+    memory_usage: Optional[float] = None
+    cpu_usage: Optional[float] = None
+    error: Optional[str] = None
+
+class ServiceHistory(BaseModel):
+    name: str
+    timestamps: List[float]
+    cpu: List[float]
+    memory: List[float]
 
 class ServiceOperation(BaseModel):
     name: str
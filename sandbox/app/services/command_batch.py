@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+
+class CommandBatch:
+    """Runs a set of commands concurrently while honouring ``depends_on`` edges.
+
+    Commands without unfinished dependencies start as soon as a slot under
+    ``max_concurrency`` is free; results are yielded in completion order.
+    A command whose dependency did not exit 0 is skipped, and with
+    ``fail_fast`` the first failure skips everything not yet started.
+    """
+
+    def __init__(
+        self,
+        commands: List[dict],
+        run: Callable[[str, Optional[int]], Awaitable[dict]],
+        max_concurrency: int,
+        fail_fast: bool = False
+    ):
+        self.commands = [dict(command, id=command.get("id") or str(index)) for index, command in enumerate(commands)]
+        self.run_command = run
+        self.max_concurrency = max_concurrency
+        self.fail_fast = fail_fast
+        self._validate()
+
+    def _validate(self):
+        ids = [command["id"] for command in self.commands]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Command ids must be unique")
+        known = set(ids)
+        for command in self.commands:
+            missing = set(command.get("depends_on") or ()) - known
+            if missing:
+                raise ValueError(f"Command {command['id']} depends on unknown ids: {', '.join(sorted(missing))}")
+
+        # Kahn's algorithm; anything left unvisited sits on a cycle
+        indegree = {command["id"]: len(set(command.get("depends_on") or ())) for command in self.commands}
+        dependents: Dict[str, List[str]] = {command_id: [] for command_id in ids}
+        for command in self.commands:
+            for dependency in set(command.get("depends_on") or ()):
+                dependents[dependency].append(command["id"])
+        ready = [command_id for command_id, degree in indegree.items() if degree == 0]
+        visited = 0
+        while ready:
+            command_id = ready.pop()
+            visited += 1
+            for dependent in dependents[command_id]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    ready.append(dependent)
+        if visited != len(ids):
+            raise ValueError("Command dependencies contain a cycle")
+
+    async def run(self) -> AsyncGenerator[dict, None]:
+        """Yield each command's result as soon as it finishes, then a summary."""
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        finished: Dict[str, asyncio.Future] = {
+            command["id"]: asyncio.get_running_loop().create_future() for command in self.commands
+        }
+        results: asyncio.Queue = asyncio.Queue()
+        aborted = False
+
+        async def run_one(command: dict):
+            nonlocal aborted
+            result = {"id": command["id"], "command": command["command"]}
+            try:
+                dependencies = sorted(set(command.get("depends_on") or ()))
+                # Shielded so cancelling one waiter does not cancel the shared future
+                outcomes = [await asyncio.shield(finished[dependency]) for dependency in dependencies]
+                failed = [dependency for dependency, ok in zip(dependencies, outcomes) if not ok]
+                if failed:
+                    result.update(status="skipped", error=f"Dependency failed: {', '.join(failed)}")
+                    return
+                async with semaphore:
+                    if aborted:
+                        result.update(status="skipped", error="Batch aborted after an earlier failure")
+                        return
+                    result["started"] = time.monotonic() - started
+                    result.update(await self.run_command(command["command"], command.get("timeout")))
+                    result["duration"] = time.monotonic() - started - result["started"]
+                if result.get("exit_code") != 0 and self.fail_fast:
+                    aborted = True
+            finally:
+                if not finished[command["id"]].done():
+                    finished[command["id"]].set_result(result.get("exit_code") == 0)
+                results.put_nowait(result)
+
+        tasks = [asyncio.create_task(run_one(command)) for command in self.commands]
+        counts: Dict[str, int] = {}
+        try:
+            for _ in tasks:
+                result = await results.get()
+                if result.get("status") == "skipped":
+                    outcome = "skipped"
+                else:
+                    outcome = "succeeded" if result.get("exit_code") == 0 else "failed"
+                counts[outcome] = counts.get(outcome, 0) + 1
+                yield result
+            yield {"summary": {"total": len(tasks), **counts, "duration": time.monotonic() - started}}
+        finally:
+            # The client went away or the batch finished; do not leave commands running
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
\ No newline at end of file
@@ -0,0 +1,210 @@
+import asyncio
+import multiprocessing
+import os
+import re
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncGenerator, Dict, List, Optional
+
+BINARY_SNIFF_BYTES = 8192
+
+class SearchTimeout(Exception):
+    """Raised inside a worker when a batch overruns its time budget."""
+
+def _on_alarm(signum, frame):
+    raise SearchTimeout()
+
+def search_batch(
+    root: str,
+    paths: List[str],
+    pattern: str,
+    flags: int,
+    context: int,
+    max_matches: int,
+    max_file_bytes: int,
+    timeout: float
+) -> dict:
+    """Search a batch of files in a worker process.
+
+    Returns the matches, how many files were read and whether the batch was
+    cut short by ``timeout``. The timer interrupts a runaway regex as well
+    as a blocking read, so a worker is never pinned past its budget.
+    """
+    progress = {"matches": [], "searched": 0, "timed_out": False}
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        _search_files(progress, root, paths, re.compile(pattern, flags), context, max_matches, max_file_bytes)
+    except SearchTimeout:
+        progress["timed_out"] = True
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    return progress
+
+def _search_files(progress: dict, root: str, paths: List[str], regex: re.Pattern, context: int, max_matches: int, max_file_bytes: int):
+    matches = progress["matches"]
+    for path in paths:
+        full_path = os.path.join(root, path)
+        try:
+            if os.path.getsize(full_path) > max_file_bytes:
+                continue
+            with open(full_path, "rb") as file:
+                data = file.read()
+        except OSError:
+            continue
+        if b"\0" in data[:BINARY_SNIFF_BYTES]:
+            continue
+        progress["searched"] += 1
+        text = data.decode("utf-8", errors="replace")
+        if regex.search(text) is None:
+            continue
+
+        # Number lines by \n only, like /file/read; splitlines() would also break on \r, \f, \x85, \u2028...
+        lines = text.split("\n")
+        if lines[-1] == "":
+            lines.pop()
+        lines = [line[:-1] if line.endswith("\r") else line for line in lines]
+        for number, line in enumerate(lines):
+            found = regex.search(line)
+            if found is None:
+                continue
+            matches.append({
+                "path": path,
+                "line": number + 1,
+                "column": found.start() + 1,
+                "text": line,
+                "before": lines[max(number - context, 0):number] if context else [],
+                "after": lines[number + 1:number + 1 + context] if context else []
+            })
+            if len(matches) >= max_matches:
+                return
+
+class ContentSearcher:
+    """Greps files in parallel across a process pool.
+
+    Candidate files are split into batches so each worker call amortises
+    its IPC cost over many files. Only a bounded number of batches is in
+    flight at once, so hitting the result limit stops the search early
+    instead of leaving the whole tree queued in the pool. Each batch gets
+    ``task_timeout`` seconds inside its worker; a worker that still has not
+    answered well past that is presumed stuck and the pool is replaced.
+    """
+
+    def __init__(self, workers: int, batch_size: int = 64, max_file_bytes: int = 10 * 1024 * 1024, task_timeout: float = 10.0):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_file_bytes = max_file_bytes
+        self.task_timeout = task_timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and threads is not safe
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    @staticmethod
+    def compile(pattern: str, literal: bool = False, case_sensitive: bool = True) -> re.Pattern:
+        """Validate the query up front so a bad regex fails the request, not a worker."""
+        flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+        return re.compile(re.escape(pattern) if literal else pattern, flags)
+
+    async def search(
+        self,
+        root: str,
+        paths: List[str],
+        regex: re.Pattern,
+        context: int = 0,
+        max_results: int = 1000
+    ) -> AsyncGenerator[dict, None]:
+        """Yield matches as batches complete, then a summary line."""
+        started = time.monotonic()
+        batches = [paths[i:i + self.batch_size] for i in range(0, len(paths), self.batch_size)]
+        # A batch may queue behind one other per worker before it starts
+        deadline = 2 * self.task_timeout + 5
+        pending: Dict[asyncio.Future, float] = {}
+        next_batch = 0
+        found = 0
+        searched = 0
+        timed_out = 0
+        # Set when matches past max_results were seen and discarded
+        dropped = False
+        matched_files = set()
+        try:
+            while next_batch < len(batches) or pending:
+                while next_batch < len(batches) and len(pending) < self.workers * 2:
+                    future = self._submit(
+                        root,
+                        batches[next_batch],
+                        regex.pattern,
+                        regex.flags,
+                        context,
+                        # One past the limit, so a full batch shows whether anything was left out
+                        max_results - found + 1,
+                        self.max_file_bytes,
+                        self.task_timeout
+                    )
+                    pending[future] = time.monotonic() + deadline
+                    next_batch += 1
+                wait = max(min(pending.values()) - time.monotonic(), 0)
+                done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # The worker ignored its own timer; kill it rather than let it hold a slot forever
+                    self._recycle()
+                    continue
+                for future in done:
+                    del pending[future]
+                    if future.cancelled() or future.exception() is not None:
+                        timed_out += 1
+                        continue
+                    result = future.result()
+                    searched += result["searched"]
+                    timed_out += result["timed_out"]
+                    for match in result["matches"]:
+                        if found >= max_results:
+                            dropped = True
+                            break
+                        found += 1
+                        matched_files.add(match["path"])
+                        yield match
+                if found >= max_results:
+                    break
+            yield {"summary": {
+                "matches": found,
+                "files_searched": searched,
+                "files_matched": len(matched_files),
+                "truncated": dropped or (found >= max_results and (bool(pending) or next_batch < len(batches))),
+                "timed_out_batches": timed_out,
+                "duration": time.monotonic() - started
+            }}
+        finally:
+            # Batches not yet picked up by a worker are dropped; running ones finish unobserved
+            for future in pending:
+                future.cancel()
+
+    def _submit(self, *args) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        try:
+            return loop.run_in_executor(self.pool, search_batch, *args)
+        except BrokenProcessPool:
+            # A worker died since the last search; start over with a fresh pool
+            self._recycle()
+            return loop.run_in_executor(self.pool, search_batch, *args)
+
+    def _recycle(self):
+        """Replace the pool, terminating its workers; searches still using it see their batches fail."""
+        pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
\ No newline at end of file
@@ -0,0 +1,273 @@
+import difflib
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from typing import Iterable, List, Optional, Tuple
+
+CHUNK_CHARS = 1024 * 1024
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+class EditError(ValueError):
+    """An edit could not be applied to the current file content."""
+
+class EditConflict(EditError):
+    """The file changed since the caller last read it."""
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(CHUNK_CHARS), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _current_umask() -> int:
+    # Read once at import, before worker threads exist: os.umask can only be read by setting it
+    mask = os.umask(0o022)
+    os.umask(mask)
+    return mask
+
+UMASK = _current_umask()
+
+def _discard(path: Optional[str]):
+    if path is None:
+        return
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+def stage_write(path: str, chunks: Iterable[str]) -> Tuple[str, int]:
+    """Write ``chunks`` to a synced temp file next to ``path``; returns its path and the characters written.
+
+    The temp file gets the permissions of ``path``, or the umask-based mode a
+    newly created file would have, so renaming it into place changes
+    nothing but the content.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    written = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as file:
+            for chunk in chunks:
+                file.write(chunk)
+                written += len(chunk)
+            file.flush()
+            os.fsync(file.fileno())
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~UMASK
+        os.chmod(temp_path, mode)
+    except BaseException:
+        _discard(temp_path)
+        raise
+    return temp_path, written
+
+def atomic_write(path: str, chunks: Iterable[str]) -> int:
+    """Write ``chunks`` to a temp file next to ``path`` and rename it into place.
+
+    Readers see either the old or the new file, never a partial one, and a
+    crash mid-write leaves the original untouched. A symlinked ``path`` is
+    resolved first, so the link is kept and its target is replaced.
+    """
+    path = os.path.realpath(path)
+    temp_path, written = stage_write(path, chunks)
+    try:
+        os.replace(temp_path, path)
+    except BaseException:
+        _discard(temp_path)
+        raise
+    return written
+
+def atomic_write_many(writes: List[Tuple[str, str]]):
+    """Replace several files with new content so that either all change or none do.
+
+    Every temp file is written and synced before the first rename, so a
+    full disk or a permission error fails the batch with all files intact.
+    Each original is hard-linked aside before it is replaced; if a later
+    rename fails, files already replaced are restored from those links.
+    """
+    targets = [os.path.realpath(path) for path, _ in writes]
+    staged: List[str] = []
+    backups: List[Tuple[str, Optional[str]]] = []
+    try:
+        for target, (_, content) in zip(targets, writes):
+            staged.append(stage_write(target, [content])[0])
+        for target, temp_path in zip(targets, staged):
+            backups.append((target, _keep_original(target)))
+            os.replace(temp_path, target)
+    except BaseException:
+        for target, backup in reversed(backups):
+            if backup is None:
+                _discard(target)
+            else:
+                os.replace(backup, target)
+                # rename() between two links to the same file is a no-op and leaves the backup behind
+                _discard(backup)
+        for temp_path in staged:
+            _discard(temp_path)
+        raise
+    for _, backup in backups:
+        _discard(backup)
+
+def _keep_original(path: str) -> Optional[str]:
+    """Link ``path`` to a hidden name beside it so it can be put back; None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    backup = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{uuid.uuid4().hex}.orig")
+    try:
+        os.link(path, backup)
+    except OSError:
+        # No hard links on this filesystem
+        shutil.copy2(path, backup)
+    return backup
+
+def stream_replace(path: str, old: str, new: str, count: int = -1) -> int:
+    """Replace ``old`` with ``new`` chunk by chunk through a temp file; returns the number of replacements.
+
+    Matches that straddle a chunk boundary are found by holding back the
+    last ``len(old) - 1`` characters of each chunk. The file is only
+    rewritten if something was replaced.
+    """
+    if not old:
+        raise EditError("Text to replace must not be empty")
+    replaced = 0
+
+    def replaced_chunks():
+        nonlocal replaced
+        buffer = ""
+        with open(path, "r", encoding="utf-8", newline="") as source:
+            while True:
+                chunk = source.read(CHUNK_CHARS)
+                buffer += chunk
+                # Occurrences starting before `safe` are complete within the buffer
+                safe = len(buffer) - (len(old) - 1) if chunk else len(buffer)
+                position = 0
+                parts = []
+                while count < 0 or replaced < count:
+                    found = buffer.find(old, position)
+                    if found == -1 or found >= safe:
+                        break
+                    parts.append(buffer[position:found])
+                    parts.append(new)
+                    position = found + len(old)
+                    replaced += 1
+                keep = max(position, safe)
+                parts.append(buffer[position:keep])
+                buffer = buffer[keep:]
+                yield "".join(parts)
+                if not chunk:
+                    yield buffer
+                    return
+
+    # Count first without writing, so an edit that matches nothing never touches the file
+    with open(path, "r", encoding="utf-8", newline="") as source:
+        tail = ""
+        found = False
+        while not found:
+            chunk = source.read(CHUNK_CHARS)
+            if not chunk:
+                break
+            found = old in tail + chunk
+            tail = (tail + chunk)[-(len(old) - 1):] if len(old) > 1 else ""
+    if not found:
+        return 0
+    atomic_write(path, replaced_chunks())
+    return replaced
+
+def apply_replacements(content: str, replacements: List[dict]) -> Tuple[str, int]:
+    """Apply ``{"old", "new", "count"}`` replacements in order; every ``old`` must occur."""
+    total = 0
+    for replacement in replacements:
+        old, new = replacement["old"], replacement["new"]
+        if not old:
+            raise EditError("Text to replace must not be empty")
+        occurrences = content.count(old)
+        if occurrences == 0:
+            raise EditError(f"Text not found: {old[:80]!r}")
+        count = replacement.get("count")
+        if count is not None and count > 0:
+            occurrences = min(occurrences, count)
+            content = content.replace(old, new, count)
+        else:
+            content = content.replace(old, new)
+        total += occurrences
+    return content, total
+
+def apply_patch(content: str, patch: str) -> Tuple[str, int]:
+    """Apply the hunks of a single-file unified diff; returns the new content and hunk count.
+
+    A hunk whose context is not at its stated line is searched for in the
+    rest of the file, nearest first, the way ``patch`` tolerates offsets.
+    """
+    crlf = "\r\n" in content
+    lines = content.split("\n")
+    hunks = _parse_hunks(patch)
+    if not hunks:
+        raise EditError("Patch contains no hunks")
+    shift = 0
+    for start, old_lines, new_lines in hunks:
+        expected = max(start - 1 + shift, 0)
+        position = _locate(lines, old_lines, expected)
+        if position is None:
+            raise EditError(f"Hunk at line {start} does not apply")
+        if crlf:
+            new_lines = [line + "\r" for line in new_lines]
+        lines[position:position + len(old_lines)] = new_lines
+        shift = position - (start - 1) + len(new_lines) - len(old_lines)
+    return "\n".join(lines), len(hunks)
+
+def _parse_hunks(patch: str) -> List[Tuple[int, List[str], List[str]]]:
+    hunks = []
+    current = None
+    for line in patch.splitlines():
+        header = HUNK_HEADER.match(line)
+        if header:
+            current = (int(header.group(1)), [], [])
+            hunks.append(current)
+            continue
+        if current is None or line.startswith("\\"):
+            # File headers before the first hunk, and "\ No newline at end of file"
+            continue
+        marker, text = line[:1], line[1:]
+        if marker in (" ", ""):
+            current[1].append(text)
+            current[2].append(text)
+        elif marker == "-":
+            current[1].append(text)
+        elif marker == "+":
+            current[2].append(text)
+    return hunks
+
+def _locate(lines: List[str], old_lines: List[str], expected: int) -> Optional[int]:
+    if not old_lines:
+        return min(expected, len(lines))
+    wanted = [line.rstrip("\r") for line in old_lines]
+    last = len(lines) - len(old_lines)
+    for distance in range(0, len(lines) + 1):
+        for position in (expected - distance, expected + distance):
+            if 0 <= position <= last and [line.rstrip("\r") for line in lines[position:position + len(old_lines)]] == wanted:
+                return position
+            if distance == 0:
+                break
+    return None
+
+def compact_diff(path: str, before: str, after: str, max_lines: int = 200) -> str:
+    """Unified diff with one line of context, cut off after ``max_lines`` lines."""
+    diff = difflib.unified_diff(
+        before.splitlines(keepends=True),
+        after.splitlines(keepends=True),
+        fromfile=f"a/{path}",
+        tofile=f"b/{path}",
+        n=1
+    )
+    lines = []
+    for line in diff:
+        if len(lines) == max_lines:
+            lines.append("... diff truncated\n")
+            break
+        lines.append(line if line.endswith("\n") else line + "\n")
+    return "".join(lines)
\ No newline at end of file
@@ -1,12 +1,35 @@
 import os
-import glob
-from typing import List
+import asyncio
+import base64
+import hashlib
+import mmap
+from typing import AsyncGenerator, Iterator, List, Optional
 import aiofiles
 import re
+from app.services.line_index import LineIndexCache
+from app.services.path_index import PathIndex, translate_glob
+from app.services.content_search import ContentSearcher
+from app.services.file_edits import EditConflict, EditError, apply_patch, apply_replacements, atomic_write, atomic_write_many, compact_diff, file_sha256, stream_replace
 
 class FileService:
     def __init__(self):
         self.sandbox_root = os.getenv("SANDBOX_ROOT", "/sandbox")
+        self.max_read_bytes = int(os.getenv("FILE_MAX_READ_BYTES", 8 * 1024 * 1024))
+        self.line_indexes = LineIndexCache(
+            max_entries=int(os.getenv("FILE_LINE_INDEX_ENTRIES", 64)),
+            stride=int(os.getenv("FILE_LINE_INDEX_STRIDE", 1000))
+        )
+        self.path_index = PathIndex(
+            self.sandbox_root,
+            ignore=os.getenv("PATH_INDEX_IGNORE", ".git,node_modules,__pycache__,.venv").split(","),
+            refresh_interval=float(os.getenv("PATH_INDEX_REFRESH_SECONDS", 2))
+        )
+        self.content_searcher = ContentSearcher(
+            workers=int(os.getenv("CONTENT_SEARCH_WORKERS", os.cpu_count() or 2)),
+            max_file_bytes=int(os.getenv("CONTENT_SEARCH_MAX_FILE_BYTES", 10 * 1024 * 1024)),
+            task_timeout=float(os.getenv("CONTENT_SEARCH_TASK_TIMEOUT_SECONDS", 10))
+        )
+        self.max_edit_bytes = int(os.getenv("FILE_MAX_EDIT_BYTES", 32 * 1024 * 1024))
 
     async def read_file(self, path: str) -> str:
         """Read content from a file in the sandbox."""
@@ -17,6 +40,98 @@ class FileService:
             content = await file.read()
         return content
 
+    async def read_range(
+        self,
+        path: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        start_line: Optional[int] = None,
+        line_count: Optional[int] = None,
+        encoding: Optional[str] = None
+    ) -> dict:
+        """Read a byte range or a line range of a file.
+
+        Line ranges are resolved through a cached sparse line index, so paging
+        deep into a large log costs the same as reading its first page; a
+        negative ``start_line`` counts from the end of the file. Binary
+        content, or ``encoding="base64"``, is returned base64-encoded.
+        """
+        full_path = os.path.join(self.sandbox_root, path)
+        self._validate_path(full_path)
+        if start_line is not None or line_count is not None:
+            return await asyncio.to_thread(self._read_lines, full_path, start_line or 0, line_count, encoding)
+        return await asyncio.to_thread(self._read_bytes, full_path, offset or 0, length, encoding)
+
+    def _read_bytes(self, full_path: str, offset: int, length: Optional[int], encoding: Optional[str]) -> dict:
+        stat = os.stat(full_path)
+        size = stat.st_size
+        offset = max(offset, 0)
+        limit = self.max_read_bytes if length is None else min(length, self.max_read_bytes)
+        with open(full_path, "rb") as file:
+            file.seek(offset)
+            data = file.read(limit)
+        result = self._encode(data, encoding)
+        result.update(
+            size=size,
+            mtime=stat.st_mtime,
+            offset=offset,
+            length=len(data),
+            truncated=offset + len(data) < size and (length is None or length > len(data))
+        )
+        return result
+
+    def _read_lines(self, full_path: str, start_line: int, line_count: Optional[int], encoding: Optional[str]) -> dict:
+        index = self.line_indexes.get(full_path)
+        total = index.line_count
+        if start_line < 0:
+            start_line = max(total + start_line, 0)
+        if line_count is None:
+            line_count = total - start_line
+        lines, begin, end, truncated = index.read_lines(start_line, max(line_count, 0), self.max_read_bytes)
+        data = b"".join(lines)
+        result = self._encode(data, encoding)
+        stat = os.stat(full_path)
+        result.update(
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            offset=begin,
+            length=len(data),
+            start_line=start_line,
+            end_line=start_line + len(lines),
+            total_lines=total,
+            truncated=truncated
+        )
+        return result
+
+    def _encode(self, data: bytes, encoding: Optional[str]) -> dict:
+        if encoding != "base64" and b"\0" not in data[:8192]:
+            try:
+                return {"content": data.decode("utf-8"), "encoding": "utf-8"}
+            except UnicodeDecodeError:
+                if encoding == "utf-8":
+                    return {"content": data.decode("utf-8", errors="replace"), "encoding": "utf-8"}
+        return {"content": base64.b64encode(data).decode("ascii"), "encoding": "base64"}
+
+    def file_info(self, path: str) -> dict:
+        """Resolve and stat a file for download."""
+        full_path = os.path.join(self.sandbox_root, path)
+        self._validate_path(full_path)
+        stat = os.stat(full_path)
+        return {
+            "path": full_path,
+            "size": stat.st_size,
+            "etag": f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        }
+
+    def iter_file(self, full_path: str, start: int, end: int, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """Yield ``[start, end)`` of a file from a memory map, without buffering it whole."""
+        if end <= start:
+            return
+        with open(full_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = min(end, len(mapped))
+            for position in range(start, end, chunk_size):
+                yield mapped[position:min(position + chunk_size, end)]
+
     async def write_file(self, path: str, content: str):
         """Write content to a file in the sandbox."""
         full_path = os.path.join(self.sandbox_root, path)
@@ -25,20 +140,131 @@ class FileService:
         # Ensure directory exists
         os.makedirs(os.path.dirname(full_path), exist_ok=True)
         
-        async with aiofiles.open(full_path, mode='w') as file:
-            await file.write(content)
-
-    async def search_files(self, pattern: str) -> List[str]:
-        """Search for files matching a pattern."""
-        full_pattern = os.path.join(self.sandbox_root, pattern)
-        matches = glob.glob(full_pattern, recursive=True)
-        return [os.path.relpath(p, self.sandbox_root) for p in matches]
-
-    async def replace_in_file(self, path: str, old_content: str, new_content: str):
-        """Replace content in a file."""
-        content = await self.read_file(path)
-        updated_content = content.replace(old_content, new_content)
-        await self.write_file(path, updated_content)
+        await asyncio.to_thread(atomic_write, full_path, [content])
+        self.path_index.mark_stale(os.path.relpath(full_path, self.sandbox_root))
+
+    async def search_files(
+        self,
+        pattern: str,
+        mode: str = "glob",
+        offset: int = 0,
+        limit: int = 100,
+        kind: Optional[str] = None
+    ) -> dict:
+        """Search indexed paths by glob, prefix or fuzzy match, one page at a time."""
+        await self.path_index.ensure_fresh()
+        return await asyncio.to_thread(self.path_index.query, mode, pattern.lstrip("/"), offset, limit, kind)
+
+    async def grep(
+        self,
+        pattern: str,
+        literal: bool = False,
+        case_sensitive: bool = True,
+        path: Optional[str] = None,
+        include: Optional[str] = None,
+        context: int = 0,
+        max_results: int = 1000
+    ) -> AsyncGenerator[dict, None]:
+        """Search file contents under ``path``, optionally limited to files matching the ``include`` glob.
+
+        Candidates come from the path index, so ignored files are never
+        opened; binary and oversized files are skipped by the workers.
+        """
+        regex = self.content_searcher.compile(pattern, literal, case_sensitive)
+        full_path = os.path.join(self.sandbox_root, path or "")
+        self._validate_path(full_path)
+        relative = os.path.relpath(full_path, self.sandbox_root)
+        await self.path_index.ensure_fresh()
+        if os.path.isfile(full_path):
+            files = [relative]
+        else:
+            files = self.path_index.files("" if relative == "." else relative + "/")
+        if include:
+            included = re.compile(translate_glob(include.lstrip("/")) + "$")
+            # A bare pattern like "*.py" applies at any depth
+            basename_only = "/" not in include
+            files = [f for f in files if included.match(f.rsplit("/", 1)[-1] if basename_only else f)]
+        return self.content_searcher.search(self.sandbox_root, files, regex, context, max_results)
+
+    async def replace_in_file(self, path: str, old_content: str, new_content: str) -> dict:
+        """Replace content in a file, streaming it through a temp file that is renamed over the original."""
+        full_path = os.path.join(self.sandbox_root, path)
+        self._validate_path(full_path)
+        replacements = await asyncio.to_thread(stream_replace, full_path, old_content, new_content)
+        self.path_index.mark_stale(os.path.relpath(full_path, self.sandbox_root))
+        return {"replacements": replacements, "sha256": await asyncio.to_thread(file_sha256, full_path)}
+
+    async def edit_files(self, edits: List[dict], dry_run: bool = False) -> List[dict]:
+        """Apply replacements or unified-diff hunks to several files, all or nothing.
+
+        Every file is checked against its ``expected_sha256`` / ``expected_mtime``
+        and every edit is applied in memory before anything is written. All
+        new contents are then staged to temp files before the first rename,
+        and a failure while renaming puts back the files already replaced, so
+        a conflict, an edit that does not apply or a failed write leaves all
+        files untouched.
+        """
+        return await asyncio.to_thread(self._edit_files, edits, dry_run)
+
+    def _edit_files(self, edits: List[dict], dry_run: bool) -> List[dict]:
+        prepared = []
+        seen = set()
+        for edit in edits:
+            full_path = os.path.join(self.sandbox_root, edit["path"])
+            self._validate_path(full_path)
+            # Compare resolved paths so a symlink and its target cannot both be listed
+            if os.path.realpath(full_path) in seen:
+                raise EditError(f"{edit['path']}: listed more than once")
+            seen.add(os.path.realpath(full_path))
+
+            stat = os.stat(full_path)
+            if stat.st_size > self.max_edit_bytes:
+                raise EditError(f"{edit['path']}: too large for a batch edit, use /replace")
+            with open(full_path, "rb") as file:
+                raw = file.read()
+            sha256 = hashlib.sha256(raw).hexdigest()
+            if edit.get("expected_sha256") and edit["expected_sha256"] != sha256:
+                raise EditConflict(f"{edit['path']}: content hash does not match expected_sha256")
+            if edit.get("expected_mtime") is not None and abs(stat.st_mtime - edit["expected_mtime"]) > 1e-6:
+                raise EditConflict(f"{edit['path']}: modified since expected_mtime")
+
+            try:
+                before = raw.decode("utf-8")
+            except UnicodeDecodeError:
+                raise EditError(f"{edit['path']}: not UTF-8 text")
+            after, replacements, hunks = before, 0, 0
+            try:
+                if edit.get("replacements"):
+                    after, replacements = apply_replacements(after, edit["replacements"])
+                if edit.get("patch"):
+                    after, hunks = apply_patch(after, edit["patch"])
+            except EditError as e:
+                raise EditError(f"{edit['path']}: {e}")
+            prepared.append((edit["path"], full_path, stat, before, after, replacements, hunks))
+
+        if not dry_run:
+            # Re-check right before writing so nothing is half-applied over a concurrent change
+            for path, full_path, stat, *_ in prepared:
+                if os.stat(full_path).st_mtime_ns != stat.st_mtime_ns:
+                    raise EditConflict(f"{path}: modified while the edit was being prepared")
+
+            atomic_write_many([(full_path, after) for _, full_path, _, before, after, *_ in prepared if after != before])
+
+        results = []
+        for path, full_path, stat, before, after, replacements, hunks in prepared:
+            changed = after != before
+            if changed and not dry_run:
+                self.path_index.mark_stale(path)
+            results.append({
+                "path": path,
+                "status": ("would_apply" if dry_run else "applied") if changed else "unchanged",
+                "replacements": replacements,
+                "hunks": hunks,
+                "sha256": hashlib.sha256(after.encode("utf-8")).hexdigest(),
+                "mtime": os.stat(full_path).st_mtime if changed and not dry_run else stat.st_mtime,
+                "diff": compact_diff(path, before, after)
+            })
+        return results
 
     def _validate_path(self, path: str):
         """Validate file path is within sandbox."""
@@ -0,0 +1,131 @@
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+from typing import List, Optional, Tuple
+
+CHUNK_SIZE = 1024 * 1024
+
+class LineIndex:
+    """Sparse map from line numbers to byte offsets for one file.
+
+    Only the offset of every ``stride``-th line is stored, so a page read
+    seeks to the nearest checkpoint and scans at most ``stride`` lines no
+    matter how deep into the file it starts. Files that only grew since
+    they were indexed (logs) are extended from where indexing stopped
+    instead of being rescanned.
+    """
+
+    def __init__(self, path: str, stride: int):
+        self.path = path
+        self.stride = stride
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.checkpoints = array("Q", [0])
+        self.newlines = 0
+        self.indexed_size = 0
+        self.tail_start = 0
+        self.inode = None
+        self.mtime_ns = None
+
+    @property
+    def line_count(self) -> int:
+        # A last line without a trailing newline still counts
+        return self.newlines + (1 if self.indexed_size > self.tail_start else 0)
+
+    def refresh(self, stat: os.stat_result):
+        """Bring the index up to date with the file described by ``stat``."""
+        if stat.st_ino == self.inode and stat.st_mtime_ns == self.mtime_ns and stat.st_size == self.indexed_size:
+            return
+        if stat.st_ino != self.inode or stat.st_size <= self.indexed_size:
+            # Replaced, truncated or rewritten in place: start over
+            self._reset()
+        with open(self.path, "rb") as file:
+            self._scan(file, stat.st_size)
+        self.inode = stat.st_ino
+        self.mtime_ns = stat.st_mtime_ns
+
+    def _scan(self, file, end: int):
+        offset = self.indexed_size
+        file.seek(offset)
+        next_checkpoint = len(self.checkpoints) * self.stride
+        while offset < end:
+            chunk = file.read(min(CHUNK_SIZE, end - offset))
+            if not chunk:
+                break
+            newlines = chunk.count(b"\n")
+            if self.newlines + newlines >= next_checkpoint:
+                # Line k starts right after the k-th newline
+                ends = list(accumulate(map(len, chunk.split(b"\n"))))
+                while self.newlines + newlines >= next_checkpoint:
+                    i = next_checkpoint - self.newlines - 1
+                    self.checkpoints.append(offset + ends[i] + i + 1)
+                    next_checkpoint += self.stride
+            if newlines:
+                self.tail_start = offset + chunk.rfind(b"\n") + 1
+            self.newlines += newlines
+            offset += len(chunk)
+        self.indexed_size = offset
+
+    def read_lines(self, start: int, count: int, max_bytes: Optional[int] = None) -> Tuple[List[bytes], int, int, bool]:
+        """Read up to ``count`` lines from 0-based line ``start``.
+
+        Returns the lines, their byte span and whether ``max_bytes`` cut the
+        page short. Only whole lines are returned, and no more than
+        ``max_bytes`` + 1 bytes of them are ever held in memory.
+        """
+        checkpoint = min(start // self.stride, len(self.checkpoints) - 1)
+        with open(self.path, "rb") as file:
+            file.seek(self.checkpoints[checkpoint])
+            skip = start - checkpoint * self.stride
+            while skip:
+                # Bounded reads, so skipping a huge line does not load it whole
+                chunk = file.readline(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if chunk.endswith(b"\n"):
+                    skip -= 1
+            begin = file.tell()
+            lines = []
+            size = 0
+            truncated = False
+            for _ in range(count):
+                line = file.readline(-1 if max_bytes is None else max_bytes - size + 1)
+                if not line:
+                    break
+                if max_bytes is not None and size + len(line) > max_bytes:
+                    truncated = True
+                    break
+                lines.append(line)
+                size += len(line)
+            return lines, begin, begin + size, truncated
+
+class LineIndexCache:
+    """LRU of line indexes keyed by path and validated against inode, mtime and size."""
+
+    def __init__(self, max_entries: int, stride: int):
+        self.max_entries = max_entries
+        self.stride = stride
+        self._indexes: "OrderedDict[str, LineIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> LineIndex:
+        """Return an up-to-date index for ``path``; blocking, call it off the event loop."""
+        with self._lock:
+            index = self._indexes.get(path)
+            if index is None:
+                index = self._indexes[path] = LineIndex(path, self.stride)
+                if len(self._indexes) > self.max_entries:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(path)
+        with index.lock:
+            index.refresh(os.stat(path))
+        return index
+
+    def invalidate(self, path: str):
+        with self._lock:
+            self._indexes.pop(path, None)
\ No newline at end of file
@@ -0,0 +1,133 @@
+import asyncio
+import os
+from typing import AsyncGenerator, Dict, Optional
+
+class OutputSpool:
+    """Captures one output stream of a process.
+
+    The full stream is spooled to a file on disk so any byte range can be
+    fetched later, while only the most recent ``max_buffer`` bytes are kept
+    in memory to serve live followers and command results.
+    """
+
+    def __init__(self, path: str, max_buffer: int):
+        self.path = path
+        self.max_buffer = max_buffer
+        self.size = 0
+        self._buffer = bytearray()
+        self._buffer_start = 0
+        self._file = open(path, "wb")
+
+    def append(self, data: bytes):
+        self._file.write(data)
+        self._file.flush()
+        self._buffer += data
+        self.size += len(data)
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self._buffer_start += overflow
+
+    def tail(self) -> bytes:
+        """The retained in-memory tail of the stream."""
+        return bytes(self._buffer)
+
+    @property
+    def truncated(self) -> bool:
+        return self._buffer_start > 0
+
+    def read(self, start: int, end: Optional[int] = None) -> bytes:
+        """Read ``[start, end)``, from memory when retained and from the spool file otherwise."""
+        end = self.size if end is None else min(end, self.size)
+        start = max(start, 0)
+        if start >= end:
+            return b""
+        if start >= self._buffer_start:
+            return bytes(self._buffer[start - self._buffer_start:end - self._buffer_start])
+        with open(self.path, "rb") as file:
+            file.seek(start)
+            return file.read(end - start)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+class ProcessOutput:
+    """stdout and stderr spools of one process, with live change notification."""
+
+    STREAMS = ("stdout", "stderr")
+
+    def __init__(self, process_id: str, spool_dir: str, max_buffer: int):
+        os.makedirs(spool_dir, exist_ok=True)
+        self.spools: Dict[str, OutputSpool] = {
+            name: OutputSpool(os.path.join(spool_dir, f"{process_id}.{name}"), max_buffer)
+            for name in self.STREAMS
+        }
+        self.exit_code: Optional[int] = None
+        self.finished = False
+        # Open follow() generators; the spool files must outlive them
+        self.followers = 0
+        self._changed = asyncio.Event()
+
+    def append(self, stream: str, data: bytes):
+        self.spools[stream].append(data)
+        self._notify()
+
+    def finish(self, exit_code: Optional[int]):
+        self.exit_code = exit_code
+        self.finished = True
+        for spool in self.spools.values():
+            spool.close()
+        self._notify()
+
+    def _notify(self):
+        # Wake everyone waiting on the current event and start a fresh one for the next change
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def wait(self) -> Optional[int]:
+        while not self.finished:
+            await self._changed.wait()
+        return self.exit_code
+
+    async def follow(
+        self,
+        offsets: Optional[Dict[str, int]] = None,
+        chunk_size: int = 65536
+    ) -> AsyncGenerator[dict, None]:
+        """Yield output chunks tagged by stream and byte offset as they are produced.
+
+        Starts from ``offsets`` (default: the beginning), so a reconnecting
+        client can resume exactly where it left off; chunks older than the
+        in-memory tail are replayed from the spool file.
+        """
+        positions = {name: (offsets or {}).get(name, 0) for name in self.STREAMS}
+        self.followers += 1
+        try:
+            while True:
+                changed = self._changed
+                progressed = False
+                for name, spool in self.spools.items():
+                    data = spool.read(positions[name], positions[name] + chunk_size)
+                    if data:
+                        yield {"stream": name, "offset": positions[name], "data": data}
+                        positions[name] += len(data)
+                        progressed = True
+                if progressed:
+                    continue
+                if self.finished:
+                    return
+                await changed.wait()
+        finally:
+            self.followers -= 1
+
+    def remove(self):
+        for spool in self.spools.values():
+            spool.remove()
@@ -0,0 +1,374 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+# Above this many changed paths a full re-sort beats patching the sorted list
+PATCH_LIMIT = 20000
+
+def translate_glob(pattern: str) -> str:
+    """Translate a glob with ``**`` support into a regex body matching slash-separated paths."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body}]")
+                i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+def literal_prefix(pattern: str) -> str:
+    """The part of a glob before its first wildcard."""
+    match = re.search(r"[*?\[]", pattern)
+    return pattern[:match.start()] if match else pattern
+
+class IgnoreMatcher:
+    """Gitignore rules in effect for one directory, inherited from its ancestors.
+
+    Each rule is compiled against the path relative to the sandbox root, so
+    the whole chain can be evaluated with one combined regex when it has no
+    negations; otherwise rules are checked in order and the last match wins.
+    """
+
+    def __init__(self, rules: Tuple[Tuple[re.Pattern, bool, bool], ...]):
+        self.rules = rules
+        self._negated = any(negate for _, negate, _ in rules)
+        self._any = self._combine(rule for rule in rules)
+        self._files = self._combine(rule for rule in rules if not rule[2])
+
+    @staticmethod
+    def _combine(rules) -> Optional[re.Pattern]:
+        bodies = [regex.pattern for regex, _, _ in rules]
+        return re.compile("|".join(f"(?:{body})" for body in bodies)) if bodies else None
+
+    def extend(self, base: str, lines: List[str]) -> "IgnoreMatcher":
+        """Return a matcher with the rules of a ``.gitignore`` in directory ``base`` appended."""
+        rules = list(self.rules)
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            body = translate_glob(line.lstrip("/"))
+            prefix = re.escape(f"{base}/") if base else ""
+            if not anchored:
+                # A bare name matches at any depth below the .gitignore
+                prefix += "(?:.*/)?"
+            rules.append((re.compile(f"^{prefix}{body}$"), negate, dir_only))
+        return IgnoreMatcher(tuple(rules))
+
+    def ignored(self, path: str, is_dir: bool) -> bool:
+        if not self._negated:
+            combined = self._any if is_dir else self._files
+            return bool(combined and combined.match(path))
+        result = False
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(path):
+                result = not negate
+        return result
+
+class _Dir:
+    __slots__ = ("mtime_ns", "gitignore_mtime_ns", "files", "dirs", "matcher")
+
+    def __init__(self, mtime_ns: int, gitignore_mtime_ns: Optional[int], files: List[str], dirs: List[str], matcher: IgnoreMatcher):
+        self.mtime_ns = mtime_ns
+        self.gitignore_mtime_ns = gitignore_mtime_ns
+        self.files = files
+        self.dirs = dirs
+        self.matcher = matcher
+
+class PathIndex:
+    """In-memory index of every file and directory under the sandbox root.
+
+    The tree is walked once off the event loop; afterwards only directory
+    mtimes are checked, at most every ``refresh_interval`` seconds, and
+    directories whose entries changed are rescanned. Paths are kept in one
+    sorted list so prefix and glob queries bisect to the matching range
+    instead of walking the filesystem.
+    """
+
+    def __init__(self, root: str, ignore: List[str], refresh_interval: float = 2.0):
+        self.root = root
+        self.refresh_interval = refresh_interval
+        self.base_matcher = IgnoreMatcher(()).extend("", ignore)
+        self._dirs: Dict[str, _Dir] = {}
+        self._paths: List[str] = []
+        self._dir_paths: Set[str] = set()
+        self._stale: Set[str] = set()
+        self._added: Set[Tuple[str, bool]] = set()
+        self._removed: Set[Tuple[str, bool]] = set()
+        self._tracking = False
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.built_at: Optional[float] = None
+        self.refreshed_at = 0.0
+
+    async def ensure_fresh(self):
+        """Build the index on first use and refresh it when the interval has passed."""
+        if self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+            return
+        if self.built_at is not None and not self._stale and time.monotonic() - self.refreshed_at < self.refresh_interval:
+            return
+        self._task = asyncio.create_task(asyncio.to_thread(self._update))
+        await asyncio.shield(self._task)
+
+    def mark_stale(self, path: str):
+        """Rescan the directory holding ``path`` on the next query, e.g. after a write through the API."""
+        self._stale.add(os.path.dirname(path.strip("/")))
+
+    def _update(self):
+        with self._lock:
+            if self.built_at is None:
+                self._scan_tree("", self.base_matcher)
+                self._rebuild_paths()
+                self.built_at = time.monotonic()
+                self._tracking = True
+            else:
+                self._refresh()
+                changes = len(self._added) + len(self._removed)
+                if changes > PATCH_LIMIT:
+                    self._rebuild_paths()
+                elif changes:
+                    self._patch_paths()
+                self._added, self._removed = set(), set()
+            self.refreshed_at = time.monotonic()
+
+    def _scan_dir(self, rel: str, parent_matcher: IgnoreMatcher) -> _Dir:
+        full = os.path.join(self.root, rel) if rel else self.root
+        matcher = parent_matcher
+        gitignore_mtime_ns = None
+        gitignore = os.path.join(full, ".gitignore")
+        try:
+            gitignore_mtime_ns = os.stat(gitignore).st_mtime_ns
+            with open(gitignore, errors="replace") as file:
+                matcher = parent_matcher.extend(rel, file.readlines())
+        except OSError:
+            pass
+
+        files, dirs = [], []
+        mtime_ns = os.stat(full).st_mtime_ns
+        with os.scandir(full) as entries:
+            for entry in entries:
+                path = f"{rel}/{entry.name}" if rel else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if matcher.ignored(path, is_dir):
+                    continue
+                (dirs if is_dir else files).append(entry.name)
+        return _Dir(mtime_ns, gitignore_mtime_ns, files, dirs, matcher)
+
+    def _scan_tree(self, rel: str, matcher: IgnoreMatcher):
+        stack = [(rel, matcher)]
+        while stack:
+            current, parent_matcher = stack.pop()
+            try:
+                node = self._scan_dir(current, parent_matcher)
+            except OSError:
+                continue
+            self._dirs[current] = node
+            if self._tracking:
+                self._added.update(self._children(current, node))
+            for name in node.dirs:
+                stack.append((f"{current}/{name}" if current else name, node.matcher))
+
+    def _drop_tree(self, rel: str):
+        node = self._dirs.pop(rel, None)
+        if node is None:
+            return
+        self._removed.update(self._children(rel, node))
+        for name in node.dirs:
+            self._drop_tree(f"{rel}/{name}" if rel else name)
+
+    @staticmethod
+    def _children(rel: str, node: _Dir) -> Iterator[Tuple[str, bool]]:
+        prefix = f"{rel}/" if rel else ""
+        for name in node.files:
+            yield prefix + name, False
+        for name in node.dirs:
+            yield prefix + name, True
+
+    def _refresh(self):
+        stale, self._stale = self._stale, set()
+        for rel in sorted(self._dirs, key=len):
+            node = self._dirs.get(rel)
+            if node is None:
+                # Dropped along with a removed ancestor earlier in this pass
+                continue
+            full = os.path.join(self.root, rel) if rel else self.root
+            try:
+                mtime_ns = os.stat(full).st_mtime_ns
+            except OSError:
+                self._drop_tree(rel)
+                continue
+            try:
+                gitignore_mtime_ns = os.stat(os.path.join(full, ".gitignore")).st_mtime_ns
+            except OSError:
+                gitignore_mtime_ns = None
+            if mtime_ns == node.mtime_ns and gitignore_mtime_ns == node.gitignore_mtime_ns and rel not in stale:
+                continue
+
+            parent = os.path.dirname(rel)
+            parent_matcher = self._dirs[parent].matcher if rel and parent in self._dirs else self.base_matcher
+            if gitignore_mtime_ns != node.gitignore_mtime_ns:
+                # Ignore rules changed: everything below may be in or out now
+                self._drop_tree(rel)
+                self._scan_tree(rel, parent_matcher)
+            else:
+                fresh = self._scan_dir(rel, parent_matcher)
+                self._dirs[rel] = fresh
+                before, after = set(self._children(rel, node)), set(self._children(rel, fresh))
+                self._removed |= before - after
+                self._added |= after - before
+                for name in set(node.dirs) - set(fresh.dirs):
+                    self._drop_tree(f"{rel}/{name}" if rel else name)
+                for name in set(fresh.dirs) - set(node.dirs):
+                    self._scan_tree(f"{rel}/{name}" if rel else name, fresh.matcher)
+
+    def _rebuild_paths(self):
+        paths, dir_paths = [], set()
+        for rel, node in self._dirs.items():
+            prefix = f"{rel}/" if rel else ""
+            for name in node.files:
+                paths.append(prefix + name)
+            for name in node.dirs:
+                dir_paths.add(prefix + name)
+        paths.extend(dir_paths)
+        paths.sort()
+        # Swap in whole objects so concurrent queries see a consistent snapshot
+        self._paths, self._dir_paths = paths, dir_paths
+
+    def _patch_paths(self):
+        """Apply a small change set to copies of the sorted path list and directory set."""
+        paths, dir_paths = list(self._paths), set(self._dir_paths)
+        for path, _ in self._removed - self._added:
+            i = bisect_left(paths, path)
+            if i < len(paths) and paths[i] == path:
+                del paths[i]
+            dir_paths.discard(path)
+        for path, is_dir in self._added - self._removed:
+            i = bisect_left(paths, path)
+            if i == len(paths) or paths[i] != path:
+                paths.insert(i, path)
+            if is_dir:
+                dir_paths.add(path)
+        self._paths, self._dir_paths = paths, dir_paths
+
+    def files(self, prefix: str = "") -> List[str]:
+        """Snapshot of the indexed file paths under ``prefix``."""
+        paths, dir_paths = self._paths, self._dir_paths
+        files = []
+        for path in paths[bisect_left(paths, prefix):]:
+            if not path.startswith(prefix):
+                break
+            if path not in dir_paths:
+                files.append(path)
+        return files
+
+    def query(self, mode: str, pattern: str, offset: int = 0, limit: int = 100, kind: Optional[str] = None) -> dict:
+        """Answer a glob, prefix or fuzzy query from the index with pagination."""
+        paths, dir_paths = self._paths, self._dir_paths
+        if mode == "fuzzy":
+            matches = self._fuzzy(paths, pattern)
+        else:
+            prefix = pattern if mode == "prefix" else literal_prefix(pattern)
+            candidates = paths[bisect_left(paths, prefix):]
+            if mode == "prefix":
+                matches = []
+                for path in candidates:
+                    if not path.startswith(prefix):
+                        break
+                    matches.append(path)
+            elif mode == "glob":
+                regex = re.compile(translate_glob(pattern) + "$")
+                matches = []
+                for path in candidates:
+                    if not path.startswith(prefix):
+                        break
+                    if regex.match(path):
+                        matches.append(path)
+            else:
+                raise ValueError(f"Unknown search mode {mode}")
+        if kind == "file":
+            matches = [path for path in matches if path not in dir_paths]
+        elif kind == "dir":
+            matches = [path for path in matches if path in dir_paths]
+        page = matches[offset:offset + limit]
+        return {
+            "results": page,
+            "total": len(matches),
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + len(page) if offset + len(page) < len(matches) else None
+        }
+
+    @staticmethod
+    def _fuzzy(paths: List[str], query: str) -> List[str]:
+        """Subsequence match ranked by where and how tightly the query matches."""
+        needle = query.lower().replace("/", "")
+        if not needle:
+            return []
+        # "a[^b]*b[^c]*c" cannot backtrack, unlike "a.*?b.*?c"
+        regex = re.compile(re.escape(needle[0]) + "".join(
+            f"[^{re.escape(char)}]*{re.escape(char)}" for char in needle[1:]
+        ), re.IGNORECASE)
+        scored = []
+        for path in paths:
+            match = regex.search(path)
+            if match is None:
+                continue
+            lower = path.lower()
+            basename = lower[lower.rfind("/") + 1:]
+            if needle in basename:
+                score = 3000 - basename.index(needle) * 10
+            elif needle in lower:
+                score = 2000
+            else:
+                score = 1000 - (match.end() - match.start())
+            scored.append((-(score - len(path)), path))
+        scored.sort()
+        return [path for _, path in scored]
+
+    def stats(self) -> dict:
+        return {
+            "paths": len(self._paths),
+            "directories": len(self._dirs),
+            "built": self.built_at is not None,
+            "refreshed_seconds_ago": time.monotonic() - self.refreshed_at if self.built_at is not None else None
+        }
\ No newline at end of file
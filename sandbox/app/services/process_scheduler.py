@@ -0,0 +1,224 @@
+import asyncio
+import os
+import signal
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from app.services.output_spool import ProcessOutput
+
+class SchedulerFullError(RuntimeError):
+    """Raised when the command queue is at capacity."""
+
+class Job:
+    """A submitted shell command and its lifecycle state.
+
+    States: queued, starting, running, completed, timed_out, killed, failed.
+    """
+
+    def __init__(self, job_id: str, command: str, timeout: float, output: ProcessOutput):
+        self.id = job_id
+        self.command = command
+        self.timeout = timeout
+        self.output = output
+        self.state = "queued"
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+class ProcessScheduler:
+    """Admits at most ``max_concurrent`` commands at a time and queues the rest.
+
+    Every command runs in its own process group so a wall-clock timeout or
+    a kill takes down everything it spawned. A background reaper drops
+    finished jobs after ``retention`` seconds, releasing their pipes,
+    process handles and spool files.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        max_timeout: float,
+        retention: float,
+        kill_grace: float = 2.0
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_timeout = max_timeout
+        self.retention = retention
+        self.kill_grace = kill_grace
+        self.jobs: Dict[str, Job] = {}
+        self._queue: Deque[Job] = deque()
+        self._running = 0
+        self._reaper: Optional[asyncio.Task] = None
+
+    def submit(self, job: Job) -> Job:
+        """Queue a job; it starts as soon as a slot is free."""
+        if len(self._queue) >= self.max_queue:
+            raise SchedulerFullError("Too many queued commands, try again later")
+        if not job.timeout or job.timeout > self.max_timeout:
+            job.timeout = self.max_timeout
+        self.jobs[job.id] = job
+        self._queue.append(job)
+        self._dispatch()
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_loop())
+        return job
+
+    def queue_position(self, job: Job) -> Optional[int]:
+        """1-based position of a queued job, or None once it has left the queue."""
+        if job.state != "queued":
+            return None
+        for position, queued in enumerate(self._queue, start=1):
+            if queued is job:
+                return position
+        return None
+
+    async def kill(self, job: Job) -> str:
+        """Cancel a queued job or kill a running one with its whole process group.
+
+        Returns the job's final state. A job that has already exited keeps
+        the state it finished with rather than being relabelled killed.
+        """
+        if job.state == "queued":
+            job.state = "killed"
+            self._queue.remove(job)
+            self._finish(job, None)
+        elif job.state in ("starting", "running"):
+            if job.process is None or job.process.returncode is None:
+                job.state = "killed"
+                await self._kill_group(job)
+            else:
+                # Exited on its own; only stragglers still holding its pipes are left
+                try:
+                    os.killpg(job.process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        try:
+            # Let _run record how the job ended before reporting it
+            await asyncio.wait_for(job.output.wait(), timeout=self.kill_grace)
+        except asyncio.TimeoutError:
+            pass
+        return job.state
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "running": self._running,
+            "queued": len(self._queue),
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "tracked": len(self.jobs)
+        }
+
+    async def shutdown(self):
+        """Kill everything still queued or running."""
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for job in list(self.jobs.values()):
+            await self.kill(job)
+
+    def _dispatch(self):
+        while self._running < self.max_concurrent and self._queue:
+            job = self._queue.popleft()
+            job.state = "starting"
+            self._running += 1
+            asyncio.create_task(self._run(job))
+
+    async def _run(self, job: Job):
+        exit_code = None
+        try:
+            job.process = await asyncio.create_subprocess_shell(
+                job.command,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
+            )
+            job.started_at = time.monotonic()
+            if job.state == "killed":
+                # Killed while the process was being spawned
+                await self._kill_group(job)
+            else:
+                job.state = "running"
+            pump = asyncio.create_task(self._pump(job))
+            try:
+                exit_code = await asyncio.wait_for(asyncio.shield(pump), timeout=job.timeout)
+            except asyncio.TimeoutError:
+                if job.state == "running":
+                    job.state = "timed_out"
+                    job.error = f"Command timed out after {job.timeout:g}s"
+                await self._kill_group(job)
+                exit_code = await self._settle(pump, job)
+            if job.state == "running":
+                job.state = "completed"
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e)
+        finally:
+            self._finish(job, exit_code)
+            self._running -= 1
+            self._dispatch()
+
+    async def _pump(self, job: Job) -> int:
+        """Copy the job's pipes into its output spools until the process exits."""
+        async def drain(name: str, stream: asyncio.StreamReader):
+            while True:
+                chunk = await stream.read(65536)
+                if not chunk:
+                    break
+                job.output.append(name, chunk)
+
+        await asyncio.gather(drain("stdout", job.process.stdout), drain("stderr", job.process.stderr))
+        return await job.process.wait()
+
+    async def _settle(self, pump: asyncio.Task, job: Job) -> Optional[int]:
+        """Wait briefly for a killed job's pipes to close; give up on stragglers."""
+        try:
+            return await asyncio.wait_for(pump, timeout=self.kill_grace)
+        except asyncio.TimeoutError:
+            # A detached grandchild may still hold the pipes open; stop reading them
+            pump.cancel()
+            return job.process.returncode
+
+    async def _kill_group(self, job: Job):
+        """SIGTERM the job's process group, then SIGKILL it after a grace period."""
+        process = job.process
+        if process is None or process.returncode is not None:
+            return
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                return
+            try:
+                await asyncio.wait_for(process.wait(), timeout=self.kill_grace)
+                return
+            except asyncio.TimeoutError:
+                continue
+
+    def _finish(self, job: Job, exit_code: Optional[int]):
+        job.finished_at = time.monotonic()
+        job.output.finish(exit_code)
+
+    async def _reap_loop(self):
+        """Forget finished jobs once their retention period has passed."""
+        while self.jobs:
+            await asyncio.sleep(min(self.retention, 30))
+            cutoff = time.monotonic() - self.retention
+            for job_id, job in list(self.jobs.items()):
+                # Jobs still being followed keep their spools until the last follower detaches
+                if job.done and job.finished_at < cutoff and not job.output.followers:
+                    self._release(job)
+                    del self.jobs[job_id]
+
+    def _release(self, job: Job):
+        if job.process is not None and job.process.stdin is not None:
+            job.process.stdin.close()
+        job.process = None
+        job.output.remove()
@@ -0,0 +1,344 @@
+import asyncio
+import fcntl
+import os
+import pty
+import re
+import shutil
+import signal
+import subprocess
+import termios
+import time
+import uuid
+from typing import Dict, List, Optional
+
+class SessionLimitError(RuntimeError):
+    """Raised when no more PTY sessions can be opened."""
+
+class PtySession:
+    """A long-lived interactive shell attached to a pseudo-terminal.
+
+    Commands are written to a script file and sourced by the shell, so cwd,
+    exported variables and activated virtualenvs carry over between calls
+    and command length is not limited by the terminal line buffer. Each
+    command is followed by a sentinel ``printf`` that reports its exit code
+    and the shell's cwd; output up to the sentinel is the command's output.
+    stdout and stderr share the terminal and come back interleaved.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        work_dir: str,
+        max_output: int,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        write_timeout: float = 30.0
+    ):
+        self.id = session_id
+        self.work_dir = work_dir
+        self.max_output = max_output
+        self.cwd = cwd or os.getcwd()
+        self.env = env or {}
+        self.write_timeout = write_timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.lock = asyncio.Lock()
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        self.closed = False
+        self._master_fd: Optional[int] = None
+        self._buffer = bytearray()
+        self._truncated = False
+        self._scanned = 0
+        self._sentinel: Optional[re.Pattern] = None
+        self._done: Optional[asyncio.Future] = None
+        self._write_lock = asyncio.Lock()
+        self._writable: Optional[asyncio.Future] = None
+
+    @property
+    def busy(self) -> bool:
+        return self.lock.locked()
+
+    async def start(self, timeout: float = 10.0):
+        """Spawn the shell and wait until it answers a first sentinel."""
+        os.makedirs(self.work_dir, exist_ok=True)
+        master_fd, slave_fd = pty.openpty()
+        attrs = termios.tcgetattr(slave_fd)
+        # No echo of what we type and no \n -> \r\n translation on output
+        attrs[3] &= ~termios.ECHO
+        attrs[1] &= ~termios.ONLCR
+        termios.tcsetattr(slave_fd, termios.TCSANOW, attrs)
+
+        env = dict(os.environ, TERM="dumb", PS1="", PS2="", PROMPT_COMMAND="", HISTFILE="/dev/null")
+        env.update(self.env)
+        shell = shutil.which("bash")
+        argv = [shell, "--noprofile", "--norc", "--noediting", "-i"] if shell else ["/bin/sh", "-i"]
+        try:
+            self.process = subprocess.Popen(
+                argv,
+                stdin=slave_fd,
+                stdout=slave_fd,
+                stderr=slave_fd,
+                cwd=self.cwd,
+                env=env,
+                start_new_session=True,
+                preexec_fn=_set_controlling_tty
+            )
+        finally:
+            os.close(slave_fd)
+        self._master_fd = master_fd
+        os.set_blocking(master_fd, False)
+        asyncio.get_running_loop().add_reader(master_fd, self._on_readable)
+
+        result = await self.execute("export PS1= PS2= PROMPT_COMMAND=; stty -echo -onlcr 2>/dev/null", timeout)
+        if result["status"] != "completed":
+            await self.close()
+            raise RuntimeError("Shell session did not start")
+
+    async def execute(self, command: str, timeout: float) -> dict:
+        """Run a command inside the shell and wait for its sentinel."""
+        async with self.lock:
+            if self.closed:
+                raise ValueError("Session is closed")
+            self.last_used = time.monotonic()
+            script = os.path.join(self.work_dir, "command.sh")
+            with open(script, "w") as file:
+                file.write(command + "\n")
+
+            started = time.monotonic()
+            done = self._expect_sentinel()
+            await self._write(f". '{script}'; {self._sentinel_command()}\n".encode())
+            status = "completed"
+            try:
+                exit_code, cwd = await asyncio.wait_for(asyncio.shield(done), timeout)
+            except asyncio.TimeoutError:
+                status = "timed_out"
+                exit_code, cwd = await self._interrupt()
+            except EOFError:
+                status = "exited"
+                exit_code, cwd = self._exit_code(), self.cwd
+
+            output = bytes(self._buffer)
+            if cwd:
+                self.cwd = cwd
+            result = {
+                "session_id": self.id,
+                "output": output.decode(errors="replace"),
+                "exit_code": exit_code,
+                "cwd": self.cwd,
+                "status": status,
+                "output_truncated": self._truncated,
+                "duration": time.monotonic() - started
+            }
+            self._reset()
+            self.last_used = time.monotonic()
+            return result
+
+    async def send_input(self, data: str):
+        """Type into the terminal, e.g. to answer a prompt of the running command.
+
+        Raises TimeoutError if the terminal stops accepting input for
+        ``write_timeout`` seconds, e.g. when the command never reads stdin.
+        """
+        if self.closed:
+            raise ValueError("Session is closed")
+        self.last_used = time.monotonic()
+        await self._write(data.encode())
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._fail(EOFError("Session closed"))
+        if self._writable is not None and not self._writable.done():
+            self._writable.set_exception(ValueError("Session is closed"))
+        if self._master_fd is not None:
+            asyncio.get_running_loop().remove_reader(self._master_fd)
+            asyncio.get_running_loop().remove_writer(self._master_fd)
+            os.close(self._master_fd)
+            self._master_fd = None
+        if self.process is not None and self.process.poll() is None:
+            for sig in (signal.SIGHUP, signal.SIGKILL):
+                try:
+                    os.killpg(self.process.pid, sig)
+                except ProcessLookupError:
+                    break
+                try:
+                    await asyncio.to_thread(self.process.wait, 2)
+                    break
+                except subprocess.TimeoutExpired:
+                    continue
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def describe(self) -> dict:
+        return {
+            "session_id": self.id,
+            "pid": self.process.pid if self.process else None,
+            "cwd": self.cwd,
+            "busy": self.busy,
+            "created_at": self.created_at,
+            "idle_seconds": time.monotonic() - self.last_used
+        }
+
+    def _sentinel_command(self) -> str:
+        # The marker is printed in two halves so the command text itself never matches it
+        token = uuid.uuid4().hex
+        self._sentinel = re.compile(re.escape(f"__SANDBOX_{token}__".encode()) + rb":(\d+):([^\n]*)\n")
+        return f"printf '%s%s:%d:%s\\n' '__SANDBOX_' '{token}__' \"$?\" \"$PWD\""
+
+    def _expect_sentinel(self) -> asyncio.Future:
+        self._reset()
+        self._done = asyncio.get_running_loop().create_future()
+        return self._done
+
+    async def _interrupt(self):
+        """Interrupt a command that overran its timeout and resynchronise with the shell."""
+        done = self._done
+        try:
+            await self._write(b"\x03")
+            await asyncio.sleep(0.1)
+            await self._write(f"{self._sentinel_command()}\n".encode())
+            exit_code, cwd = await asyncio.wait_for(asyncio.shield(done), 5)
+            return exit_code, cwd
+        except (asyncio.TimeoutError, EOFError, ValueError):
+            # The shell is wedged; a fresh session is cheaper than guessing its state
+            await self.close()
+            return None, None
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._master_fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            # EIO/EOF: the shell exited
+            asyncio.get_running_loop().remove_reader(self._master_fd)
+            self.closed = True
+            self._fail(EOFError("Shell exited"))
+            return
+        if self._done is None or self._done.done():
+            return
+        self._buffer += data
+        match = self._sentinel.search(self._buffer, max(self._scanned - 256, 0))
+        if match:
+            self._done.set_result((int(match.group(1)), match.group(2).decode(errors="replace")))
+            del self._buffer[match.start():]
+            return
+        self._scanned = len(self._buffer)
+        overflow = len(self._buffer) - self.max_output
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self._scanned -= overflow
+            self._truncated = True
+
+    async def _write(self, data: bytes):
+        """Write all of ``data``, waiting off the event loop whenever the terminal buffer is full."""
+        loop = asyncio.get_running_loop()
+        async with self._write_lock:
+            deadline = loop.time() + self.write_timeout
+            view = memoryview(data)
+            while view:
+                fd = self._master_fd
+                if fd is None:
+                    raise ValueError("Session is closed")
+                try:
+                    view = view[os.write(fd, view):]
+                    continue
+                except BlockingIOError:
+                    pass
+                self._writable = loop.create_future()
+                loop.add_writer(fd, self._on_writable)
+                try:
+                    await asyncio.wait_for(asyncio.shield(self._writable), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    raise TimeoutError("Shell session is not accepting input") from None
+                finally:
+                    if self._master_fd == fd:
+                        loop.remove_writer(fd)
+                    self._writable = None
+
+    def _on_writable(self):
+        if self._writable is not None and not self._writable.done():
+            self._writable.set_result(None)
+
+    def _fail(self, error: Exception):
+        if self._done is not None and not self._done.done():
+            self._done.set_exception(error)
+            # execute() may not be waiting any more; do not warn about an unretrieved exception
+            self._done.exception()
+
+    def _exit_code(self) -> Optional[int]:
+        return self.process.poll() if self.process else None
+
+    def _reset(self):
+        self._buffer = bytearray()
+        self._scanned = 0
+        self._truncated = False
+
+def _set_controlling_tty():
+    # Runs in the child after setsid(): make the pty its controlling terminal for job control and ^C
+    fcntl.ioctl(0, termios.TIOCSCTTY, 0)
+
+class PtySessionManager:
+    """Keeps PTY sessions alive between requests and evicts idle ones."""
+
+    def __init__(self, base_dir: str, max_sessions: int, idle_timeout: float, max_output: int):
+        self.base_dir = base_dir
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_output = max_output
+        self.sessions: Dict[str, PtySession] = {}
+        # Sessions still starting; they count against max_sessions before they are listed
+        self._starting = 0
+        self._reaper: Optional[asyncio.Task] = None
+
+    async def create(self, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> PtySession:
+        await self.evict_idle()
+        if len(self.sessions) + self._starting >= self.max_sessions:
+            raise SessionLimitError("Too many open shell sessions")
+        self._starting += 1
+        try:
+            session_id = str(uuid.uuid4())
+            session = PtySession(session_id, os.path.join(self.base_dir, session_id), self.max_output, cwd, env)
+            await session.start()
+        finally:
+            self._starting -= 1
+        self.sessions[session_id] = session
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap_loop())
+        return session
+
+    def get(self, session_id: str) -> PtySession:
+        session = self.sessions.get(session_id)
+        if session is None or session.closed:
+            raise ValueError("Session not found")
+        return session
+
+    def list(self) -> List[dict]:
+        return [session.describe() for session in self.sessions.values()]
+
+    async def close(self, session_id: str):
+        session = self.sessions.pop(session_id, None)
+        if session is None:
+            raise ValueError("Session not found")
+        await session.close()
+
+    async def evict_idle(self):
+        """Close sessions whose shell exited or that sat unused past the idle timeout."""
+        cutoff = time.monotonic() - self.idle_timeout
+        for session_id, session in list(self.sessions.items()):
+            if session.closed or (not session.busy and session.last_used < cutoff):
+                del self.sessions[session_id]
+                await session.close()
+
+    async def shutdown(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for session_id in list(self.sessions):
+            await self.close(session_id)
+
+    async def _reap_loop(self):
+        while self.sessions:
+            await asyncio.sleep(min(self.idle_timeout, 30))
+            await self.evict_idle()
\ No newline at end of file
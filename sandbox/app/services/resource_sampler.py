@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class RingBuffer:
+    """Fixed-size time series of CPU and memory samples backed by ``array('d')``.
+
+    Appends overwrite the oldest sample in place, so memory stays constant
+    no matter how long the sampler runs.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.cpu = array("d", bytes(8 * capacity))
+        self.memory = array("d", bytes(8 * capacity))
+        self.count = 0
+        self._next = 0
+
+    def append(self, timestamp: float, cpu: float, memory: float):
+        self.timestamps[self._next] = timestamp
+        self.cpu[self._next] = cpu
+        self.memory[self._next] = memory
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _ordered(self, values: array) -> List[float]:
+        start = (self._next - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            return values[start:start + self.count].tolist()
+        return values[start:].tolist() + values[:self._next].tolist()
+
+    def downsample(self, points: int, since: Optional[float] = None) -> Dict[str, List[float]]:
+        """Average samples into at most ``points`` equal-count buckets, oldest first."""
+        timestamps = self._ordered(self.timestamps)
+        cpu = self._ordered(self.cpu)
+        memory = self._ordered(self.memory)
+        if since is not None:
+            first = bisect_left(timestamps, since)
+            timestamps, cpu, memory = timestamps[first:], cpu[first:], memory[first:]
+        if points <= 0 or len(timestamps) <= points:
+            return {"timestamps": timestamps, "cpu": cpu, "memory": memory}
+
+        series = {"timestamps": [], "cpu": [], "memory": []}
+        size = len(timestamps) / points
+        for bucket in range(points):
+            start, end = int(bucket * size), int((bucket + 1) * size)
+            series["timestamps"].append(timestamps[end - 1])
+            series["cpu"].append(sum(cpu[start:end]) / (end - start))
+            series["memory"].append(sum(memory[start:end]) / (end - start))
+        return series
+
+class ResourceSampler:
+    """Samples every managed service on a timer and caches the results.
+
+    Each tick runs one ``sample(name, service)`` call per service
+    concurrently on a small thread pool, so slow docker or psutil calls
+    neither block the event loop nor each other. The latest status of each
+    service and its history ring buffer are then read without any I/O.
+    """
+
+    def __init__(
+        self,
+        sample: Callable[[str, dict], dict],
+        services: Dict[str, dict],
+        interval: float,
+        capacity: int,
+        workers: int
+    ):
+        self.sample = sample
+        self.services = services
+        self.interval = interval
+        self.capacity = capacity
+        self.latest: Dict[str, dict] = {}
+        self.history: Dict[str, RingBuffer] = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sampler")
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.sample_once()
+            except Exception:
+                logger.warning("Resource sampling failed", exc_info=True)
+            await asyncio.sleep(max(self.interval - (time.monotonic() - started), 0))
+
+    async def sample_once(self):
+        """Sample all services concurrently and record the results."""
+        loop = asyncio.get_running_loop()
+        names = list(self.services)
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self._executor, self.sample, name, self.services[name]) for name in names),
+            return_exceptions=True
+        )
+        now = time.time()
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                result = {"name": name, "status": "unknown", "error": str(result)}
+            self.record(name, result, now)
+        for name in set(self.latest) - set(self.services):
+            # Service was unregistered
+            self.latest.pop(name, None)
+            self.history.pop(name, None)
+
+    def record(self, name: str, status: dict, timestamp: Optional[float] = None):
+        self.latest[name] = status
+        if status.get("cpu_usage") is not None:
+            buffer = self.history.get(name)
+            if buffer is None:
+                buffer = self.history[name] = RingBuffer(self.capacity)
+            buffer.append(timestamp or time.time(), status["cpu_usage"], status.get("memory_usage") or 0.0)
+
+    def status(self) -> List[dict]:
+        return list(self.latest.values())
+
+    def series(self, name: str, points: int, seconds: Optional[float] = None) -> Optional[Dict[str, List[float]]]:
+        buffer = self.history.get(name)
+        if buffer is None:
+            return None
+        since = time.time() - seconds if seconds else None
+        return buffer.downsample(points, since)
\ No newline at end of file
@@ -1,36 +1,62 @@
 import asyncio
 import docker
 import os
-from typing import Dict, Optional
+import tempfile
+import time
+from typing import AsyncGenerator, Dict, List, Optional
 import uuid
+from app.services.output_spool import ProcessOutput
+from app.services.process_scheduler import Job, ProcessScheduler
+from app.services.pty_session import PtySessionManager
+from app.services.command_batch import CommandBatch
 
 class ShellService:
     def __init__(self):
         self.docker_client = docker.from_env()
-        self.processes: Dict[str, asyncio.subprocess.Process] = {}
+        self.spool_dir = os.getenv("SHELL_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "sandbox-shell"))
+        self.max_buffer = int(os.getenv("SHELL_OUTPUT_BUFFER_BYTES", 1024 * 1024))
+        self.scheduler = ProcessScheduler(
+            max_concurrent=int(os.getenv("MAX_PROCESSES", 10)),
+            max_queue=int(os.getenv("SHELL_MAX_QUEUE", 100)),
+            max_timeout=float(os.getenv("TIMEOUT_MINUTES", 60)) * 60,
+            retention=float(os.getenv("SHELL_RETENTION_SECONDS", 600))
+        )
+        self.sessions = PtySessionManager(
+            base_dir=os.path.join(self.spool_dir, "sessions"),
+            max_sessions=int(os.getenv("PTY_MAX_SESSIONS", 20)),
+            idle_timeout=float(os.getenv("PTY_IDLE_TIMEOUT_SECONDS", 900)),
+            max_output=self.max_buffer
+        )
+        self.max_timeout = float(os.getenv("TIMEOUT_MINUTES", 60)) * 60
+        self.batch_concurrency = int(os.getenv("SHELL_BATCH_CONCURRENCY", 8))
 
-    async def execute_command(self, command: str) -> dict:
+    async def execute_command(self, command: str, timeout: Optional[int] = None) -> dict:
         """Execute a command in the sandbox environment."""
         process_id = str(uuid.uuid4())
         
         try:
-            # Create process
-            process = await asyncio.create_subprocess_shell(
-                command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
+            job = self._submit(process_id, command, timeout)
             
-            self.processes[process_id] = process
-            
-            # Wait for completion with timeout
-            stdout, stderr = await process.communicate()
+            # Wait for completion; only the retained tail of each stream is returned
+            try:
+                exit_code = await job.output.wait()
+            except asyncio.CancelledError:
+                # Nobody is waiting for the result any more
+                await self.scheduler.kill(job)
+                raise
+            stdout = job.output.spools["stdout"]
+            stderr = job.output.spools["stderr"]
+            error = stderr.tail().decode(errors="replace") if stderr.size else None
+            if job.error:
+                error = f"{error}\n{job.error}" if error else job.error
             
             return {
                 "process_id": process_id,
-                "output": stdout.decode(),
-                "exit_code": process.returncode,
-                "error": stderr.decode() if stderr else None
+                "output": stdout.tail().decode(errors="replace"),
+                "exit_code": exit_code,
+                "error": error,
+                "output_truncated": stdout.truncated or stderr.truncated,
+                "status": job.state
             }
             
         except Exception as e:
@@ -41,21 +67,78 @@ class ShellService:
                 "error": str(e)
             }
 
+    async def start_command(self, command: str, timeout: Optional[int] = None) -> dict:
+        """Start a command without waiting for it; follow its output with stream_output."""
+        process_id = str(uuid.uuid4())
+        job = self._submit(process_id, command, timeout)
+        return {
+            "process_id": process_id,
+            "status": job.state,
+            "queue_position": self.scheduler.queue_position(job)
+        }
+
+    def execute_batch(self, commands: List[dict], max_concurrency: Optional[int] = None, fail_fast: bool = False) -> AsyncGenerator[dict, None]:
+        """Run many commands concurrently, honouring depends_on, and yield results as they finish."""
+        limit = max_concurrency or self.batch_concurrency
+        batch = CommandBatch(commands, self.execute_command, min(limit, self.batch_concurrency), fail_fast)
+        return batch.run()
+
+    def has_process(self, process_id: str) -> bool:
+        return process_id in self.scheduler.jobs
+
+    async def stream_output(self, process_id: str, offsets: Optional[Dict[str, int]] = None) -> AsyncGenerator[dict, None]:
+        """Yield output chunks of a process as they are produced, then its exit code."""
+        job = self._get_job(process_id)
+        async for chunk in job.output.follow(offsets):
+            yield chunk
+        yield {"exit_code": job.output.exit_code, "status": job.state}
+
+    async def read_output(self, process_id: str, stream: str, start: int = 0, end: Optional[int] = None) -> dict:
+        """Fetch a byte range of a process's spooled output."""
+        output = self._get_job(process_id).output
+        if stream not in output.spools:
+            raise ValueError(f"Unknown stream {stream}")
+        spool = output.spools[stream]
+        return {
+            "data": await asyncio.to_thread(spool.read, start, end),
+            "size": spool.size,
+            "finished": output.finished
+        }
+
+    def _submit(self, process_id: str, command: str, timeout: Optional[int]) -> Job:
+        output = ProcessOutput(process_id, self.spool_dir, self.max_buffer)
+        try:
+            return self.scheduler.submit(Job(process_id, command, timeout, output))
+        except Exception:
+            output.remove()
+            raise
+
+    def _get_job(self, process_id: str) -> Job:
+        job = self.scheduler.jobs.get(process_id)
+        if not job:
+            raise ValueError("Process not found")
+        return job
+
     async def get_process_status(self, process_id: str) -> dict:
-        """Get the status of a running process."""
-        process = self.processes.get(process_id)
-        if not process:
+        """Get the status of a process, including its place in the queue."""
+        job = self.scheduler.jobs.get(process_id)
+        if not job:
             return {"status": "not_found"}
-            
+        
+        end = job.finished_at or time.monotonic()
         return {
-            "status": "running" if process.returncode is None else "completed",
-            "exit_code": process.returncode
+            "status": job.state,
+            "exit_code": job.output.exit_code,
+            "queue_position": self.scheduler.queue_position(job),
+            "runtime": end - job.started_at if job.started_at else None,
+            "error": job.error
         }
 
     async def send_process_input(self, process_id: str, input_data: str) -> dict:
         """Send input to a running process."""
-        process = self.processes.get(process_id)
-        if not process or process.stdin.is_closing():
+        job = self.scheduler.jobs.get(process_id)
+        process = job.process if job else None
+        if not process or process.returncode is not None or process.stdin.is_closing():
             raise ValueError("Process not found or not accepting input")
             
         try:
@@ -66,15 +149,50 @@ class ShellService:
             return {"status": "error", "message": str(e)}
 
     async def kill_process(self, process_id: str) -> dict:
-        """Kill a running process."""
-        process = self.processes.get(process_id)
-        if not process:
+        """Kill a queued or running process and its process group."""
+        job = self.scheduler.jobs.get(process_id)
+        if not job:
             return {"status": "not_found"}
             
         try:
-            process.terminate()
-            await process.wait()
-            del self.processes[process_id]
-            return {"status": "killed"}
+            state = await self.scheduler.kill(job)
+            return {"status": state, "exit_code": job.output.exit_code}
         except Exception as e:
-            return {"status": "error", "message": str(e)}
\ No newline at end of file
+            return {"status": "error", "message": str(e)}
+
+    async def create_session(self, cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None) -> dict:
+        """Open a persistent shell session whose cwd and environment survive between commands."""
+        session = await self.sessions.create(cwd, env)
+        return session.describe()
+
+    def list_sessions(self) -> list:
+        return self.sessions.list()
+
+    async def execute_in_session(self, session_id: str, command: str, timeout: Optional[int] = None) -> dict:
+        """Run a command in an existing shell session; commands in one session run one at a time."""
+        session = self.sessions.get(session_id)
+        if not timeout or timeout > self.max_timeout:
+            timeout = self.max_timeout
+        return await session.execute(command, timeout)
+
+    async def send_session_input(self, session_id: str, input_data: str) -> dict:
+        """Type a line into a session, e.g. to answer a prompt of the running command."""
+        session = self.sessions.get(session_id)
+        try:
+            await session.send_input(f"{input_data}\n")
+            return {"status": "success"}
+        except TimeoutError as e:
+            return {"status": "error", "message": str(e)}
+
+    async def close_session(self, session_id: str) -> dict:
+        await self.sessions.close(session_id)
+        return {"status": "closed"}
+
+    def get_stats(self) -> dict:
+        stats = self.scheduler.stats()
+        stats["sessions"] = len(self.sessions.sessions)
+        return stats
+
+    async def shutdown(self):
+        await self.scheduler.shutdown()
+        await self.sessions.shutdown()
\ No newline at end of file
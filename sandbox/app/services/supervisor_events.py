@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Docker container event actions and the service state they leave behind
+DOCKER_ACTION_STATES = {
+    "create": "created",
+    "start": "running",
+    "restart": "running",
+    "unpause": "running",
+    "pause": "paused",
+    "die": "exited",
+    "stop": "stopped",
+    "destroy": "removed"
+}
+
+class EventsSource:
+    """In-memory source of Docker-style event dicts.
+
+    The supervisor consumes events from whatever source it is given;
+    pushing dicts into this one directly is how a fake Docker daemon is
+    simulated in tests.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def start(self):
+        pass
+
+    def push(self, event: Optional[dict]):
+        self._queue.put_nowait(event)
+
+    async def events(self) -> AsyncGenerator[dict, None]:
+        while True:
+            event = await self._queue.get()
+            if event is None:
+                return
+            yield event
+
+    def close(self):
+        self.push(None)
+
+class DockerEventsSource(EventsSource):
+    """Follows the Docker daemon's container events from a background thread."""
+
+    def __init__(self, docker_client):
+        super().__init__()
+        self.docker_client = docker_client
+        self._stream = None
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        self._thread = threading.Thread(target=self._follow, args=(loop,), name="docker-events", daemon=True)
+        self._thread.start()
+
+    def _follow(self, loop: asyncio.AbstractEventLoop):
+        since = None
+        while not self._closed.is_set():
+            try:
+                # Resume from the last event seen so a reconnect does not lose transitions
+                self._stream = self.docker_client.events(decode=True, filters={"type": "container"}, since=since)
+                for event in self._stream:
+                    since = event.get("time", since)
+                    loop.call_soon_threadsafe(self.push, event)
+            except Exception:
+                if self._closed.is_set():
+                    break
+                logger.warning("Docker events stream failed, reconnecting", exc_info=True)
+                self._closed.wait(1)
+
+    def close(self):
+        self._closed.set()
+        if self._stream is not None:
+            self._stream.close()
+        super().close()
+
+class ServiceStateTable:
+    """Authoritative current state of every managed service, with change fan-out.
+
+    Every update bumps a version and is delivered to each subscriber's
+    bounded queue; a subscriber that falls behind loses its oldest events
+    rather than stalling the supervisor.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self.states: Dict[str, dict] = {}
+        self.version = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def update(self, name: str, **fields) -> dict:
+        state = self.states.setdefault(name, {"name": name, "state": "unknown"})
+        if fields.get("state") and fields["state"] != state.get("state"):
+            fields.setdefault("since", time.time())
+        state.update(fields)
+        self.publish({"type": "state", **state})
+        return state
+
+    def remove(self, name: str):
+        if self.states.pop(name, None) is not None:
+            self.publish({"type": "removed", "name": name})
+
+    def publish(self, event: dict):
+        self.version += 1
+        event = dict(event, version=self.version)
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def snapshot(self) -> List[dict]:
+        return [dict(state) for state in self.states.values()]
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
\ No newline at end of file
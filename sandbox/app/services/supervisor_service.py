@@ -1,31 +1,186 @@
 import psutil
 import docker
-from typing import List, Dict
+from typing import List, Dict, Optional
 import asyncio
+import json
+import os
+import re
+import time
+import uuid
+import logging
+from datetime import datetime, timezone
+from app.services.resource_sampler import ResourceSampler
+from app.services.supervisor_events import DOCKER_ACTION_STATES, DockerEventsSource, EventsSource, ServiceStateTable
+
+logger = logging.getLogger(__name__)
 
 class SupervisorService:
-    def __init__(self):
+    def __init__(self, events_source: Optional[EventsSource] = None):
         self.docker_client = docker.from_env()
-        self.services: Dict[str, dict] = {}
+        # e.g. {"chrome": {"process": "chromium --headless ..."}, "vnc": {"container": "sandbox-vnc"}}
+        self.services: Dict[str, dict] = json.loads(os.getenv("SUPERVISOR_SERVICES", "{}"))
+        self._processes: Dict[int, psutil.Process] = {}
+        self._cpu_totals: Dict[str, tuple] = {}
+        self.sampler = ResourceSampler(
+            sample=self._sample,
+            services=self.services,
+            interval=float(os.getenv("SUPERVISOR_SAMPLE_SECONDS", 2)),
+            capacity=int(os.getenv("SUPERVISOR_HISTORY_SIZE", 1800)),
+            workers=int(os.getenv("SUPERVISOR_SAMPLER_WORKERS", 4))
+        )
+        self.state = ServiceStateTable(int(os.getenv("SUPERVISOR_EVENTS_QUEUE_SIZE", 256)))
+        self.events_source = events_source or DockerEventsSource(self.docker_client)
+        self.operations: Dict[str, dict] = {}
+        self._containers: Dict[str, str] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._consumer: Optional[asyncio.Task] = None
+        # Operations and process watchers in flight; the loop itself only holds weak references
+        self._background: set = set()
+
+    async def start(self):
+        """Seed the state table once, then keep it current from Docker events and process exits."""
+        self.events_source.start()
+        for name, service in self.services.items():
+            if service.get("container"):
+                await self._seed_container(name, service["container"])
+            else:
+                self.state.update(name, state="running" if service.get("pid") else "stopped")
+        self._consumer = asyncio.create_task(self._consume_events())
+        self.sampler.start()
+
+    async def shutdown(self):
+        self.events_source.close()
+        if self._consumer is not None:
+            self._consumer.cancel()
+        for task in list(self._background):
+            task.cancel()
+        await self.sampler.stop()
+
+    async def _seed_container(self, name: str, container_ref: str):
+        try:
+            container = await asyncio.to_thread(self.docker_client.containers.get, container_ref)
+        except docker.errors.NotFound:
+            self.state.update(name, state="not_found")
+            return
+        except Exception as e:
+            self.state.update(name, state="unknown", error=str(e))
+            return
+        # Events identify containers by full id and by name; map both back to the service
+        self._containers[container.id] = name
+        self._containers[container.name] = name
+        self.state.update(name, state=container.status)
+
+    async def _consume_events(self):
+        async for event in self.events_source.events():
+            try:
+                self.apply_event(event)
+            except Exception:
+                logger.warning("Could not apply docker event %s", event, exc_info=True)
+
+    def apply_event(self, event: dict):
+        """Fold one Docker container event into the state table."""
+        actor = event.get("Actor", {})
+        attributes = actor.get("Attributes", {})
+        name = self._containers.get(actor.get("ID") or event.get("id")) or self._containers.get(attributes.get("name"))
+        if name is None:
+            return
+        action = event.get("Action") or event.get("status") or ""
+        if action.startswith("health_status"):
+            self.state.update(name, health=action.split(":", 1)[-1].strip())
+            return
+        new_state = DOCKER_ACTION_STATES.get(action)
+        if new_state is None:
+            return
+        fields = {"state": new_state}
+        if action == "die":
+            fields["exit_code"] = int(attributes.get("exitCode", 0))
+        if new_state == "running":
+            fields["exit_code"] = None
+        self.state.update(name, **fields)
 
     async def get_all_status(self) -> List[dict]:
-        """Get status of all managed services."""
+        """Get status of all managed services: state from the state table, usage from the sampler."""
         statuses = []
-        for name, service in self.services.items():
-            status = await self._get_service_status(name)
-            statuses.append(status)
+        for name in self.services:
+            sample = self.sampler.latest.get(name, {})
+            state = self.state.states.get(name, {})
+            statuses.append({**sample, "name": name, "status": state.get("state", sample.get("status", "unknown"))})
         return statuses
 
+    def get_history(self, service_name: str, points: int = 120, seconds: Optional[float] = None) -> dict:
+        """Get a downsampled CPU and memory series for a service."""
+        if service_name not in self.services:
+            raise ValueError(f"Service {service_name} not found")
+        series = self.sampler.series(service_name, points, seconds) or {"timestamps": [], "cpu": [], "memory": []}
+        return {"name": service_name, **series}
+
+    def submit_operation(self, service_name: str, action: str) -> dict:
+        """Queue a start, stop or restart and return its operation record immediately.
+
+        Operations on one service run one at a time in submission order;
+        their progress is published on the events stream alongside the state
+        changes they cause.
+        """
+        if service_name not in self.services:
+            raise ValueError(f"Service {service_name} not found")
+        operation = {
+            "id": str(uuid.uuid4()),
+            "service": service_name,
+            "action": action,
+            "status": "pending",
+            "error": None,
+            "submitted_at": time.time(),
+            "finished_at": None
+        }
+        self.operations[operation["id"]] = operation
+        self._prune_operations()
+        self._spawn(self._run_operation(operation))
+        return operation
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _run_operation(self, operation: dict):
+        name = operation["service"]
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            self._set_operation(operation, status="running")
+            try:
+                if operation["action"] in ("stop", "restart"):
+                    await self.stop_service(name)
+                if operation["action"] in ("start", "restart"):
+                    await self.start_service(name)
+                self._set_operation(operation, status="succeeded")
+            except Exception as e:
+                self._set_operation(operation, status="failed", error=str(e))
+
+    def _set_operation(self, operation: dict, **fields):
+        operation.update(fields)
+        if fields.get("status") in ("succeeded", "failed"):
+            operation["finished_at"] = time.time()
+        self.state.publish({"type": "operation", **operation})
+
+    def _prune_operations(self, keep: int = 500):
+        finished = [op for op in self.operations.values() if op["finished_at"] is not None]
+        for operation in sorted(finished, key=lambda op: op["finished_at"])[:max(len(self.operations) - keep, 0)]:
+            del self.operations[operation["id"]]
+
     async def start_service(self, service_name: str):
         """Start a service."""
         if service_name not in self.services:
             raise ValueError(f"Service {service_name} not found")
             
         service = self.services[service_name]
-        if service.get("container"):
-            await self._start_container(service["container"])
-        elif service.get("process"):
-            await self._start_process(service["process"])
+        status = self._begin_transition(service_name, "starting")
+        try:
+            if service.get("container"):
+                status = await self._start_container(service_name, service["container"])
+            elif service.get("process"):
+                await self._start_process(service_name, service)
+        finally:
+            self._settle(service_name, "starting", status)
 
     async def stop_service(self, service_name: str):
         """Stop a service."""
@@ -33,49 +188,157 @@ class SupervisorService:
             raise ValueError(f"Service {service_name} not found")
             
         service = self.services[service_name]
-        if service.get("container"):
-            await self._stop_container(service["container"])
-        elif service.get("process"):
-            await self._stop_process(service["process"])
-
-    async def restart_service(self, service_name: str):
-        """Restart a service."""
-        await self.stop_service(service_name)
-        await self.start_service(service_name)
-
-    async def _get_service_status(self, service_name: str) -> dict:
-        """Get status of a specific service."""
-        service = self.services.get(service_name)
-        if not service:
-            return {
-                "name": service_name,
-                "status": "not_found"
-            }
+        status = self._begin_transition(service_name, "stopping")
+        try:
+            if service.get("container"):
+                status = await self._stop_container(service["container"])
+            elif service.get("process"):
+                await self._stop_process(service_name, service)
+        finally:
+            self._settle(service_name, "stopping", status)
+
+    def _begin_transition(self, name: str, transition: str) -> str:
+        """Mark a service as starting or stopping and return the state it had before."""
+        previous = self._current_state(name)
+        self.state.update(name, state=transition)
+        return previous
+
+    def _settle(self, name: str, transition: str, state: str):
+        """Leave a transitional state no docker event moved the service out of.
 
+        Docker emits nothing when the container already was in the requested
+        state, and nothing when the call failed; in both cases ``state`` (the
+        re-read container status, or the state before the call) is applied.
+        """
+        if self._current_state(name) == transition:
+            self.state.update(name, state=state)
+
+    def _current_state(self, name: str) -> str:
+        return self.state.states.get(name, {}).get("state", "unknown")
+
+    def _sample(self, name: str, service: dict) -> dict:
         if service.get("container"):
-            return await self._get_container_status(service["container"])
-        elif service.get("process"):
-            return await self._get_process_status(service["process"])
-
-    async def _start_container(self, container_id: str):
-        """Start a Docker container."""
-        container = self.docker_client.containers.get(container_id)
-        container.start()
-
-    async def _stop_container(self, container_id: str):
-        """Stop a Docker container."""
-        container = self.docker_client.containers.get(container_id)
-        container.stop()
-
-    async def _start_process(self, cmd: str):
-        """Start a process."""
-        process = await asyncio.create_subprocess_shell(cmd)
+            return self._sample_container(name, service["container"])
+        if service.get("process"):
+            return self._sample_process(name, service)
+        return {"name": name, "status": "unknown"}
+
+    def _sample_container(self, name: str, container_id: str) -> dict:
+        try:
+            container = self.docker_client.containers.get(container_id)
+        except docker.errors.NotFound:
+            return {"name": name, "status": "not_found"}
+        status = {"name": name, "status": container.status, "uptime": None, "cpu_usage": None, "memory_usage": None}
+        if container.status != "running":
+            self._cpu_totals.pop(container_id, None)
+            return status
+
+        started_at = container.attrs["State"]["StartedAt"]
+        # Docker reports nanoseconds; datetime takes at most microseconds
+        status["uptime"] = datetime.fromisoformat(re.sub(r"(\.\d{6})\d+", r"\1", started_at).replace("Z", "+00:00"))
+
+        # one_shot skips the daemon's second sample; CPU is derived from our previous reading instead
+        stats = container.stats(stream=False, one_shot=True)
+        cpu_stats = stats.get("cpu_stats", {})
+        total = cpu_stats.get("cpu_usage", {}).get("total_usage", 0)
+        system = cpu_stats.get("system_cpu_usage", 0)
+        cpus = cpu_stats.get("online_cpus") or len(cpu_stats.get("cpu_usage", {}).get("percpu_usage") or [1])
+        previous = self._cpu_totals.get(container_id)
+        self._cpu_totals[container_id] = (total, system)
+        if previous and system > previous[1]:
+            status["cpu_usage"] = (total - previous[0]) / (system - previous[1]) * cpus * 100
+        else:
+            status["cpu_usage"] = 0.0
+
+        memory_stats = stats.get("memory_stats", {})
+        used = memory_stats.get("usage", 0) - memory_stats.get("stats", {}).get("inactive_file", 0)
+        status["memory_usage"] = used / (1024 * 1024)
+        return status
+
+    def _sample_process(self, name: str, service: dict) -> dict:
+        status = {"name": name, "status": "stopped", "uptime": None, "cpu_usage": None, "memory_usage": None}
+        pid = service.get("pid")
+        if not pid:
+            return status
+        try:
+            process = self._tracked_process(pid)
+            with process.oneshot():
+                state = process.status()
+                status["uptime"] = datetime.fromtimestamp(process.create_time(), timezone.utc)
+                cpu = process.cpu_percent(None)
+                memory = process.memory_info().rss
+            # Shell commands do their work in children; count the whole tree
+            for child in process.children(recursive=True):
+                try:
+                    tracked = self._tracked_process(child.pid)
+                    cpu += tracked.cpu_percent(None)
+                    memory += tracked.memory_info().rss
+                except psutil.Error:
+                    self._processes.pop(child.pid, None)
+        except psutil.NoSuchProcess:
+            self._processes.pop(pid, None)
+            status["status"] = "exited"
+            return status
+        status["status"] = "exited" if state == psutil.STATUS_ZOMBIE else "running"
+        status["cpu_usage"] = cpu
+        status["memory_usage"] = memory / (1024 * 1024)
+        return status
+
+    def _tracked_process(self, pid: int) -> psutil.Process:
+        # cpu_percent(None) measures since the previous call on the same Process object
+        process = self._processes.get(pid)
+        if process is None or not process.is_running():
+            process = self._processes[pid] = psutil.Process(pid)
         return process
 
-    async def _stop_process(self, process):
+    async def _start_container(self, name: str, container_id: str) -> str:
+        """Start a Docker container and return its status afterwards."""
+        container = await asyncio.to_thread(self.docker_client.containers.get, container_id)
+        # The container may have been recreated since seeding; make sure its events map back to the service
+        self._containers[container.id] = name
+        self._containers[container.name] = name
+        await asyncio.to_thread(container.start)
+        await asyncio.to_thread(container.reload)
+        return container.status
+
+    async def _stop_container(self, container_id: str) -> str:
+        """Stop a Docker container and return its status afterwards."""
+        container = await asyncio.to_thread(self.docker_client.containers.get, container_id)
+        await asyncio.to_thread(container.stop)
+        await asyncio.to_thread(container.reload)
+        return container.status
+
+    async def _start_process(self, name: str, service: dict):
+        """Start a process and watch for its exit; a process that is still running is left alone."""
+        process = service.get("handle")
+        if process is not None and process.returncode is None:
+            self.state.update(name, state="running", pid=process.pid)
+            return process
+        process = await asyncio.create_subprocess_shell(service["process"])
+        service["handle"] = process
+        service["pid"] = process.pid
+        self.state.update(name, state="running", pid=process.pid, exit_code=None)
+        self._spawn(self._watch_process(name, service, process))
+        return process
+
+    async def _watch_process(self, name: str, service: dict, process):
+        exit_code = await process.wait()
+        if service.get("handle") is process:
+            service["handle"] = None
+            service["pid"] = None
+            self.state.update(name, state="exited", exit_code=exit_code, pid=None)
+
+    async def _stop_process(self, name: str, service: dict):
         """Stop a process."""
+        process = service.get("handle")
+        if process is None:
+            self.state.update(name, state="stopped")
+            return
+        service["handle"] = None
+        service["pid"] = None
         try:
             process.terminate()
             await process.wait()
         except ProcessLookupError:
-            pass
\ No newline at end of file
+            pass
+        self.state.update(name, state="stopped", exit_code=process.returncode, pid=None)
\ No newline at end of file
@@ -0,0 +1,333 @@
+import asyncio
+import docker
+import json
+import logging
+import math
+import os
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+POOL_LABEL = "sandbox.warm-pool"
+
+class PoolFullError(RuntimeError):
+    """Raised when no more sandbox containers can be leased."""
+
+class PooledContainer:
+    """A sandbox container owned by the pool, either ready or leased to a session."""
+
+    def __init__(self, container, started_in: float):
+        self.container = container
+        self.id = container.id
+        self.started_in = started_in
+        self.created_at = time.time()
+        self.lease_id: Optional[str] = None
+        self.session_id: Optional[str] = None
+        self.leased_at: Optional[float] = None
+        self.ports: Dict[str, Optional[int]] = {}
+
+    def describe(self) -> dict:
+        return {
+            "lease_id": self.lease_id,
+            "session_id": self.session_id,
+            "container_id": self.id,
+            "container_name": self.container.name,
+            "ports": self.ports,
+            "leased_at": self.leased_at
+        }
+
+class WarmPool:
+    """Keeps pre-started, never-used sandbox containers ready to hand out.
+
+    ``acquire`` pops a ready container without touching Docker, so a new
+    session gets a running sandbox (Chrome and VNC already up) at once;
+    only an empty pool falls back to a cold start. Released containers are
+    removed, never re-pooled: a session leaves state behind everywhere its
+    user can write (PTY shells, the Chrome profile, $HOME, /tmp, /app) and
+    the image has no process manager to restart the API and Chrome from a
+    clean slate, so only a fresh container is known to be clean. A
+    maintainer task keeps the number of ready containers at a target
+    derived from the recent arrival rate: enough to cover the sessions
+    expected to arrive while a replacement cold-starts.
+    """
+
+    def __init__(
+        self,
+        docker_client,
+        image: str,
+        min_size: int = 1,
+        max_size: int = 8,
+        max_containers: int = 20,
+        ports: Optional[List[int]] = None,
+        rate_window: float = 300.0,
+        headroom: float = 1.5,
+        interval: float = 2.0,
+        start_timeout: float = 60.0,
+        max_concurrent_starts: int = 4,
+        run_options: Optional[dict] = None
+    ):
+        self.docker_client = docker_client
+        self.image = image
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_containers = max_containers
+        self.ports = ports or [8001, 9222, 5900]
+        self.rate_window = rate_window
+        self.headroom = headroom
+        self.interval = interval
+        self.start_timeout = start_timeout
+        self.run_options = run_options or {}
+        self.pool_id = uuid.uuid4().hex[:8]
+        self.ready: Deque[PooledContainer] = deque()
+        self.leases: Dict[str, PooledContainer] = {}
+        self.starting = 0
+        self.removing = 0
+        self.checking = 0
+        # Cold start time estimate, seeded pessimistically until the first start is measured
+        self.start_seconds = 10.0
+        self._arrivals: Deque[float] = deque()
+        self._start_slots = asyncio.Semaphore(max_concurrent_starts)
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._background: set = set()
+        self._hits = 0
+        self._misses = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["WarmPool"]:
+        """Build the pool from ``WARM_POOL_*`` settings; None when no image is configured."""
+        image = os.getenv("WARM_POOL_IMAGE")
+        if not image:
+            return None
+        return cls(
+            docker.from_env(),
+            image,
+            min_size=int(os.getenv("WARM_POOL_MIN_SIZE", 1)),
+            max_size=int(os.getenv("WARM_POOL_MAX_SIZE", 8)),
+            max_containers=int(os.getenv("WARM_POOL_MAX_CONTAINERS", 20)),
+            ports=[int(port) for port in os.getenv("WARM_POOL_PORTS", "8001,9222,5900").split(",") if port],
+            rate_window=float(os.getenv("WARM_POOL_RATE_WINDOW_SECONDS", 300)),
+            run_options=json.loads(os.getenv("WARM_POOL_RUN_OPTIONS", "{}"))
+        )
+
+    @property
+    def total(self) -> int:
+        return len(self.ready) + len(self.leases) + self.starting + self.removing + self.checking
+
+    def arrival_rate(self) -> float:
+        """Sessions per second over the recent window."""
+        cutoff = time.monotonic() - self.rate_window
+        while self._arrivals and self._arrivals[0] < cutoff:
+            self._arrivals.popleft()
+        return len(self._arrivals) / self.rate_window
+
+    def target_size(self) -> int:
+        """Ready containers needed to absorb the arrivals expected during one cold start."""
+        expected = self.arrival_rate() * self.start_seconds * self.headroom
+        return max(self.min_size, min(self.max_size, math.ceil(expected)))
+
+    async def start(self):
+        await asyncio.to_thread(self._remove_orphans)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._maintain())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in list(self._background):
+            task.cancel()
+        pooled = list(self.ready) + list(self.leases.values())
+        self.ready.clear()
+        self.leases.clear()
+        await asyncio.gather(*(asyncio.to_thread(self._remove, item) for item in pooled), return_exceptions=True)
+
+    async def acquire(self, session_id: Optional[str] = None) -> dict:
+        """Lease a ready container, cold-starting one only if the pool is empty."""
+        self._arrivals.append(time.monotonic())
+        self._wake.set()
+        item = None
+        while self.ready:
+            candidate = self.ready.popleft()
+            # Still counted against max_containers while it is checked off the loop
+            self.checking += 1
+            try:
+                alive = await asyncio.to_thread(self._is_alive, candidate)
+            finally:
+                self.checking -= 1
+            if alive:
+                item = candidate
+                break
+            self._spawn(asyncio.to_thread(self._remove, candidate))
+        if item is not None:
+            self._hits += 1
+        else:
+            if self.total >= self.max_containers:
+                raise PoolFullError(f"Warm pool limit of {self.max_containers} containers reached")
+            self._misses += 1
+            self.starting += 1
+            try:
+                item = await self._create()
+            finally:
+                self.starting -= 1
+
+        item.lease_id = uuid.uuid4().hex
+        item.session_id = session_id
+        item.leased_at = time.time()
+        self.leases[item.lease_id] = item
+        return item.describe()
+
+    def release(self, lease_id: str) -> dict:
+        """Return a leased container; it is removed in the background and a fresh one replaces it."""
+        item = self.leases.pop(lease_id, None)
+        if item is None:
+            raise ValueError(f"Lease {lease_id} not found")
+        self.removing += 1
+        self._spawn(self._retire(item))
+        return item.describe()
+
+    def get_lease(self, lease_id: str) -> dict:
+        item = self.leases.get(lease_id)
+        if item is None:
+            raise ValueError(f"Lease {lease_id} not found")
+        return item.describe()
+
+    def stats(self) -> dict:
+        return {
+            "image": self.image,
+            "ready": len(self.ready),
+            "leased": len(self.leases),
+            "starting": self.starting,
+            "removing": self.removing,
+            "target": self.target_size(),
+            "arrival_rate_per_minute": self.arrival_rate() * 60,
+            "start_seconds": self.start_seconds,
+            "hits": self._hits,
+            "misses": self._misses
+        }
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _maintain(self):
+        while True:
+            try:
+                await self._rebalance()
+            except Exception:
+                logger.warning("Warm pool rebalance failed", exc_info=True)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _rebalance(self):
+        target = self.target_size()
+        missing = min(target - len(self.ready) - self.starting, self.max_containers - self.total)
+        for _ in range(missing):
+            # Counted before the task runs so the next tick does not start the same containers again
+            self.starting += 1
+            self._spawn(self._replenish())
+        if missing <= 0 and len(self.ready) > target:
+            # Shrink one container per tick so a short lull does not drain the pool
+            await asyncio.to_thread(self._remove, self.ready.pop())
+
+    async def _replenish(self):
+        try:
+            item = await self._create()
+        except Exception:
+            logger.warning("Could not start warm pool container", exc_info=True)
+            return
+        finally:
+            self.starting -= 1
+        self.ready.append(item)
+
+    async def _create(self) -> PooledContainer:
+        async with self._start_slots:
+            started = time.monotonic()
+            container = await asyncio.to_thread(self._run_container)
+            item = PooledContainer(container, 0.0)
+            try:
+                await self._wait_ready(item)
+            except BaseException:
+                await asyncio.to_thread(self._remove, item)
+                raise
+            item.started_in = time.monotonic() - started
+            # Exponential moving average keeps the target responsive without jitter
+            self.start_seconds = 0.7 * self.start_seconds + 0.3 * item.started_in
+            return item
+
+    def _run_container(self):
+        options = dict(self.run_options)
+        labels = dict(options.pop("labels", {}), **{POOL_LABEL: self.pool_id})
+        return self.docker_client.containers.run(
+            self.image,
+            detach=True,
+            labels=labels,
+            # Let Docker pick free host ports so any number of sandboxes can coexist
+            ports={f"{port}/tcp": None for port in self.ports},
+            **options
+        )
+
+    async def _wait_ready(self, item: PooledContainer):
+        deadline = time.monotonic() + self.start_timeout
+        delay = 0.05
+        while True:
+            await asyncio.to_thread(item.container.reload)
+            state = item.container.attrs.get("State", {})
+            health = state.get("Health", {}).get("Status")
+            if state.get("Status") == "running" and health in (None, "healthy"):
+                item.ports = self._host_ports(item.container)
+                if all(item.ports.values()):
+                    return
+            elif state.get("Status") in ("exited", "dead"):
+                raise RuntimeError(f"Container {item.container.name} exited during startup")
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Container {item.container.name} not ready after {self.start_timeout}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+    def _is_alive(self, item: PooledContainer) -> bool:
+        """Refresh a pooled container's state; it may have died while it sat in the pool."""
+        try:
+            item.container.reload()
+        except Exception:
+            return False
+        state = item.container.attrs.get("State", {})
+        return state.get("Status") == "running" and state.get("Health", {}).get("Status") in (None, "healthy")
+
+    def _host_ports(self, container) -> Dict[str, Optional[int]]:
+        bindings = container.attrs.get("NetworkSettings", {}).get("Ports") or {}
+        ports = {}
+        for port in self.ports:
+            binding = bindings.get(f"{port}/tcp") or [{}]
+            host_port = binding[0].get("HostPort")
+            ports[str(port)] = int(host_port) if host_port else None
+        return ports
+
+    async def _retire(self, item: PooledContainer):
+        try:
+            await asyncio.to_thread(self._remove, item)
+        finally:
+            self.removing -= 1
+            # The freed slot may be needed for a replacement
+            self._wake.set()
+
+    def _remove(self, item: PooledContainer):
+        try:
+            item.container.remove(force=True)
+        except Exception:
+            logger.warning("Could not remove container %s", item.id, exc_info=True)
+
+    def _remove_orphans(self):
+        """Remove pool containers left behind by a previous run of the API."""
+        for container in self.docker_client.containers.list(all=True, filters={"label": POOL_LABEL}):
+            try:
+                container.remove(force=True)
+            except Exception:
+                logger.warning("Could not remove orphaned container %s", container.id, exc_info=True)
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""Compare glob.glob against the in-memory path index on a synthetic tree.
+
+Builds a workspace of ``--files`` empty files spread over nested package
+directories, plus an ignored ``node_modules`` subtree, then times the
+initial index build, an idle refresh, a refresh after a few changes, and
+glob / prefix / fuzzy queries against the equivalent recursive glob.glob.
+
+Usage (from the sandbox directory):
+    python -m benchmarks.bench_path_index --files 500000
+"""
+import argparse
+import asyncio
+import glob
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from app.services.path_index import PathIndex
+
+def make_tree(root: str, files: int, per_dir: int = 50):
+    """Create ``files`` files across packages/moduleN/subN directories, plus ignored noise."""
+    with open(os.path.join(root, ".gitignore"), "w") as gitignore:
+        gitignore.write("build/\n*.log\n")
+    dirs = max(files // per_dir, 1)
+    for d in range(dirs):
+        directory = os.path.join(root, "packages", f"module{d // 100}", f"sub{d % 100}")
+        os.makedirs(directory, exist_ok=True)
+        for f in range(per_dir):
+            extension = (".py", ".ts", ".md", ".json", ".log")[f % 5]
+            open(os.path.join(directory, f"file{f}{extension}"), "w").close()
+    noise = os.path.join(root, "node_modules", "dep", "lib")
+    os.makedirs(noise, exist_ok=True)
+    for f in range(min(files // 10, 50000)):
+        open(os.path.join(noise, f"noise{f}.js"), "w").close()
+
+def timed(fn, repeat: int = 5) -> float:
+    """Median wall time of ``fn`` in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=500000)
+    parser.add_argument("--keep", action="store_true", help="Do not delete the synthetic tree")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench-path-index-")
+    try:
+        started = time.perf_counter()
+        make_tree(root, args.files)
+        print(f"created tree in {time.perf_counter() - started:.1f}s at {root}")
+
+        index = PathIndex(root, ignore=[".git", "node_modules"], refresh_interval=0)
+        started = time.perf_counter()
+        await index.ensure_fresh()
+        print(f"initial build        {(time.perf_counter() - started) * 1000:10.1f} ms  ({index.stats()['paths']} paths)")
+
+        started = time.perf_counter()
+        await index.ensure_fresh()
+        print(f"idle refresh         {(time.perf_counter() - started) * 1000:10.1f} ms")
+
+        for i in range(10):
+            open(os.path.join(root, "packages", "module0", f"sub{i}", "added.py"), "w").close()
+        started = time.perf_counter()
+        await index.ensure_fresh()
+        print(f"refresh, 10 changes  {(time.perf_counter() - started) * 1000:10.1f} ms")
+
+        queries = [
+            ("glob", "**/*.py", "**/*.py"),
+            ("glob", "packages/module3/**/file6.ts", "packages/module3/**/file6.ts"),
+            ("prefix", "packages/module4/sub7/", None),
+            ("fuzzy", "mod4sub7file3", None)
+        ]
+        for mode, pattern, glob_pattern in queries:
+            indexed = timed(lambda: index.query(mode, pattern, 0, 100))
+            total = index.query(mode, pattern, 0, 1)["total"]
+            line = f"{mode:>6} {pattern:<32} index {indexed:9.2f} ms  ({total} matches)"
+            if glob_pattern:
+                walked = timed(lambda: glob.glob(os.path.join(root, glob_pattern), recursive=True), repeat=1)
+                line += f" | glob.glob {walked:9.2f} ms"
+            print(line)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == "__main__":
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,212 @@
+import asyncio
+import json
+from typing import Dict, List
+
+import docker
+import pytest
+
+from app.services import supervisor_service
+from app.services.supervisor_events import EventsSource
+from app.services.supervisor_service import SupervisorService
+
+class FakeContainer:
+    """Container whose start/stop change its status without emitting events; the test pushes those."""
+
+    def __init__(self, container_id: str, name: str, status: str):
+        self.id = container_id
+        self.name = name
+        self.status = status
+        self.fail = None
+
+    def start(self):
+        if self.fail:
+            raise self.fail
+        self.status = "running"
+
+    def stop(self):
+        if self.fail:
+            raise self.fail
+        self.status = "exited"
+
+    def reload(self):
+        pass
+
+class FakeContainers:
+    def __init__(self, containers: Dict[str, FakeContainer]):
+        self.containers = containers
+
+    def get(self, ref: str) -> FakeContainer:
+        container = self.containers.get(ref)
+        if container is None:
+            raise docker.errors.NotFound(ref)
+        return container
+
+class FakeDocker:
+    def __init__(self, *containers: FakeContainer):
+        self.containers = FakeContainers({container.name: container for container in containers})
+
+def event(action: str, container: FakeContainer, **attributes) -> dict:
+    return {
+        "Type": "container",
+        "Action": action,
+        "Actor": {"ID": container.id, "Attributes": {"name": container.name, **attributes}}
+    }
+
+@pytest.fixture
+def web():
+    return FakeContainer("c0ffee", "sandbox-web", "exited")
+
+@pytest.fixture
+def make_supervisor(monkeypatch, web):
+    monkeypatch.setenv("SUPERVISOR_SERVICES", json.dumps({"web": {"container": web.name}, "worker": {"process": "sleep 30"}}))
+    monkeypatch.setattr(supervisor_service.docker, "from_env", lambda: FakeDocker(web))
+
+    async def make() -> SupervisorService:
+        service = SupervisorService(events_source=EventsSource())
+        # Resource sampling is not under test
+        monkeypatch.setattr(service.sampler, "start", lambda: None)
+        await service.start()
+        return service
+    return make
+
+async def drain(queue: asyncio.Queue) -> List[dict]:
+    # Let the consumer task fold every pushed event first
+    for _ in range(5):
+        await asyncio.sleep(0)
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+async def finish(supervisor: SupervisorService, operation: dict) -> dict:
+    for _ in range(100):
+        if operation["finished_at"] is not None:
+            return operation
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"operation {operation['id']} did not finish")
+
+def test_events_drive_state_and_versions(make_supervisor, web):
+    async def scenario():
+        supervisor = await make_supervisor()
+        assert supervisor.state.states["web"]["state"] == "exited"
+        async with supervisor.state.subscribe() as queue:
+            version = supervisor.state.version
+            for action in ("start", "die", "stop"):
+                supervisor.events_source.push(event(action, web, exitCode="137"))
+            events = await drain(queue)
+            snapshot = supervisor.state.snapshot()
+        await supervisor.shutdown()
+        return version, events, snapshot
+
+    version, events, snapshot = asyncio.run(scenario())
+    assert [e["state"] for e in events] == ["running", "exited", "stopped"]
+    assert [e["version"] for e in events] == [version + 1, version + 2, version + 3]
+    assert events[0]["exit_code"] is None
+    assert events[1]["exit_code"] == 137
+    assert {k: v for k, v in events[-1].items() if k not in ("type", "version")} in snapshot
+
+def test_events_for_unknown_containers_are_ignored(make_supervisor, web):
+    async def scenario():
+        supervisor = await make_supervisor()
+        version = supervisor.state.version
+        supervisor.apply_event(event("start", FakeContainer("other", "other", "running")))
+        supervisor.apply_event(event("health_status: healthy", web))
+        return version, supervisor.state.version, supervisor.state.states["web"]
+
+    before, after, state = asyncio.run(scenario())
+    assert after == before + 1
+    assert state["state"] == "exited"
+    assert state["health"] == "healthy"
+
+def test_start_operation_settles_from_event(make_supervisor, web):
+    async def scenario():
+        supervisor = await make_supervisor()
+        async with supervisor.state.subscribe() as queue:
+            operation = await finish(supervisor, supervisor.submit_operation("web", "start"))
+            supervisor.events_source.push(event("start", web))
+            events = await drain(queue)
+        return operation, events, supervisor.state.states["web"]["state"]
+
+    operation, events, state = asyncio.run(scenario())
+    assert operation["status"] == "succeeded"
+    assert [(e["type"], e.get("status") or e.get("state")) for e in events] == [
+        ("operation", "running"),
+        ("state", "starting"),
+        ("state", "running"),
+        ("operation", "succeeded"),
+        ("state", "running")
+    ]
+    versions = [e["version"] for e in events]
+    assert versions == sorted(versions) and len(set(versions)) == len(versions)
+    assert state == "running"
+
+def test_start_on_running_container_does_not_stick(make_supervisor, web):
+    web.status = "running"
+
+    async def scenario():
+        supervisor = await make_supervisor()
+        # Docker sends no event for a container that is already running
+        operation = await finish(supervisor, supervisor.submit_operation("web", "start"))
+        return operation, supervisor.state.states["web"]["state"]
+
+    operation, state = asyncio.run(scenario())
+    assert operation["status"] == "succeeded"
+    assert state == "running"
+
+def test_stop_on_stopped_container_does_not_stick(make_supervisor, web):
+    async def scenario():
+        supervisor = await make_supervisor()
+        operation = await finish(supervisor, supervisor.submit_operation("web", "stop"))
+        return operation, supervisor.state.states["web"]["state"]
+
+    operation, state = asyncio.run(scenario())
+    assert operation["status"] == "succeeded"
+    assert state == "exited"
+
+def test_failed_operation_restores_previous_state(make_supervisor, web):
+    async def scenario():
+        supervisor = await make_supervisor()
+        web.fail = RuntimeError("container was removed")
+        operation = await finish(supervisor, supervisor.submit_operation("web", "restart"))
+        return operation, supervisor.state.states["web"]["state"]
+
+    operation, state = asyncio.run(scenario())
+    assert operation["status"] == "failed"
+    assert operation["error"] == "container was removed"
+    assert state == "exited"
+
+def test_start_on_running_process_does_not_spawn_another(make_supervisor):
+    async def scenario():
+        supervisor = await make_supervisor()
+        first = await finish(supervisor, supervisor.submit_operation("worker", "start"))
+        handle = supervisor.services["worker"]["handle"]
+        second = await finish(supervisor, supervisor.submit_operation("worker", "start"))
+        same = supervisor.services["worker"]["handle"] is handle
+        state = dict(supervisor.state.states["worker"])
+        await supervisor.stop_service("worker")
+        await supervisor.shutdown()
+        return first, second, same, state
+
+    first, second, same, state = asyncio.run(scenario())
+    assert first["status"] == second["status"] == "succeeded"
+    assert same
+    assert state["state"] == "running"
+
+def test_background_tasks_are_held_until_done(make_supervisor):
+    async def scenario():
+        supervisor = await make_supervisor()
+        operation = supervisor.submit_operation("worker", "start")
+        held = len(supervisor._background)
+        await finish(supervisor, operation)
+        # The process watcher stays held while the process runs
+        watching = len(supervisor._background)
+        await supervisor.stop_service("worker")
+        await asyncio.sleep(0.05)
+        remaining = len(supervisor._background)
+        await supervisor.shutdown()
+        return held, watching, remaining
+
+    held, watching, remaining = asyncio.run(scenario())
+    assert held == 1
+    assert watching == 1
+    assert remaining == 0